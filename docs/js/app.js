@@ -65,7 +65,9 @@ $(function(){
     }
   });
 
-  PR.prettyPrint();
+  if (typeof(PR) != 'undefined') {
+    PR.prettyPrint();
+  }
   var lines = $('li.L0,li.L1,li.L2,li.L3,li.L4,li.L5,li.L6,li.L7,li.L8,li.L9');
   lines.append($('<span class="right">' + unkode_icon_org + '</span><br clear="all"/>'));
   
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Audit page weight and render-blocking resources of docs/ against budgets.
+
+Nothing flags a page that got heavier. This script walks docs/ once and
+measures per page:
+
+- html_bytes: size of the HTML file
+- asset_bytes: distinct local assets the page loads (stylesheets, scripts,
+  images, icons and url() images whose rule matches an element of the page)
+- external_requests / external_bytes: third-party requests as counted by
+  audit_third_party.py (inline loaders included; bytes are its estimates)
+- blocking_head: synchronous `<script src>` (no async/defer) and
+  stylesheets without a non-screen media in <head> (not counting
+  `<noscript>` fallbacks), e.g.
+  jquery-1.7.2.min.js, run_prettify.js, bootstrap.min.css; the report
+  lists every blocking resource with the number of pages it blocks
+
+Budgets are per page type (index, lang, view, other, as in purge_css.py);
+DEFAULT_BUDGETS below can be overridden by `--budgets <json>`, e.g.
+{"view": {"html_bytes": 120000}, "*": {"blocking_head": 2}} ("*" applies to
+every type). Offenders are ranked by their worst budget ratio. The
+defaults are for fully built pages (build.py's `audit` node runs after the
+whole pipeline), which carry ~15 KB of inlined critical CSS (purge_css.py).
+
+Usage:
+- check <docs_dir> [--budgets FILE] [--top 20]: report and enforce budgets
+
+Exit codes:
+- 0: every page within budget
+- 1: at least one page over budget
+- 3: processing error (read/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+
+from audit_third_party import DEFAULT_POLICY, count_requests, find_third_party
+from inject_resource_hints import Stylesheets, page_stylesheets, resolve, selector_matches
+from purge_css import page_template
+
+EXIT_OK = 0
+EXIT_OVER_BUDGET = 1
+EXIT_ERROR = 3
+
+METRICS = ("html_bytes", "asset_bytes", "external_requests", "external_bytes", "blocking_head")
+DEFAULT_TOP = 20
+DEFAULT_BUDGETS: dict[str, dict[str, int]] = {
+    "index": {
+        "html_bytes": 60_000,
+        "asset_bytes": 300_000,
+        "external_requests": 8,
+        "external_bytes": 400_000,
+        "blocking_head": 5,
+    },
+    "lang": {
+        "html_bytes": 60_000,
+        "asset_bytes": 300_000,
+        "external_requests": 8,
+        "external_bytes": 400_000,
+        "blocking_head": 5,
+    },
+    "view": {
+        "html_bytes": 200_000,
+        "asset_bytes": 300_000,
+        "external_requests": 8,
+        "external_bytes": 400_000,
+        "blocking_head": 5,
+    },
+    "other": {
+        # ranking.html's 280-row table alone is ~110 KB.
+        "html_bytes": 140_000,
+        "asset_bytes": 300_000,
+        "external_requests": 8,
+        "external_bytes": 400_000,
+        "blocking_head": 5,
+    },
+}
+NON_BLOCKING_MEDIA = ("print", "speech")
+SCRIPT_TYPES = ("", "text/javascript", "application/javascript")
+
+
+@dataclass
+class PageWeight:
+    page: str
+    template: str
+    metrics: dict[str, int]
+    blocking: list[str] = field(default_factory=list)
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def load_budgets(budgets_path: Path | None) -> dict[str, dict[str, int]]:
+    budgets = {template: dict(limits) for template, limits in DEFAULT_BUDGETS.items()}
+    if budgets_path is None:
+        return budgets
+    overrides = json.loads(budgets_path.read_text(encoding="utf-8"))
+    if not isinstance(overrides, dict):
+        raise ValueError("budgets must be a JSON object keyed by page type")
+    for template, limits in overrides.items():
+        if not isinstance(limits, dict):
+            raise ValueError(f"budgets for {template} must be an object")
+        unknown = sorted(set(limits) - set(METRICS))
+        if unknown:
+            raise ValueError(f"unknown metric for {template}: {', '.join(unknown)}")
+        targets = budgets.keys() if template == "*" else [template]
+        for target in targets:
+            budgets.setdefault(target, {}).update(
+                {name: int(value) for name, value in limits.items()}
+            )
+    return budgets
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(path for path in docs_dir.rglob("*.html") if path.is_file())
+
+
+def blocking_resources(soup: BeautifulSoup, page: str) -> list[str]:
+    head = soup.head
+    if not isinstance(head, Tag):
+        return []
+    blocking: list[str] = []
+    for tag in head.find_all(["script", "link"]):
+        # Deferred-stylesheet fallbacks only load with scripting disabled.
+        if not isinstance(tag, Tag) or tag.find_parent("noscript") is not None:
+            continue
+        if tag.name == "script" and tag.get("src"):
+            script_type = str(tag.get("type", "")).lower()
+            deferred = tag.has_attr("async") or tag.has_attr("defer")
+            if script_type in SCRIPT_TYPES and not deferred:
+                blocking.append(resolve(page, str(tag["src"])) or str(tag["src"]))
+        elif tag.name == "link" and "stylesheet" in (tag.get("rel") or []):
+            media = str(tag.get("media", "all")).lower()
+            if not media.startswith(NON_BLOCKING_MEDIA):
+                href = str(tag.get("href", ""))
+                blocking.append(resolve(page, href) or href)
+    return blocking
+
+
+def local_assets(
+    soup: BeautifulSoup, page: str, stylesheets: Stylesheets, pages: set[str]
+) -> set[str]:
+    assets: set[str] = set()
+    for _link, css_path in page_stylesheets(soup, page):
+        assets.add(css_path)
+        for selectors, image, _type in stylesheets.get(css_path):
+            if image not in assets and any(selector_matches(s, soup) for s in selectors):
+                assets.add(image)
+    for tag in soup.find_all(["script", "img", "iframe"], src=True):
+        target = resolve(page, str(tag["src"]))
+        if target is not None:
+            assets.add(target)
+    for link in soup.find_all("link", href=True):
+        rel = [token.lower() for token in link.get("rel") or []]
+        if "icon" in rel:
+            target = resolve(page, str(link["href"]))
+            if target is not None:
+                assets.add(target)
+    return assets - pages
+
+
+def measure(
+    docs_dir: Path, path: Path, stylesheets: Stylesheets, pages: set[str], sizes: dict[str, int]
+) -> PageWeight:
+    page = path.relative_to(docs_dir).as_posix()
+    soup = BeautifulSoup(load_html(path), "html.parser")
+    asset_bytes = 0
+    for asset in local_assets(soup, page, stylesheets, pages):
+        if asset not in sizes:
+            asset_path = docs_dir / asset
+            sizes[asset] = asset_path.stat().st_size if asset_path.is_file() else 0
+        asset_bytes += sizes[asset]
+    matches, unknown = find_third_party(soup, DEFAULT_POLICY)
+    external_requests, external_bytes, _vendors = count_requests(matches, unknown)
+    blocking = blocking_resources(soup, page)
+    return PageWeight(
+        page,
+        page_template(docs_dir, path),
+        {
+            "html_bytes": path.stat().st_size,
+            "asset_bytes": asset_bytes,
+            "external_requests": external_requests,
+            "external_bytes": external_bytes,
+            "blocking_head": len(blocking),
+        },
+        blocking,
+    )
+
+
+def over_budget(weight: PageWeight, budgets: dict[str, dict[str, int]]) -> list[tuple[float, str]]:
+    limits = budgets.get(weight.template, {})
+    over: list[tuple[float, str]] = []
+    for name, limit in limits.items():
+        value = weight.metrics[name]
+        if value > limit:
+            over.append((value / limit if limit else float("inf"), name))
+    return sorted(over, reverse=True)
+
+
+def run_check(docs_dir: Path, budgets_path: Path | None, top: int) -> int:
+    try:
+        budgets = load_budgets(budgets_path)
+        paths = html_files(docs_dir)
+        pages = {path.relative_to(docs_dir).as_posix() for path in paths}
+        stylesheets = Stylesheets(docs_dir)
+        sizes: dict[str, int] = {}
+        weights = [measure(docs_dir, path, stylesheets, pages, sizes) for path in paths]
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+    by_template: dict[str, list[PageWeight]] = defaultdict(list)
+    for weight in weights:
+        by_template[weight.template].append(weight)
+    for template, group in sorted(by_template.items()):
+        summary = ", ".join(
+            f"{name}_p50={int(statistics.median(w.metrics[name] for w in group))}"
+            f"/max={max(w.metrics[name] for w in group)}"
+            for name in METRICS
+        )
+        print(f"CHECK {template}: pages={len(group)}, {summary}")
+
+    blocking = Counter(name for weight in weights for name in weight.blocking)
+    for name, count in blocking.most_common():
+        print(f"CHECK blocking {name}: pages={count}")
+
+    offenders = [(over, weight) for weight in weights if (over := over_budget(weight, budgets))]
+    offenders.sort(key=lambda item: (item[0][0][0], item[1].page), reverse=True)
+    for rank, (over, weight) in enumerate(offenders[:top], start=1):
+        details = ", ".join(
+            f"{name}={weight.metrics[name]}>{budgets[weight.template][name]} (x{ratio:.2f})"
+            for ratio, name in over
+        )
+        if "blocking_head" in {name for _ratio, name in over}:
+            details += f" [{' '.join(weight.blocking)}]"
+        print(f"OVER #{rank} {weight.page}: {details}")
+    print(
+        f"CHECK {docs_dir}: pages={len(weights)}, over_budget={len(offenders)}, "
+        f"shown={min(top, len(offenders))}"
+    )
+    return EXIT_OVER_BUDGET if offenders else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Audit page weight of the docs directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="report weights and enforce budgets")
+    parser_check.add_argument("docs_dir", type=Path, help="docs root directory")
+    parser_check.add_argument("--budgets", type=Path, default=None, help="budget override JSON")
+    parser_check.add_argument(
+        "--top", type=int, default=DEFAULT_TOP, help="offenders to list (worst first)"
+    )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir, args.budgets, args.top)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
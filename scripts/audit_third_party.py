@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""Audit third-party scripts/iframes and apply a remove/defer/facade policy.
+
+Pages load several third-party resources: gtag.js, legacy ga.js, adsbygoogle,
+the Facebook SDK, Twitter widgets.js, the Hatena bookmark button and
+google/code-prettify. Some are external `<script src>` tags, others are inline
+loaders that inject the script from JavaScript.
+
+Target example:
+<script>(function(d, s, id) { ... js.src = "//connect.facebook.net/ja_JP/all.js#xfbml=1"; ... }(document, 'script', 'facebook-jssdk'));</script>
+
+Policy actions (per vendor):
+- keep: leave as-is
+- remove: drop every script of the vendor (and its inline config)
+- defer: external scripts get `defer` instead of `async`; inline loaders run
+  on window `load`
+- facade: the loader is replaced by a click-to-load button placed after the
+  vendor's widget markup; pages without widget markup drop the vendor
+
+The default policy is DEFAULT_POLICY below; `--policy <json>` overrides it,
+e.g. {"adsense": {"action": "remove"}, "gtag": {"action": "keep"}}.
+Resources inside conditional comments (html5shim for IE<9) are not parsed as
+elements and are never touched.
+
+Usage:
+- check <file>: report third-party requests and what the policy would do
+- convert <file>: apply the policy in-place
+- audit <docs_dir>: inventory every external script/iframe across the site
+- apply <docs_dir>: apply the policy to every page and report per-page
+  request counts and bytes before vs after
+
+Notes:
+- 0 matches is not an error.
+- bytes are estimated transfer sizes per vendor (`bytes` in the policy).
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+
+from docs_files import save_html
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+ACTIONS = ("keep", "remove", "defer", "facade")
+FACADE_CLASS = "third-party-facade"
+EXTERNAL_URL_RE = re.compile(r"^(?:https?:)?//", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Vendor:
+    name: str
+    action: str
+    # Substrings of a script src / inline loader that fetch the vendor script.
+    patterns: tuple[str, ...]
+    # Substrings of inline scripts that only configure the vendor.
+    inline_markers: tuple[str, ...] = ()
+    # Widget markup the facade button is placed after.
+    widget_selector: str = ""
+    facade_label: str = ""
+    bytes: int = 0
+
+
+DEFAULT_POLICY: tuple[Vendor, ...] = (
+    Vendor(
+        "gtag",
+        "defer",
+        ("googletagmanager.com/gtag/js",),
+        inline_markers=("gtag('config'",),
+        bytes=98_000,
+    ),
+    # Universal Analytics stopped processing data in 2023.
+    Vendor(
+        "google-analytics",
+        "remove",
+        ("google-analytics.com/ga.js",),
+        inline_markers=("_gaq.push",),
+        bytes=17_000,
+    ),
+    Vendor("adsense", "defer", ("pagead2.googlesyndication.com/",), bytes=60_000),
+    Vendor(
+        "facebook",
+        "facade",
+        ("connect.facebook.net/",),
+        widget_selector="div.fb-like",
+        facade_label="Facebookを表示",
+        bytes=85_000,
+    ),
+    Vendor(
+        "twitter",
+        "facade",
+        ("platform.twitter.com/widgets.js",),
+        widget_selector="a.twitter-timeline, a.twitter-share-button",
+        facade_label="Twitterを表示",
+        bytes=32_000,
+    ),
+    # The bookmark anchor already contains a static button image and link.
+    Vendor("hatena", "remove", ("b.st-hatena.com/js/",), bytes=6_000),
+    Vendor("prettify", "defer", ("google/code-prettify@",), bytes=16_000),
+)
+
+
+@dataclass
+class PageAudit:
+    requests_before: int
+    requests_after: int
+    bytes_before: int
+    bytes_after: int
+    vendors: Counter[str]
+    unknown: list[str]
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def load_policy(policy_path: Path | None) -> tuple[Vendor, ...]:
+    if policy_path is None:
+        return DEFAULT_POLICY
+    overrides = json.loads(policy_path.read_text(encoding="utf-8"))
+    if not isinstance(overrides, dict):
+        raise ValueError("policy must be a JSON object keyed by vendor name")
+
+    vendors = {vendor.name: vendor for vendor in DEFAULT_POLICY}
+    for name, fields in overrides.items():
+        if not isinstance(fields, dict):
+            raise ValueError(f"policy for {name} must be an object")
+        if "patterns" in fields:
+            fields = {**fields, "patterns": tuple(fields["patterns"])}
+        if "inline_markers" in fields:
+            fields = {**fields, "inline_markers": tuple(fields["inline_markers"])}
+        if name in vendors:
+            vendors[name] = replace(vendors[name], **fields)
+        else:
+            vendors[name] = Vendor(name=name, **fields)
+
+    for vendor in vendors.values():
+        if vendor.action not in ACTIONS:
+            raise ValueError(f"unknown action for {vendor.name}: {vendor.action}")
+    return tuple(vendors.values())
+
+
+def external_src(tag: Tag) -> str | None:
+    src = tag.get("src")
+    if isinstance(src, str) and EXTERNAL_URL_RE.match(src):
+        return src
+    return None
+
+
+def match_vendor(tag: Tag, policy: tuple[Vendor, ...]) -> tuple[Vendor, str | None] | None:
+    """Return the vendor of ``tag`` and the pattern it requests (None: config only)."""
+    text = external_src(tag) or (tag.string or "" if tag.name == "script" else "")
+    for vendor in policy:
+        for pattern in vendor.patterns:
+            if pattern in text:
+                return vendor, pattern
+    if tag.name == "script" and tag.string:
+        for vendor in policy:
+            if any(marker in tag.string for marker in vendor.inline_markers):
+                return vendor, None
+    return None
+
+
+def find_third_party(
+    soup: BeautifulSoup, policy: tuple[Vendor, ...]
+) -> tuple[list[tuple[Tag, Vendor, str | None]], list[str]]:
+    matches: list[tuple[Tag, Vendor, str | None]] = []
+    unknown: list[str] = []
+    for tag in soup.find_all(["script", "iframe"]):
+        if not isinstance(tag, Tag) or tag.has_attr("data-facade"):
+            continue
+        matched = match_vendor(tag, policy)
+        if matched is not None:
+            matches.append((tag, *matched))
+            continue
+        src = external_src(tag)
+        if src is not None:
+            unknown.append(src)
+    return matches, unknown
+
+
+def count_requests(
+    matches: list[tuple[Tag, Vendor, str | None]], unknown: list[str]
+) -> tuple[int, int, Counter[str]]:
+    # Loaders guarded by the same element id only fetch once per page.
+    requested = {(vendor.name, pattern) for _tag, vendor, pattern in matches if pattern}
+    vendors = Counter(name for name, _pattern in requested)
+    size = sum(
+        vendor.bytes for vendor in {vendor for _tag, vendor, pattern in matches if pattern}
+    )
+    return len(requested) + len(set(unknown)), size, vendors
+
+
+def facade_loader(tag: Tag) -> str:
+    src = external_src(tag)
+    if src is not None:
+        return (
+            "var s=document.createElement('script');"
+            f"s.src={json.dumps(src)};s.async=true;document.body.appendChild(s);"
+        )
+    return tag.string or ""
+
+
+def apply_defer(tag: Tag) -> bool:
+    if external_src(tag) is not None:
+        if tag.has_attr("defer") and not tag.has_attr("async"):
+            return False
+        del tag["async"]
+        tag["defer"] = ""
+        return True
+    code = tag.string or ""
+    if code.lstrip().startswith("window.addEventListener('load'"):
+        return False
+    tag.string = f"window.addEventListener('load', function() {{{code}}});"
+    return True
+
+
+def apply_facade(
+    soup: BeautifulSoup, vendor: Vendor, tags: list[tuple[Tag, str | None]]
+) -> bool:
+    loaders = [tag for tag, pattern in tags if pattern]
+    widget = soup.select_one(vendor.widget_selector) if vendor.widget_selector else None
+    if loaders and isinstance(widget, Tag):
+        facade_id = f"facade-{vendor.name}"
+        button = soup.new_tag("button", id=facade_id, type="button")
+        button["class"] = ["btn", "btn-mini", FACADE_CLASS]
+        button.string = vendor.facade_label or vendor.name
+        script = soup.new_tag("script")
+        script["data-facade"] = vendor.name
+        script.string = (
+            f"document.getElementById('{facade_id}').onclick = function() {{"
+            f"this.parentNode.removeChild(this);{facade_loader(loaders[0])}}};"
+        )
+        widget.insert_after(button)
+        button.insert_after(script)
+    for tag, _pattern in tags:
+        tag.decompose()
+    return bool(tags)
+
+
+def apply_policy(soup: BeautifulSoup, policy: tuple[Vendor, ...]) -> tuple[PageAudit, int]:
+    matches, unknown = find_third_party(soup, policy)
+    before, bytes_before, vendors_before = count_requests(matches, unknown)
+
+    grouped: dict[str, list[tuple[Tag, str | None]]] = {}
+    by_name = {vendor.name: vendor for vendor in policy}
+    for tag, vendor, pattern in matches:
+        grouped.setdefault(vendor.name, []).append((tag, pattern))
+
+    changed = 0
+    for name, tags in grouped.items():
+        vendor = by_name[name]
+        if vendor.action == "remove":
+            for tag, _pattern in tags:
+                tag.decompose()
+            changed += len(tags)
+        elif vendor.action == "defer":
+            changed += sum(1 for tag, pattern in tags if pattern and apply_defer(tag))
+        elif vendor.action == "facade":
+            changed += len(tags) if apply_facade(soup, vendor, tags) else 0
+
+    after_matches, after_unknown = find_third_party(soup, policy)
+    after, bytes_after, _vendors_after = count_requests(after_matches, after_unknown)
+    audit = PageAudit(before, after, bytes_before, bytes_after, vendors_before, unknown)
+    return audit, changed
+
+
+def format_audit(audit: PageAudit) -> str:
+    return (
+        f"requests={audit.requests_before}->{audit.requests_after}, "
+        f"bytes={audit.bytes_before}->{audit.bytes_after}"
+    )
+
+
+def run_check(file_path: Path, policy: tuple[Vendor, ...]) -> int:
+    try:
+        soup = BeautifulSoup(load_html(file_path), "html.parser")
+        audit, changed = apply_policy(soup, policy)
+        vendors = ",".join(sorted(audit.vendors)) or "-"
+        print(f"CHECK {file_path}: {format_audit(audit)}, changes={changed}, vendors={vendors}")
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def apply_convert(
+    soup: BeautifulSoup, policy: tuple[Vendor, ...] = DEFAULT_POLICY
+) -> tuple[int, int, str]:
+    audit, changed = apply_policy(soup, policy)
+    return EXIT_OK, changed, f"{format_audit(audit)}, changes={changed}"
+
+
+def run_convert(file_path: Path, policy: tuple[Vendor, ...]) -> int:
+    try:
+        soup = BeautifulSoup(load_html(file_path), "html.parser")
+        status, changes, summary = apply_convert(soup, policy)
+        if changes:
+            save_html(file_path, str(soup))
+        print(f"CONVERT {file_path}: {summary}")
+        return status
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: convert failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_site(docs_dir: Path, policy: tuple[Vendor, ...], write: bool) -> int:
+    command = "APPLY" if write else "AUDIT"
+    try:
+        pages = 0
+        totals = [0, 0, 0, 0]
+        vendor_pages: Counter[str] = Counter()
+        unknown_pages: Counter[str] = Counter()
+
+        for html_path in sorted(docs_dir.rglob("*.html")):
+            html = load_html(html_path)
+            soup = BeautifulSoup(html, "html.parser")
+            audit, changed = apply_policy(soup, policy)
+            pages += 1
+            vendor_pages.update(audit.vendors.keys())
+            unknown_pages.update(set(audit.unknown))
+            for index, value in enumerate(
+                (audit.requests_before, audit.requests_after, audit.bytes_before, audit.bytes_after)
+            ):
+                totals[index] += value
+            if write and changed:
+                save_html(html_path, str(soup))
+            print(f"{command} {html_path}: {format_audit(audit)}, changes={changed}")
+
+        by_name = {vendor.name: vendor for vendor in policy}
+        for name, count in sorted(vendor_pages.items()):
+            print(f"VENDOR {name}: pages={count}, action={by_name[name].action}")
+        for src, count in sorted(unknown_pages.items()):
+            print(f"VENDOR unknown {src}: pages={count}, action=keep")
+        print(
+            f"{command} {docs_dir}: pages={pages}, requests={totals[0]}->{totals[1]}, "
+            f"bytes={totals[2]}->{totals[3]}"
+        )
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: {command.lower()} failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Audit third-party scripts/iframes and apply a remove/defer/facade policy"
+    )
+    parser.add_argument("--policy", type=Path, default=None, help="JSON policy overrides")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="report third-party requests")
+    parser_check.add_argument("file", type=Path, help="target HTML file path")
+
+    parser_convert = subparsers.add_parser("convert", help="apply the policy in-place")
+    parser_convert.add_argument("file", type=Path, help="target HTML file path")
+
+    parser_audit = subparsers.add_parser("audit", help="inventory the whole site")
+    parser_audit.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    parser_apply = subparsers.add_parser("apply", help="apply the policy to the whole site")
+    parser_apply.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    try:
+        policy = load_policy(args.policy)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: invalid policy: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command in ("audit", "apply"):
+        docs_dir: Path = args.docs_dir
+        if not docs_dir.is_dir():
+            print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+            return EXIT_ERROR
+        return run_site(docs_dir, policy, write=args.command == "apply")
+
+    file_path: Path = args.file
+    if not file_path.exists() or not file_path.is_file():
+        print(f"ERROR: file not found: {file_path}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(file_path, policy)
+    if args.command == "convert":
+        return run_convert(file_path, policy)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""Check/build docs/ with a make-like scheduler over the build scripts.
+
+The build steps used to be run one at a time by hand, and their order
+matters: the registered transforms (transforms.py, applied by
+run_transforms.py in pipeline order, so insert_all_content_menu_item runs
+after the Cobol item exists and link conversion precedes everything that
+reads links) come before the site-level builds, stylesheets have to be final
+before purge_css.py, and the archive is created last.
+
+Every node in NODES declares:
+- inputs / outputs: glob patterns under docs_dir (in-place steps list the
+  same files in both)
+- after: nodes that have to finish first
+- the script it runs; the stamp covers that script and the sibling modules
+  it imports, so editing purge_css.py rebuilds every node using it
+
+Staleness:
+- a node is stale when it never ran, its command or scripts changed, an
+  input file changed (size/mtime) since the last build, an output is
+  missing, or a node it runs after is stale
+- stamps are taken at the end of a build, after every node ran, so files
+  rewritten by later in-place steps do not make earlier steps stale
+- state is kept in .cache/build.json (`--state`)
+
+Independent stale nodes run in parallel (`--jobs`, default: all cores);
+when a node fails, the nodes after it are skipped.
+
+Usage:
+- check <docs_dir> [target ...]: list the nodes and why they are stale
+- build <docs_dir> [target ...] [--jobs N] [--force] [--verbose]:
+  rebuild stale nodes (default target: archive)
+
+Exit codes:
+- 0: success
+- 3: processing error (a node failed, unknown target, state read/write failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+from docs_files import save_text
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_STATE = SCRIPTS_DIR.parent / ".cache" / "build.json"
+DEFAULT_TARGETS = ("archive",)
+IMPORT_RE = re.compile(r"^(?:from\s+(\w+)\s+import|import\s+(\w+))", re.MULTILINE)
+OUTPUT_TAIL = 20
+
+
+@dataclass(frozen=True)
+class Node:
+    name: str
+    # "{docs}" is replaced by the docs directory; .py scripts run with this Python.
+    command: tuple[str, ...]
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...] = ()
+    after: tuple[str, ...] = ()
+
+    def argv(self, docs_dir: Path) -> list[str]:
+        argv = [arg.replace("{docs}", str(docs_dir)) for arg in self.command]
+        script = SCRIPTS_DIR / argv[0]
+        if script.suffix == ".py":
+            return [sys.executable, str(script), *argv[1:]]
+        return ["bash", str(script), *argv[1:]]
+
+
+NODES: tuple[Node, ...] = (
+    Node(
+        "transforms",
+        ("run_transforms.py", "apply", "{docs}"),
+        inputs=("**/*.html",),
+        outputs=("**/*.html",),
+    ),
+    Node(
+        "highlight_css",
+        ("highlight_code_blocks.py", "stylesheet", "{docs}"),
+        inputs=(),
+        outputs=("css/highlight.css",),
+    ),
+    Node(
+        "images",
+        ("optimize_images.py", "optimize", "{docs}"),
+        inputs=("img/**/*", "css/*.css"),
+        outputs=("img/**/*",),
+    ),
+    Node(
+        "listings",
+        ("paginate_listings.py", "build", "{docs}"),
+        inputs=("view/*.html", "lang/*.html"),
+        outputs=("lang/*.html", "lang/*.json"),
+        after=("transforms",),
+    ),
+    Node(
+        "feeds",
+        ("generate_feeds.py", "build", "{docs}"),
+        inputs=("**/*.html",),
+        outputs=("rss", "sitemap.xml"),
+        # Reads every page; sidebar rewrites them all.
+        after=("sidebar",),
+    ),
+    Node(
+        "sidebar",
+        ("share_sidebar_fragment.py", "build", "{docs}"),
+        inputs=("**/*.html",),
+        outputs=("fragments/sidebar.txt", "js/fragments.js"),
+        after=("listings",),
+    ),
+    Node(
+        "prerender",
+        ("prerender_widgets.py", "build", "{docs}"),
+        inputs=("**/*.html", "js/app.js"),
+        after=("sidebar",),
+    ),
+    Node(
+        "bundle_js",
+        ("bundle_javascript.py", "build", "{docs}"),
+        inputs=("**/*.html", "js/*.js"),
+        outputs=("js/bundle.js",),
+        after=("prerender",),
+    ),
+    Node(
+        "inline_assets",
+        ("inline_small_assets.py", "build", "{docs}"),
+        inputs=("**/*.html", "css/*.css", "img/**/*"),
+        after=("bundle_js", "images"),
+    ),
+    Node(
+        "lazy_media",
+        ("lazy_load_media.py", "build", "{docs}"),
+        inputs=("**/*.html", "img/**/*"),
+        after=("inline_assets",),
+    ),
+    Node(
+        "purge_css",
+        ("purge_css.py", "build", "{docs}"),
+        inputs=("**/*.html", "css/*.css"),
+        outputs=("css/*.purged.css",),
+        after=("lazy_media", "highlight_css"),
+    ),
+    Node(
+        "resource_hints",
+        ("inject_resource_hints.py", "build", "{docs}"),
+        inputs=("**/*.html", "css/*.css"),
+        after=("purge_css",),
+    ),
+    Node(
+        "service_worker",
+        ("generate_service_worker.py", "build", "{docs}"),
+        inputs=("**/*.html", "css/*", "js/*", "img/**/*", "lang/*.json"),
+        outputs=("sw.js", "precache-manifest.json"),
+        after=("resource_hints",),
+    ),
+    Node(
+        "archive",
+        ("create-zip.sh", "{docs}"),
+        inputs=("**/*",),
+        outputs=("../docs.zip",),
+        after=("service_worker", "feeds"),
+    ),
+    Node(
+        "audit",
+        ("audit_page_weight.py", "check", "{docs}"),
+        inputs=("**/*",),
+        after=("service_worker",),
+    ),
+)
+
+
+def find_node(name: str) -> Node:
+    for node in NODES:
+        if node.name == name:
+            return node
+    raise KeyError(f"unknown node: {name}")
+
+
+def select(targets: list[str]) -> list[Node]:
+    """``targets`` and every node they run after, in NODES order."""
+    wanted: set[str] = set()
+    pending = list(targets)
+    while pending:
+        node = find_node(pending.pop())
+        if node.name not in wanted:
+            wanted.add(node.name)
+            pending.extend(node.after)
+    return [node for node in NODES if node.name in wanted]
+
+
+def expand(docs_dir: Path, pattern: str) -> list[Path]:
+    if any(char in pattern for char in "*?["):
+        return sorted(path for path in docs_dir.glob(pattern) if path.is_file())
+    path = docs_dir / pattern
+    return [path] if path.is_file() else []
+
+
+def script_closure(script: str) -> list[Path]:
+    """``script`` and the sibling modules it imports, recursively."""
+    seen: list[Path] = []
+    pending = [SCRIPTS_DIR / script]
+    while pending:
+        path = pending.pop()
+        if path in seen or not path.is_file():
+            continue
+        seen.append(path)
+        if path.suffix == ".py":
+            for match in IMPORT_RE.finditer(path.read_text(encoding="utf-8")):
+                pending.append(SCRIPTS_DIR / f"{match.group(1) or match.group(2)}.py")
+    return sorted(seen)
+
+
+class Fingerprints:
+    """Stamps of the files matched by a pattern, taken once per phase of a run."""
+
+    def __init__(self, docs_dir: Path) -> None:
+        self.docs_dir = docs_dir
+        self.patterns: dict[str, str] = {}
+
+    def pattern(self, pattern: str) -> str:
+        if pattern not in self.patterns:
+            digest = hashlib.sha256()
+            for path in expand(self.docs_dir, pattern):
+                if path.name.startswith("."):
+                    continue
+                stat = path.stat()
+                relative = os.path.relpath(path, self.docs_dir)
+                digest.update(f"{relative}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+            self.patterns[pattern] = digest.hexdigest()
+        return self.patterns[pattern]
+
+    def inputs(self, node: Node) -> str:
+        digest = hashlib.sha256()
+        for pattern in node.inputs:
+            digest.update(f"{pattern}\0{self.pattern(pattern)}\n".encode())
+        return digest.hexdigest()
+
+
+def scripts_stamp(node: Node) -> str:
+    digest = hashlib.sha256(json.dumps(node.command).encode("utf-8"))
+    for path in script_closure(node.command[0]):
+        digest.update(path.name.encode("utf-8") + b"\0" + path.read_bytes())
+    return digest.hexdigest()
+
+
+def load_state(state_path: Path, docs_dir: Path) -> dict[str, dict[str, str]]:
+    if not state_path.is_file():
+        return {}
+    state = json.loads(state_path.read_text(encoding="utf-8"))
+    if state.get("docs_dir") != str(docs_dir.resolve()):
+        return {}
+    return state.get("nodes", {})
+
+
+def save_state(state_path: Path, docs_dir: Path, nodes: dict[str, dict[str, str]]) -> None:
+    state = {"docs_dir": str(docs_dir.resolve()), "nodes": nodes}
+    save_text(state_path, json.dumps(state, indent=1, sort_keys=True) + "\n")
+
+
+def stale_reasons(
+    docs_dir: Path,
+    nodes: list[Node],
+    stamps: dict[str, dict[str, str]],
+    fingerprints: Fingerprints,
+    force: bool,
+) -> dict[str, str]:
+    """Reason per stale node (nodes missing from the result are up to date)."""
+    reasons: dict[str, str] = {}
+    for node in nodes:
+        stamp = stamps.get(node.name)
+        upstream = [name for name in node.after if name in reasons]
+        if force:
+            reasons[node.name] = "forced"
+        elif stamp is None:
+            reasons[node.name] = "never built"
+        elif stamp.get("scripts") != scripts_stamp(node):
+            reasons[node.name] = "scripts changed"
+        elif stamp.get("inputs") != fingerprints.inputs(node):
+            reasons[node.name] = "inputs changed"
+        elif any(not expand(docs_dir, pattern) for pattern in node.outputs):
+            reasons[node.name] = "outputs missing"
+        elif upstream:
+            reasons[node.name] = f"after {','.join(upstream)}"
+    return reasons
+
+
+def run_node(node: Node, docs_dir: Path) -> tuple[int, str, float]:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        node.argv(docs_dir),
+        cwd=SCRIPTS_DIR.parent,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        check=False,
+    )
+    return completed.returncode, completed.stdout, time.perf_counter() - started
+
+
+def schedule(
+    docs_dir: Path, nodes: list[Node], stale: dict[str, str], jobs: int, verbose: bool
+) -> tuple[set[str], set[str]]:
+    """Run the stale nodes, each once every node it runs after succeeded.
+
+    Returns the names of the nodes that failed and of those that were skipped.
+    """
+    done: set[str] = {node.name for node in nodes if node.name not in stale}
+    failed: set[str] = set()
+    skipped: set[str] = set()
+    waiting = [node for node in nodes if node.name in stale]
+    running: dict[Future[tuple[int, str, float]], Node] = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while waiting or running:
+            for node in list(waiting):
+                if any(name in failed or name in skipped for name in node.after):
+                    waiting.remove(node)
+                    skipped.add(node.name)
+                    print(f"BUILD {node.name}: status=skipped, reason=upstream failed")
+                elif all(name in done for name in node.after):
+                    waiting.remove(node)
+                    running[pool.submit(run_node, node, docs_dir)] = node
+            if not running:
+                continue
+            finished, _pending = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = running.pop(future)
+                code, output, seconds = future.result()
+                ok = code == 0
+                (done if ok else failed).add(node.name)
+                print(
+                    f"BUILD {node.name}: status={'ok' if ok else 'failed'}, exit={code}, "
+                    f"reason={stale[node.name]}, seconds={seconds:.2f}"
+                )
+                lines = output.splitlines()
+                if verbose:
+                    shown = lines
+                elif not ok:
+                    shown = lines[-OUTPUT_TAIL:]
+                else:
+                    shown = []
+                for line in shown:
+                    print(f"  {line}")
+    return failed, skipped
+
+
+def run_check(docs_dir: Path, targets: list[str], state_path: Path) -> int:
+    try:
+        nodes = select(targets)
+        stamps = load_state(state_path, docs_dir)
+        stale = stale_reasons(docs_dir, nodes, stamps, Fingerprints(docs_dir), force=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+    for node in nodes:
+        after = ",".join(node.after) or "-"
+        if node.name in stale:
+            print(f"CHECK {node.name}: status=stale, reason={stale[node.name]}, after={after}")
+        else:
+            print(f"CHECK {node.name}: status=fresh, after={after}")
+    print(f"CHECK {docs_dir}: nodes={len(nodes)}, stale={len(stale)}")
+    return EXIT_OK
+
+
+def run_build(
+    docs_dir: Path, targets: list[str], state_path: Path, jobs: int, force: bool, verbose: bool
+) -> int:
+    try:
+        nodes = select(targets)
+        stamps = load_state(state_path, docs_dir)
+        stale = stale_reasons(docs_dir, nodes, stamps, Fingerprints(docs_dir), force)
+        started = time.perf_counter()
+        failed, skipped = schedule(docs_dir, nodes, stale, jobs, verbose)
+
+        fingerprints = Fingerprints(docs_dir)
+        for node in nodes:
+            if node.name not in failed and node.name not in skipped:
+                stamps[node.name] = {
+                    "scripts": scripts_stamp(node),
+                    "inputs": fingerprints.inputs(node),
+                }
+            else:
+                stamps.pop(node.name, None)
+        save_state(state_path, docs_dir, stamps)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+    print(
+        f"BUILD {docs_dir}: nodes={len(nodes)}, rebuilt={len(stale) - len(failed | skipped)}, "
+        f"fresh={len(nodes) - len(stale)}, failed={len(failed)}, skipped={len(skipped)}, "
+        f"seconds={time.perf_counter() - started:.2f}"
+    )
+    if failed:
+        print(f"ERROR: build failed: {','.join(sorted(failed))}", file=sys.stderr)
+        return EXIT_ERROR
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Check/build docs with the build scheduler")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "list nodes and why they are stale"),
+        ("build", "rebuild stale nodes, independent ones in parallel"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("docs_dir", type=Path, help="docs root directory")
+        subparser.add_argument(
+            "targets",
+            nargs="*",
+            default=list(DEFAULT_TARGETS),
+            help=f"nodes to bring up to date ({', '.join(node.name for node in NODES)})",
+        )
+        subparser.add_argument("--state", type=Path, default=DEFAULT_STATE, help="state file")
+        if command == "build":
+            subparser.add_argument(
+                "--jobs", type=int, default=os.cpu_count() or 1, help="parallel nodes"
+            )
+            subparser.add_argument("--force", action="store_true", help="rebuild every node")
+            subparser.add_argument(
+                "--verbose", action="store_true", help="print the output of every node"
+            )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+    unknown = [name for name in args.targets if name not in {node.name for node in NODES}]
+    if unknown:
+        print(f"ERROR: unknown target: {', '.join(unknown)}", file=sys.stderr)
+        return EXIT_ERROR
+    if args.command == "build" and shutil.which("zip") is None and "archive" in {
+        node.name for node in select(args.targets)
+    }:
+        print("ERROR: zip not found on PATH (needed by create-zip.sh)", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir, args.targets, args.state)
+    if args.command == "build":
+        return run_build(
+            docs_dir, args.targets, args.state, args.jobs, args.force, args.verbose
+        )
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Build pipeline metrics: OpenMetrics text, JSON summary and slowdown check.
+
+Pipeline scripts (run_transforms, optimize_images, generate_feeds) record
+counters and latency histograms in a `BuildMetrics` and call `write()` at the
+end of every run. Each run writes to .cache/metrics:
+
+- `<job>.prom`: OpenMetrics text exposition (`# UNIT`, `# EOF`); scrape it
+  as OpenMetrics. node_exporter's textfile collector only reads the plain
+  Prometheus text format and rejects these files
+- `<job>.json`: JSON summary (counters, histogram percentiles, cache hit rate)
+- `history.jsonl`: one summary line appended per run
+
+Usage:
+- check [--job NAME] [--window 10] [--factor 1.5]: compare the latest run
+  of each job with the median of the previous runs (seconds per page)
+
+Exit codes:
+- 0: success (no slowdown)
+- 1: latest run is slower than `--factor` x baseline
+- 3: processing error (read/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from docs_files import save_text
+
+EXIT_OK = 0
+EXIT_SLOW = 1
+EXIT_ERROR = 3
+
+DEFAULT_METRICS_DIR = Path(__file__).resolve().parent.parent / ".cache" / "metrics"
+HISTORY_NAME = "history.jsonl"
+METRIC_PREFIX = "unkode_build"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels) + "}"
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+class BuildMetrics:
+    """Counters and histograms of one pipeline run, labelled by ``job``."""
+
+    def __init__(self, job: str) -> None:
+        self.job = job
+        self.started = time.time()
+        self._started_perf = time.perf_counter()
+        self.counters: dict[str, dict[Labels, float]] = defaultdict(dict)
+        self.histograms: dict[str, dict[Labels, list[float]]] = defaultdict(dict)
+        self.help: dict[str, str] = {}
+
+    def _labels(self, labels: dict[str, str]) -> Labels:
+        return (("job", self.job), *sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels: str) -> None:
+        series = self.counters[name]
+        key = self._labels(labels)
+        series[key] = series.get(key, 0) + value
+        self.help.setdefault(name, help_text)
+
+    def observe(self, name: str, seconds: float, help_text: str = "", **labels: str) -> None:
+        self.histograms[name].setdefault(self._labels(labels), []).append(seconds)
+        self.help.setdefault(name, help_text)
+
+    def cache_lookup(self, cache: str, hit: bool, count: int = 1) -> None:
+        self.inc(
+            "cache_lookups",
+            count,
+            help_text="cache lookups by result",
+            cache=cache,
+            result="hit" if hit else "miss",
+        )
+
+    def openmetrics(self, duration: float) -> str:
+        lines: list[str] = []
+        job = format_labels(self._labels({}))
+        for name, series in sorted(self.counters.items()):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            if self.help.get(name):
+                lines.append(f"# HELP {metric} {self.help[name]}")
+            for labels, value in sorted(series.items()):
+                number = int(value) if float(value).is_integer() else value
+                lines.append(f"{metric}_total{format_labels(labels)} {number}")
+        for name, series in sorted(self.histograms.items()):
+            metric = f"{METRIC_PREFIX}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            lines.append(f"# UNIT {metric} seconds")
+            if self.help.get(name):
+                lines.append(f"# HELP {metric} {self.help[name]}")
+            for labels, values in sorted(series.items()):
+                for bound in LATENCY_BUCKETS:
+                    count = sum(value <= bound for value in values)
+                    bucket = format_labels((*labels, ("le", f"{bound:g}")))
+                    lines.append(f"{metric}_bucket{bucket} {count}")
+                bucket = format_labels((*labels, ("le", "+Inf")))
+                lines.append(f"{metric}_bucket{bucket} {len(values)}")
+                lines.append(f"{metric}_sum{format_labels(labels)} {sum(values):.6f}")
+                lines.append(f"{metric}_count{format_labels(labels)} {len(values)}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_duration_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_duration_seconds{job} {duration:.6f}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds{job} {self.started:.3f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, duration: float) -> dict[str, object]:
+        def key(name: str, labels: Labels) -> str:
+            return f"{name}{format_labels(tuple(item for item in labels if item[0] != 'job'))}"
+
+        counters = {
+            key(name, labels): value
+            for name, series in sorted(self.counters.items())
+            for labels, value in sorted(series.items())
+        }
+        histograms = {
+            key(name, labels): {
+                "count": len(values),
+                "sum": round(sum(values), 6),
+                "p50": round(percentile(values, 0.5), 6),
+                "p95": round(percentile(values, 0.95), 6),
+                "max": round(max(values), 6),
+            }
+            for name, series in sorted(self.histograms.items())
+            for labels, values in sorted(series.items())
+        }
+        lookups: dict[str, dict[str, float]] = defaultdict(lambda: {"hit": 0, "miss": 0})
+        for labels, value in self.counters.get("cache_lookups", {}).items():
+            label_map = dict(labels)
+            lookups[label_map["cache"]][label_map["result"]] += value
+        hit_rate = {
+            cache: round(counts["hit"] / (counts["hit"] + counts["miss"]), 4)
+            for cache, counts in sorted(lookups.items())
+            if counts["hit"] + counts["miss"]
+        }
+        pages = sum(self.counters.get("pages", {}).values())
+        return {
+            "job": self.job,
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "duration_seconds": round(duration, 6),
+            "pages": pages,
+            "seconds_per_page": round(duration / pages, 6) if pages else None,
+            "cache_hit_rate": hit_rate,
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def write(self, metrics_dir: Path = DEFAULT_METRICS_DIR) -> Path:
+        duration = time.perf_counter() - self._started_perf
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        summary = self.summary(duration)
+        save_text(metrics_dir / f"{self.job}.prom", self.openmetrics(duration))
+        save_text(
+            metrics_dir / f"{self.job}.json",
+            json.dumps(summary, indent=2, ensure_ascii=False) + "\n",
+        )
+        with (metrics_dir / HISTORY_NAME).open("a", encoding="utf-8") as history:
+            history.write(json.dumps(summary, ensure_ascii=False, sort_keys=True) + "\n")
+        return metrics_dir / f"{self.job}.prom"
+
+
+def load_history(metrics_dir: Path) -> dict[str, list[dict[str, object]]]:
+    runs: dict[str, list[dict[str, object]]] = defaultdict(list)
+    history_path = metrics_dir / HISTORY_NAME
+    if history_path.exists():
+        for line in history_path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                run = json.loads(line)
+                runs[str(run["job"])].append(run)
+    return runs
+
+
+def run_check(metrics_dir: Path, job: str | None, window: int, factor: float) -> int:
+    try:
+        history = load_history(metrics_dir)
+        jobs = [job] if job else sorted(history)
+        slow = 0
+        for name in jobs:
+            runs = history.get(name, [])
+            # Page counts change with mirror refreshes; compare per-page cost.
+            costs = [
+                float(run["seconds_per_page"] or run["duration_seconds"]) for run in runs
+            ]
+            if len(costs) < 2:
+                print(f"CHECK {name}: runs={len(costs)}, baseline=none")
+                continue
+            latest = costs[-1]
+            baseline = statistics.median(costs[-window - 1 : -1])
+            ratio = latest / baseline if baseline else 0.0
+            status = "SLOW" if ratio > factor else "ok"
+            if ratio > factor:
+                slow += 1
+            print(
+                f"CHECK {name}: runs={len(costs)}, latest={latest:.6f}, "
+                f"baseline={baseline:.6f}, ratio={ratio:.2f}, status={status}"
+            )
+        return EXIT_SLOW if slow else EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Check build metrics history for slowdowns")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="compare the latest run with history")
+    parser_check.add_argument(
+        "--metrics-dir", type=Path, default=DEFAULT_METRICS_DIR, help="metrics directory"
+    )
+    parser_check.add_argument("--job", default=None, help="check only this job")
+    parser_check.add_argument("--window", type=int, default=10, help="previous runs in baseline")
+    parser_check.add_argument(
+        "--factor", type=float, default=1.5, help="allowed slowdown over the baseline"
+    )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.command == "check":
+        return run_check(args.metrics_dir, args.job, args.window, args.factor)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
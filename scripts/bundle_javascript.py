@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""Check/build one deferred JavaScript bundle for every HTML file under docs/.
+
+Pages load js/jquery-1.7.2.min.js in <head>, then jquery.tmpl.js,
+bootstrap.min.js and app.js at the end of <body>. app.js still carries
+handlers for the dynamic site (AJAX posts to /smell_remove/, /smell/,
+/comment_preview, /more_code, /remove_comment/ and the forms/modals behind
+them) that can never run on the static site.
+
+Analysis (top-level statements inside app.js's `$(function(){ ... })`):
+- dead: posts to a dynamic endpoint (url not ending in .html/.json/.xml/.txt)
+- dead: starts with `$('<selector>')` whose ids/classes appear on no page
+- stub: a dead `var name = ...` still referenced by live code -> `function(){}`
+- unused: a `var name = ...` no live statement references any more
+jquery.tmpl.js is bundled only when the surviving code still calls `.tmpl(`.
+
+Build:
+- js/bundle.js = jquery + (jquery.tmpl) + bootstrap + stripped app.js, with
+  comments and indentation removed from the non-minified sources
+- every page: the four <script src> tags -> one
+  <script defer src="js/bundle.js"></script> where jquery used to be
+
+Usage:
+- check <docs_dir>: report the app.js analysis and pages needing rewrite
+- build <docs_dir>: write js/bundle.js and rewrite script tags in-place
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+
+from docs_files import save_html, save_text
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+JQUERY = "js/jquery-1.7.2.min.js"
+JQUERY_TMPL = "js/jquery.tmpl.js"
+BOOTSTRAP = "js/bootstrap.min.js"
+APP = "js/app.js"
+BUNDLE = "js/bundle.js"
+BUNDLED_SCRIPTS = (JQUERY, JQUERY_TMPL, BOOTSTRAP, APP)
+
+READY_OPEN_RE = re.compile(r"\$\(\s*function\s*\(\s*\)\s*\{")
+VAR_RE = re.compile(r"var\s+([A-Za-z_$][\w$]*)")
+SUBJECT_RE = re.compile(r"\$\(\s*(['\"])(.*?)\1\s*\)")
+ENDPOINT_RE = re.compile(r"url:\s*['\"](/[^'\"]*)['\"]")
+STATIC_ENDPOINT_RE = re.compile(r"\.(html|json|xml|txt)$")
+SELECTOR_ID_RE = re.compile(r"#([\w-]+)")
+SELECTOR_CLASS_RE = re.compile(r"\.([\w-]+)")
+JS_CLASS_ATTR_RE = re.compile(r"class=\"([^\"]*)\"")
+BLOCK_KEYWORDS = ("if", "for", "while", "try", "function")
+BLOCK_CONTINUATIONS = ("else", "catch", "finally")
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def literal_end(source: str, i: int, last: str) -> int:
+    """Return the index after a string/comment/regex literal at ``i`` (or ``i``)."""
+    ch = source[i]
+    nxt = source[i + 1 : i + 2]
+    if ch in "'\"":
+        j = i + 1
+        while source[j] != ch:
+            j += 2 if source[j] == "\\" else 1
+        return j + 1
+    if ch == "/" and nxt == "/":
+        j = source.find("\n", i)
+        return len(source) if j < 0 else j
+    if ch == "/" and nxt == "*":
+        return source.index("*/", i + 2) + 2
+    if ch == "/" and (last == "" or last in REGEX_PRECEDERS):
+        j = i + 1
+        in_class = False
+        while True:
+            c = source[j]
+            if c == "\\":
+                j += 2
+                continue
+            if c == "[":
+                in_class = True
+            elif c == "]":
+                in_class = False
+            elif c == "/" and not in_class:
+                break
+            j += 1
+        j += 1
+        while j < len(source) and source[j].isalpha():
+            j += 1
+        return j
+    return i
+
+
+def is_comment(source: str, i: int) -> bool:
+    return source[i : i + 2] in ("//", "/*")
+
+
+def strip_comments(source: str) -> str:
+    return minify(source, keep_newlines=False)
+
+
+def starts_with_keyword(code: str, keywords: tuple[str, ...]) -> bool:
+    return re.match(rf"(?:{'|'.join(keywords)})\b", code) is not None
+
+
+def split_statements(body: str) -> list[str]:
+    statements: list[str] = []
+    depth = 0
+    start = 0
+    last = ""
+    i = 0
+    while i < len(body):
+        end = literal_end(body, i, last)
+        if end != i:
+            if not is_comment(body, i):
+                last = "a"
+            i = end
+            continue
+
+        ch = body[i]
+        if ch in "({[":
+            depth += 1
+        elif ch in ")}]":
+            depth -= 1
+
+        if depth == 0 and ch in ";}":
+            statement = body[start : i + 1]
+            code = strip_comments(statement).strip()
+            following = strip_comments(body[i + 1 :]).lstrip()
+            ends_block = (
+                ch == "}"
+                and starts_with_keyword(code, BLOCK_KEYWORDS)
+                and not starts_with_keyword(following, BLOCK_CONTINUATIONS)
+            )
+            if ch == ";" or ends_block:
+                statements.append(statement)
+                start = i + 1
+
+        if not ch.isspace():
+            last = ch
+        i += 1
+
+    if body[start:].strip():
+        statements.append(body[start:])
+    return statements
+
+
+def find_ready_body(source: str) -> tuple[int, int]:
+    match = READY_OPEN_RE.search(source)
+    if match is None:
+        raise ValueError(f"{APP}: $(function(){{ ... }}) not found")
+
+    depth = 1
+    last = "{"
+    i = match.end()
+    while i < len(source):
+        end = literal_end(source, i, last)
+        if end != i:
+            last = last if is_comment(source, i) else "a"
+            i = end
+            continue
+        ch = source[i]
+        if ch in "({[":
+            depth += 1
+        elif ch in ")}]":
+            depth -= 1
+            if depth == 0:
+                return match.end(), i
+        if not ch.isspace():
+            last = ch
+        i += 1
+    raise ValueError(f"{APP}: unbalanced $(function(){{ ... }})")
+
+
+def references(name: str, code: str) -> bool:
+    return re.search(rf"(?<![\w$.]){re.escape(name)}(?![\w$])", code) is not None
+
+
+def selector_present(selector: str, ids: set[str], classes: set[str]) -> bool:
+    if selector.lstrip().startswith("<"):
+        return True
+    for part in selector.split(","):
+        part_ids = SELECTOR_ID_RE.findall(part)
+        part_classes = SELECTOR_CLASS_RE.findall(part)
+        if all(i in ids for i in part_ids) and all(c in classes for c in part_classes):
+            return True
+    return False
+
+
+def dead_reason(code: str, ids: set[str], classes: set[str]) -> str | None:
+    for endpoint in ENDPOINT_RE.findall(code):
+        if not STATIC_ENDPOINT_RE.search(endpoint):
+            return f"dynamic endpoint {endpoint}"
+
+    subject = SUBJECT_RE.match(code)
+    if subject and not selector_present(subject.group(2), ids, classes):
+        return f"no page matches {subject.group(2)}"
+    return None
+
+
+def analyze_app(
+    source: str, ids: set[str], classes: set[str]
+) -> tuple[str, list[tuple[str, str]]]:
+    """Strip unreachable statements from app.js; return (source, decisions)."""
+    body_start, body_end = find_ready_body(source)
+    statements = split_statements(source[body_start:body_end])
+    codes = [strip_comments(statement).strip() for statement in statements]
+
+    # Classes created by app.js itself count as present on every page.
+    for literal_classes in JS_CLASS_ATTR_RE.findall(source):
+        classes = classes | set(literal_classes.split())
+
+    status: list[str] = []
+    reasons: list[str] = []
+    for code in codes:
+        reason = dead_reason(code, ids, classes)
+        status.append("drop" if reason else "keep")
+        reasons.append(reason or "")
+
+    changed = True
+    while changed:
+        changed = False
+        live = [code for code, state in zip(codes, status) if state != "drop"]
+        for index, code in enumerate(codes):
+            declared = VAR_RE.match(code)
+            if declared is None or status[index] == "stub":
+                continue
+            name = declared.group(1)
+            others = [other for other in live if other is not code]
+            used = any(references(name, other) for other in others)
+            if status[index] == "drop" and used:
+                status[index] = "stub"
+                changed = True
+            elif status[index] == "keep" and not used:
+                status[index] = "drop"
+                reasons[index] = f"unused {name}"
+                changed = True
+
+    kept: list[str] = []
+    decisions: list[tuple[str, str]] = []
+    for statement, code, state, reason in zip(statements, codes, status, reasons):
+        summary = code.splitlines()[0][:60] if code else ""
+        if state == "keep":
+            kept.append(statement)
+            decisions.append(("KEEP", summary))
+        elif state == "stub":
+            name = VAR_RE.match(code).group(1)  # type: ignore[union-attr]
+            kept.append(f"\n  var {name} = function(){{}};")
+            decisions.append(("STUB", f"{summary} ({reason})"))
+        else:
+            decisions.append(("DROP", f"{summary} ({reason})"))
+
+    stripped = source[:body_start] + "".join(kept) + "\n" + source[body_end:]
+    return stripped, decisions
+
+
+def minify(source: str, keep_newlines: bool = True) -> str:
+    """Drop comments (except /*! licenses */), indentation and blank lines."""
+    out: list[str] = []
+    last = ""
+    i = 0
+    while i < len(source):
+        end = literal_end(source, i, last)
+        if end != i:
+            if not is_comment(source, i):
+                out.append(source[i:end])
+                last = "a"
+            elif source[i : i + 3] == "/*!":
+                out.append(source[i:end])
+            i = end
+            continue
+        if not source[i].isspace():
+            last = source[i]
+        out.append(source[i])
+        i += 1
+
+    text = "".join(out)
+    if not keep_newlines:
+        return text
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def build_bundle(docs_dir: Path, app_source: str) -> str:
+    parts = [(docs_dir / JQUERY).read_text(encoding="utf-8")]
+    if ".tmpl(" in strip_comments(app_source):
+        parts.append(minify((docs_dir / JQUERY_TMPL).read_text(encoding="utf-8")))
+    parts.append((docs_dir / BOOTSTRAP).read_text(encoding="utf-8"))
+    parts.append(minify(app_source))
+    return ";\n".join(part.rstrip().rstrip(";") for part in parts) + ";\n"
+
+
+def find_bundled_scripts(soup: BeautifulSoup) -> list[Tag]:
+    scripts: list[Tag] = []
+    for script in soup.find_all("script", src=True):
+        src = script.get("src")
+        if isinstance(script, Tag) and isinstance(src, str) and src.endswith(BUNDLED_SCRIPTS):
+            scripts.append(script)
+    return scripts
+
+
+def has_bundle(soup: BeautifulSoup) -> bool:
+    return soup.select_one(f'script[src$="{BUNDLE}"]') is not None
+
+
+def rewrite_scripts(soup: BeautifulSoup) -> int:
+    scripts = find_bundled_scripts(soup)
+    if not scripts:
+        return 0
+
+    if not has_bundle(soup):
+        src = scripts[0].get("src")
+        prefix = src.rsplit("js/", 1)[0] if isinstance(src, str) else ""
+        bundle = soup.new_tag("script", attrs={"defer": "", "src": f"{prefix}{BUNDLE}"})
+        scripts[0].insert_before(bundle)
+    for script in scripts:
+        script.decompose()
+    return len(scripts)
+
+
+def collect_ids_and_classes(soup: BeautifulSoup, ids: set[str], classes: set[str]) -> None:
+    for tag in soup.find_all(True):
+        tag_id = tag.get("id")
+        if isinstance(tag_id, str):
+            ids.add(tag_id)
+        tag_classes = tag.get("class")
+        if isinstance(tag_classes, list):
+            classes.update(tag_classes)
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(path for path in docs_dir.rglob("*.html") if path.is_file())
+
+
+def process(docs_dir: Path, write: bool) -> int:
+    ids: set[str] = set()
+    classes: set[str] = set()
+    pages = 0
+    # Rewritten pages are held until the bundle they point at has been written.
+    pending: list[tuple[Path, str]] = []
+    for path in html_files(docs_dir):
+        soup = BeautifulSoup(load_html(path), "html.parser")
+        collect_ids_and_classes(soup, ids, classes)
+        pages += 1
+        if rewrite_scripts(soup):
+            pending.append((path, str(soup)))
+
+    app_source, decisions = analyze_app((docs_dir / APP).read_text(encoding="utf-8"), ids, classes)
+    for decision, summary in decisions:
+        print(f"{decision} {summary}")
+
+    bundle = build_bundle(docs_dir, app_source)
+    command = "BUILD" if write else "CHECK"
+    if write:
+        save_text(docs_dir / BUNDLE, bundle)
+        for path, html in pending:
+            save_html(path, html)
+    rewritten = len(pending)
+
+    before = sum((docs_dir / name).stat().st_size for name in BUNDLED_SCRIPTS)
+    dropped = sum(1 for decision, _ in decisions if decision != "KEEP")
+    print(
+        f"{command} {docs_dir}: pages={pages}, rewritten_pages={rewritten}, "
+        f"dropped_statements={dropped}, script_bytes={before}, "
+        f"bundle_bytes={len(bundle.encode('utf-8'))}"
+    )
+    return EXIT_OK
+
+
+def run_check(docs_dir: Path) -> int:
+    try:
+        return process(docs_dir, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path) -> int:
+    try:
+        return process(docs_dir, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build one deferred JavaScript bundle for the docs directory"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="report app.js analysis and pages")
+    parser_check.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    parser_build = subparsers.add_parser("build", help="write bundle and rewrite pages in-place")
+    parser_build.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir)
+    if args.command == "build":
+        return run_build(docs_dir)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
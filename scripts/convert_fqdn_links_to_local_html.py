@@ -29,6 +29,9 @@ from urllib.parse import urlsplit, urlunsplit
 
 from bs4 import BeautifulSoup, Tag
 
+from docs_files import save_html
+from prefilter import Prefilter
+
 EXIT_OK = 0
 EXIT_ERROR = 3
 
@@ -48,13 +51,17 @@ TOP_LEVEL_ROUTES = {
 LANG_ROUTE_RE = re.compile(r"^/lang/[^/]+$")
 VIEW_ROUTE_RE = re.compile(r"^/view/[A-Za-z0-9]+$")
 
+PREFILTER = Prefilter((b"unkode-mania.net",))
+
 
 def load_html(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def save_html(path: Path, html: str) -> None:
-    path.write_text(html, encoding="utf-8")
+def parse_html(path: Path) -> BeautifulSoup:
+    # An empty tree gives the same 0-match result as the full page would.
+    html = load_html(path) if PREFILTER.may_match(path.read_bytes()) else ""
+    return BeautifulSoup(html, "html.parser")
 
 
 def to_local_html_href(href: str) -> str | None:
@@ -104,7 +111,7 @@ def find_convertible_links(soup: BeautifulSoup) -> list[tuple[Tag, str, str]]:
 
 def run_check(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
+        soup = parse_html(file_path)
         matches = find_convertible_links(soup)
         print(f"CHECK {file_path}: convertible_links={len(matches)}")
         return EXIT_OK
@@ -113,17 +120,22 @@ def run_check(file_path: Path) -> int:
         return EXIT_ERROR
 
 
-def run_convert(file_path: Path) -> int:
-    try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
-        matches = find_convertible_links(soup)
+def apply_convert(soup: BeautifulSoup) -> tuple[int, int, str]:
+    matches = find_convertible_links(soup)
 
-        for anchor, _old_href, new_href in matches:
-            anchor["href"] = new_href
+    for anchor, _old_href, new_href in matches:
+        anchor["href"] = new_href
+    return EXIT_OK, len(matches), f"converted_links={len(matches)}"
 
-        save_html(file_path, str(soup))
-        print(f"CONVERT {file_path}: converted_links={len(matches)}")
-        return EXIT_OK
+
+def run_convert(file_path: Path) -> int:
+    try:
+        soup = parse_html(file_path)
+        status, changes, summary = apply_convert(soup)
+        if changes:
+            save_html(file_path, str(soup))
+        print(f"CONVERT {file_path}: {summary}")
+        return status
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: convert failed: {exc}", file=sys.stderr)
         return EXIT_ERROR
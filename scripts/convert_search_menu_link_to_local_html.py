@@ -24,19 +24,26 @@ from pathlib import Path
 
 from bs4 import BeautifulSoup, Tag
 
+from docs_files import save_html
+from prefilter import Prefilter
+
 EXIT_OK = 0
 EXIT_ERROR = 3
 
 TARGET_LI_SELECTOR = 'li[data-url_match="/search"]'
 TARGET_HREF = "/search.html"
 
+PREFILTER = Prefilter((b"/search",))
+
 
 def load_html(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def save_html(path: Path, html: str) -> None:
-    path.write_text(html, encoding="utf-8")
+def parse_html(path: Path) -> BeautifulSoup:
+    # An empty tree gives the same 0-match result as the full page would.
+    html = load_html(path) if PREFILTER.may_match(path.read_bytes()) else ""
+    return BeautifulSoup(html, "html.parser")
 
 
 def find_target_links(soup: BeautifulSoup) -> list[Tag]:
@@ -56,7 +63,7 @@ def find_target_links(soup: BeautifulSoup) -> list[Tag]:
 
 def run_check(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
+        soup = parse_html(file_path)
         links = find_target_links(soup)
         needs_update = sum(1 for a in links if a.get("href") != TARGET_HREF)
         print(
@@ -68,20 +75,25 @@ def run_check(file_path: Path) -> int:
         return EXIT_ERROR
 
 
-def run_convert(file_path: Path) -> int:
-    try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
-        links = find_target_links(soup)
+def apply_convert(soup: BeautifulSoup) -> tuple[int, int, str]:
+    links = find_target_links(soup)
 
-        converted = 0
-        for anchor in links:
-            if anchor.get("href") != TARGET_HREF:
-                anchor["href"] = TARGET_HREF
-                converted += 1
+    converted = 0
+    for anchor in links:
+        if anchor.get("href") != TARGET_HREF:
+            anchor["href"] = TARGET_HREF
+            converted += 1
+    return EXIT_OK, converted, f"converted_links={converted}, target_links={len(links)}"
 
-        save_html(file_path, str(soup))
-        print(f"CONVERT {file_path}: converted_links={converted}, target_links={len(links)}")
-        return EXIT_OK
+
+def run_convert(file_path: Path) -> int:
+    try:
+        soup = parse_html(file_path)
+        status, changes, summary = apply_convert(soup)
+        if changes:
+            save_html(file_path, str(soup))
+        print(f"CONVERT {file_path}: {summary}")
+        return status
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: convert failed: {exc}", file=sys.stderr)
         return EXIT_ERROR
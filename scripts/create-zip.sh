@@ -1,13 +1,13 @@
 #! /usr/bin/bash
 set -euo pipefail
 script_dir="$(cd "$(dirname "$0")" && pwd)"
-archive_path="$script_dir/../docs.zip"
+docs_dir="$(cd "${1:-$script_dir/../docs}" && pwd)"
+archive_path="$docs_dir/../docs.zip"
 
 if [ -f "$archive_path" ]; then
 	rm -f "$archive_path"
 fi
 
 (
-  cd $script_dir/../docs && zip -r ../docs.zip .
+  cd "$docs_dir" && zip -r ../docs.zip .
 )
-
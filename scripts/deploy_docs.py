@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""Delta-deploy docs/ to a directory or an S3-compatible bucket.
+
+scripts/create-zip.sh ships the whole 14 MB docs/ on every deploy. This
+script keeps a manifest of content hashes of the last deploy at the target
+(`.deploy-manifest.json`) and only transfers the difference:
+
+- added/changed files (sha256 differs from the manifest) are uploaded in
+  parallel (`--jobs`)
+- files in the manifest that no longer exist in docs/ are deleted; on a
+  directory target the directories this empties are removed afterwards
+- the new manifest is written last, so an interrupted deploy is redone
+  from the previous manifest on the next run
+
+Targets:
+- a directory path (a mounted share, a web root, a local stand-in)
+- s3://bucket/prefix with `--endpoint-url` (AWS S3, MinIO, R2, ...),
+  path-style requests signed with AWS Signature V4 from
+  AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY / AWS_SESSION_TOKEN and
+  `--region` (default AWS_DEFAULT_REGION or us-east-1)
+
+Dotfiles (atomic-write leftovers like `.index.html.<random>.tmp`) are never deployed.
+
+Usage:
+- check <docs_dir> <target>: dry run, list added/changed/removed files
+- deploy <docs_dir> <target> [--jobs 8]: sync the delta and the manifest
+
+Exit codes:
+- 0: success
+- 3: processing error (read/transfer failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import mimetypes
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from docs_files import replace_file
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+MANIFEST_NAME = ".deploy-manifest.json"
+DEFAULT_JOBS = 8
+DEFAULT_ENDPOINT = "https://s3.amazonaws.com"
+DEFAULT_TIMEOUT = 60.0
+CHUNK_SIZE = 1 << 20
+# Extensionless files of the site; everything else goes through mimetypes.
+CONTENT_TYPES = {"rss": "application/rss+xml", "_redirects": "text/plain"}
+
+Manifest = dict[str, dict[str, object]]
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(docs_dir: Path) -> Manifest:
+    manifest: Manifest = {}
+    for path in sorted(docs_dir.rglob("*")):
+        relative = path.relative_to(docs_dir)
+        if not path.is_file() or any(part.startswith(".") for part in relative.parts):
+            continue
+        manifest[relative.as_posix()] = {"sha256": file_digest(path), "size": path.stat().st_size}
+    return manifest
+
+
+def content_type(name: str) -> str:
+    base = name.rsplit("/", 1)[-1]
+    if base in CONTENT_TYPES:
+        return CONTENT_TYPES[base]
+    guessed, _encoding = mimetypes.guess_type(base)
+    if guessed is None:
+        return "application/octet-stream"
+    return f"{guessed}; charset=utf-8" if guessed.startswith("text/") else guessed
+
+
+@dataclass
+class Plan:
+    added: list[str]
+    changed: list[str]
+    removed: list[str]
+    unchanged: int
+
+    def upload_bytes(self, manifest: Manifest) -> int:
+        return sum(int(str(manifest[name]["size"])) for name in self.added + self.changed)
+
+
+def diff_manifests(previous: Manifest, current: Manifest) -> Plan:
+    added = [name for name in current if name not in previous]
+    changed = [
+        name
+        for name in current
+        if name in previous and previous[name].get("sha256") != current[name]["sha256"]
+    ]
+    removed = sorted(name for name in previous if name not in current)
+    return Plan(added, changed, removed, len(current) - len(added) - len(changed))
+
+
+class DirectoryTarget:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def __str__(self) -> str:
+        return str(self.root)
+
+    def read(self, name: str) -> bytes | None:
+        path = self.root / name
+        return path.read_bytes() if path.is_file() else None
+
+    def put(self, name: str, source: Path) -> None:
+        with source.open("rb") as handle:
+            replace_file(
+                self.root / name,
+                iter(lambda: handle.read(CHUNK_SIZE), b""),
+                skip_unchanged=False,
+            )
+
+    def put_bytes(self, name: str, data: bytes) -> None:
+        replace_file(self.root / name, (data,), skip_unchanged=False)
+
+    def delete(self, name: str) -> None:
+        (self.root / name).unlink(missing_ok=True)
+
+    def prune(self, names: list[str]) -> None:
+        """Drop directories emptied by deleting ``names``, never the target itself.
+
+        Runs once after all (parallel) deletes, deepest directory first.
+        """
+        parents = {
+            self.root.joinpath(*parts[:depth])
+            for parts in (Path(name).parts for name in names)
+            for depth in range(1, len(parts))
+        }
+        for parent in sorted(parents, key=lambda path: len(path.parts), reverse=True):
+            if parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+
+
+def sign_v4(
+    method: str,
+    url: str,
+    headers: dict[str, str],
+    payload_hash: str,
+    credentials: tuple[str, str, str | None],
+    region: str,
+    now: datetime,
+) -> dict[str, str]:
+    """Return ``headers`` plus the AWS Signature Version 4 headers for an S3 request."""
+    access_key, secret_key, session_token = credentials
+    parsed = urllib.parse.urlsplit(url)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    signed = {key.lower(): value.strip() for key, value in headers.items()}
+    signed["host"] = parsed.netloc
+    signed["x-amz-date"] = amz_date
+    signed["x-amz-content-sha256"] = payload_hash
+    if session_token:
+        signed["x-amz-security-token"] = session_token
+
+    query = sorted(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True))
+    canonical_query = "&".join(
+        f"{urllib.parse.quote(key, safe='-_.~')}={urllib.parse.quote(value, safe='-_.~')}"
+        for key, value in query
+    )
+    names = sorted(signed)
+    canonical_request = "\n".join(
+        [
+            method,
+            parsed.path or "/",
+            canonical_query,
+            "".join(f"{name}:{signed[name]}\n" for name in names),
+            ";".join(names),
+            payload_hash,
+        ]
+    )
+    scope = f"{date}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ]
+    )
+
+    def hmac_sha256(key: bytes, message: str) -> bytes:
+        return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+    key = hmac_sha256(f"AWS4{secret_key}".encode("utf-8"), date)
+    for part in (region, "s3", "aws4_request"):
+        key = hmac_sha256(key, part)
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    signed["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={';'.join(names)}, Signature={signature}"
+    )
+    del signed["host"]
+    return signed
+
+
+class S3Target:
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str,
+        endpoint_url: str,
+        region: str,
+        credentials: tuple[str, str, str | None],
+        timeout: float,
+    ) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.region = region
+        self.credentials = credentials
+        self.timeout = timeout
+
+    def __str__(self) -> str:
+        return f"s3://{self.bucket}/{self.prefix}" if self.prefix else f"s3://{self.bucket}"
+
+    def url(self, name: str) -> str:
+        key = f"{self.prefix}/{name}" if self.prefix else name
+        return f"{self.endpoint_url}/{self.bucket}/{urllib.parse.quote(key, safe='/-_.~')}"
+
+    def request(
+        self, method: str, name: str, data: bytes = b"", headers: dict[str, str] | None = None
+    ) -> bytes:
+        url = self.url(name)
+        signed = sign_v4(
+            method,
+            url,
+            headers or {},
+            hashlib.sha256(data).hexdigest(),
+            self.credentials,
+            self.region,
+            datetime.now(timezone.utc),
+        )
+        request = urllib.request.Request(
+            url, data=data if method == "PUT" else None, headers=signed, method=method
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.read()
+
+    def read(self, name: str) -> bytes | None:
+        try:
+            return self.request("GET", name)
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                return None
+            raise
+
+    def put(self, name: str, source: Path) -> None:
+        self.put_bytes(name, source.read_bytes())
+
+    def put_bytes(self, name: str, data: bytes) -> None:
+        self.request("PUT", name, data, {"Content-Type": content_type(name)})
+
+    def delete(self, name: str) -> None:
+        try:
+            self.request("DELETE", name)
+        except urllib.error.HTTPError as exc:
+            if exc.code != 404:
+                raise
+
+    def prune(self, names: list[str]) -> None:
+        """Object stores have no directories to clean up."""
+
+
+Target = DirectoryTarget | S3Target
+
+
+def open_target(target: str, endpoint_url: str, region: str, timeout: float) -> Target:
+    if not target.startswith("s3://"):
+        return DirectoryTarget(Path(target))
+    bucket, _, prefix = target.removeprefix("s3://").partition("/")
+    access_key = os.environ.get("AWS_ACCESS_KEY_ID")
+    secret_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
+    if not bucket or not access_key or not secret_key:
+        raise ValueError(
+            "s3 target needs s3://bucket[/prefix] and AWS_ACCESS_KEY_ID/AWS_SECRET_ACCESS_KEY"
+        )
+    credentials = (access_key, secret_key, os.environ.get("AWS_SESSION_TOKEN"))
+    return S3Target(bucket, prefix, endpoint_url, region, credentials, timeout)
+
+
+def load_manifest(target: Target) -> Manifest:
+    data = target.read(MANIFEST_NAME)
+    if data is None:
+        return {}
+    return json.loads(data.decode("utf-8"))["files"]
+
+
+def print_plan(
+    command: str, docs_dir: Path, target: Target, plan: Plan, manifest: Manifest
+) -> None:
+    print(
+        f"{command} {docs_dir} -> {target}: added={len(plan.added)}, changed={len(plan.changed)}, "
+        f"removed={len(plan.removed)}, unchanged={plan.unchanged}, "
+        f"upload_bytes={plan.upload_bytes(manifest)}, "
+        f"total_bytes={sum(int(str(entry['size'])) for entry in manifest.values())}"
+    )
+
+
+def run_check(docs_dir: Path, target: Target) -> int:
+    try:
+        current = build_manifest(docs_dir)
+        plan = diff_manifests(load_manifest(target), current)
+        for label, names in (
+            ("ADD", plan.added),
+            ("CHANGE", plan.changed),
+            ("REMOVE", plan.removed),
+        ):
+            for name in names:
+                print(f"{label} {name}")
+        print_plan("CHECK", docs_dir, target, plan, current)
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_deploy(docs_dir: Path, target: Target, jobs: int) -> int:
+    try:
+        started = time.perf_counter()
+        current = build_manifest(docs_dir)
+        plan = diff_manifests(load_manifest(target), current)
+        uploads = plan.added + plan.changed
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(lambda name: target.put(name, docs_dir / name), uploads))
+            list(executor.map(target.delete, plan.removed))
+        target.prune(plan.removed)
+        manifest = {
+            "deployed_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+            "files": current,
+        }
+        target.put_bytes(MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True).encode())
+        print_plan("DEPLOY", docs_dir, target, plan, current)
+        print(f"DEPLOY {target}: seconds={time.perf_counter() - started:.2f}, jobs={jobs}")
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: deploy failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Delta-deploy docs to a directory or an S3-compatible bucket"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "dry run: list added/changed/removed files"),
+        ("deploy", "sync the delta and write the manifest"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("docs_dir", type=Path, help="docs root directory")
+        subparser.add_argument("target", help="target directory or s3://bucket/prefix")
+        subparser.add_argument(
+            "--endpoint-url", default=DEFAULT_ENDPOINT, help="S3-compatible endpoint"
+        )
+        subparser.add_argument(
+            "--region",
+            default=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+            help="signing region",
+        )
+        subparser.add_argument(
+            "--timeout", type=float, default=DEFAULT_TIMEOUT, help="request timeout (seconds)"
+        )
+        if command == "deploy":
+            subparser.add_argument(
+                "--jobs", type=int, default=DEFAULT_JOBS, help="parallel uploads"
+            )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+    try:
+        target = open_target(args.target, args.endpoint_url, args.region, args.timeout)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir, target)
+    if args.command == "deploy":
+        return run_deploy(docs_dir, target, args.jobs)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
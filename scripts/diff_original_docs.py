@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Diff original/ pages against docs/ at the DOM level and explain every change.
+
+BeautifulSoup re-serialization changes indentation outside the edited block,
+so a text diff of original/ vs docs/ is mostly noise. This script compares a
+canonical DOM form instead (one line per element/text node, whitespace
+normalized, attributes sorted) and replays the registered transforms
+(transforms.py) on the original page in pipeline order:
+
+- a transform that brings the replayed page closer to docs/ is kept and the
+  lines it fixed are attributed to it
+- a transform that does not (not applied yet, or applied differently) is
+  dropped for that page
+- whatever still differs after the replay is reported as unexplained
+
+Pages are processed in parallel across all cores.
+
+Usage:
+- check <original_dir> <docs_dir>: diff every HTML page present in both trees
+
+Notes:
+- pages that exist on only one side are listed but are not an error.
+- `--verbose` prints the attribution for every page, not only failures.
+
+Exit codes:
+- 0: every difference is explained by a transform
+- 1: unexplained differences found
+- 3: processing error (read/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import sys
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Comment, Doctype, NavigableString, Tag
+
+from transforms import TRANSFORMS, Transform
+
+EXIT_OK = 0
+EXIT_UNEXPLAINED = 1
+EXIT_ERROR = 3
+
+SAMPLE_LINES = 12
+VOID_ELEMENTS = frozenset(
+    ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr")
+)
+
+PageResult = tuple[str, dict[str, int], int, list[str]]
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def canonical_lines(node: Tag, depth: int = 0) -> Iterator[str]:
+    indent = " " * depth
+    for child in node.children:
+        if isinstance(child, Tag):
+            attrs = " ".join(
+                f'{name}="{" ".join(value) if isinstance(value, list) else value}"'
+                for name, value in sorted(child.attrs.items())
+            )
+            yield f"{indent}<{child.name}{' ' + attrs if attrs else ''}>"
+            # html.parser may nest following siblings inside a `<link ... />`
+            # depending on the bs4 version; void elements never have children.
+            child_depth = depth if child.name in VOID_ELEMENTS else depth + 1
+            yield from canonical_lines(child, child_depth)
+        elif isinstance(child, NavigableString):
+            text = " ".join(child.split())
+            if not text:
+                continue
+            if isinstance(child, Doctype):
+                yield f"{indent}<!DOCTYPE {text}>"
+            elif isinstance(child, Comment):
+                yield f"{indent}<!-- {text} -->"
+            else:
+                yield f"{indent}{text}"
+
+
+def distance(lines: Counter[str], target: Counter[str]) -> int:
+    return sum((lines - target).values()) + sum((target - lines).values())
+
+
+def replay(source: str, accepted: list[Transform]) -> BeautifulSoup:
+    soup = BeautifulSoup(source, "html.parser")
+    for transform in accepted:
+        transform.apply(soup)
+    return soup
+
+
+def diff_page(relative: str, original_path: str, docs_path: str) -> PageResult:
+    source = load_html(Path(original_path))
+    target_lines = list(canonical_lines(BeautifulSoup(load_html(Path(docs_path)), "html.parser")))
+    target = Counter(target_lines)
+    working = BeautifulSoup(source, "html.parser")
+    current = distance(Counter(canonical_lines(working)), target)
+
+    # Transforms are applied in place; a rejected one is undone by replaying
+    # the accepted ones, which is cheaper than copying the tree every step.
+    accepted: list[Transform] = []
+    explained: dict[str, int] = {}
+    for transform in TRANSFORMS:
+        if current == 0:
+            break
+        _status, changes, _summary = transform.apply(working)
+        if not changes:
+            continue
+        candidate_distance = distance(Counter(canonical_lines(working)), target)
+        if candidate_distance < current:
+            accepted.append(transform)
+            explained[transform.name] = current - candidate_distance
+            current = candidate_distance
+        else:
+            working = replay(source, accepted)
+
+    sample: list[str] = []
+    if current:
+        diff = difflib.unified_diff(
+            list(canonical_lines(working)), target_lines, "replayed", "docs", n=0, lineterm=""
+        )
+        sample = [line for line in diff if not line.startswith(("---", "+++"))][:SAMPLE_LINES]
+    return relative, explained, current, sample
+
+
+def html_pages(root: Path) -> set[str]:
+    return {path.relative_to(root).as_posix() for path in root.rglob("*.html")}
+
+
+def run_check(original_dir: Path, docs_dir: Path, jobs: int | None, verbose: bool) -> int:
+    try:
+        original_pages = html_pages(original_dir)
+        docs_pages = html_pages(docs_dir)
+        common = sorted(original_pages & docs_pages)
+
+        transform_pages: Counter[str] = Counter()
+        transform_lines: Counter[str] = Counter()
+        identical = 0
+        unexplained = 0
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(
+                diff_page,
+                common,
+                [str(original_dir / relative) for relative in common],
+                [str(docs_dir / relative) for relative in common],
+                chunksize=8,
+            )
+            for relative, explained, remaining, sample in results:
+                transform_pages.update(explained.keys())
+                transform_lines.update(explained)
+                if not explained and not remaining:
+                    identical += 1
+                if remaining:
+                    unexplained += 1
+                if remaining or verbose:
+                    attribution = ", ".join(f"{name}={lines}" for name, lines in explained.items())
+                    print(
+                        f"DIFF {docs_dir / relative}: unexplained_lines={remaining}, "
+                        f"explained=[{attribution}]"
+                    )
+                    for line in sample:
+                        print(f"  {line}")
+
+        for name, pages in sorted(transform_pages.items()):
+            print(f"TRANSFORM {name}: pages={pages}, lines={transform_lines[name]}")
+        for relative in sorted(original_pages - docs_pages):
+            print(f"ONLY-ORIGINAL {original_dir / relative}")
+        for relative in sorted(docs_pages - original_pages):
+            print(f"ONLY-DOCS {docs_dir / relative}")
+        print(
+            f"CHECK {docs_dir}: pages={len(common)}, identical={identical}, "
+            f"explained={len(common) - identical - unexplained}, unexplained={unexplained}"
+        )
+        return EXIT_UNEXPLAINED if unexplained else EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Diff original/ against docs/ at the DOM level, explained by transforms"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="diff every page in both trees")
+    parser_check.add_argument("original_dir", type=Path, help="original mirror directory")
+    parser_check.add_argument("docs_dir", type=Path, help="docs root directory")
+    parser_check.add_argument("--jobs", type=int, default=None, help="worker processes")
+    parser_check.add_argument(
+        "--verbose", action="store_true", help="print the attribution of every page"
+    )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    for directory in (args.original_dir, args.docs_dir):
+        if not directory.is_dir():
+            print(f"ERROR: directory not found: {directory}", file=sys.stderr)
+            return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(args.original_dir, args.docs_dir, args.jobs, args.verbose)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
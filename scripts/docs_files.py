@@ -0,0 +1,71 @@
+"""File writes shared by the docs scripts.
+
+Every save goes through a uniquely named temp file in the target's directory
+(`tempfile.NamedTemporaryFile`), which is moved into place with os.replace.
+Concurrent writers (transform_daemon.py, `run_transforms.py --jobs`,
+parallel build.py nodes) never share a temp file, and the temp file is
+removed when the write fails. Unchanged files are not rewritten, so mtimes
+and downstream caches stay untouched; replaced files keep their permission
+bits.
+"""
+
+from __future__ import annotations
+
+import filecmp
+import os
+import stat
+import tempfile
+from collections.abc import Iterable
+from pathlib import Path
+
+# Mode of files created by a plain open(); NamedTemporaryFile creates 0600.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+def replace_file(path: Path, chunks: Iterable[bytes], skip_unchanged: bool = True) -> bool:
+    """Write ``chunks`` next to ``path`` and move them into place.
+
+    With ``skip_unchanged`` the temp file is compared with ``path`` first and
+    discarded when the content is the same; return whether ``path`` changed.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path: Path | None = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+        ) as handle:
+            tmp_path = Path(handle.name)
+            for chunk in chunks:
+                handle.write(chunk)
+        if skip_unchanged and path.is_file() and filecmp.cmp(tmp_path, path, shallow=False):
+            return False
+        mode = stat.S_IMODE(path.stat().st_mode) if path.exists() else NEW_FILE_MODE
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+        tmp_path = None
+        return True
+    finally:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+def save_bytes(path: Path, data: bytes) -> bool:
+    """Atomically replace ``path`` with ``data``; unchanged files are not rewritten."""
+    if path.is_file() and path.read_bytes() == data:
+        return False
+    return replace_file(path, (data,), skip_unchanged=False)
+
+
+def save_text(path: Path, text: str) -> bool:
+    return save_bytes(path, text.encode("utf-8"))
+
+
+def save_html(path: Path, html: str) -> bool:
+    return save_text(path, html)
+
+
+def save_stream(path: Path, chunks: Iterable[str]) -> bool:
+    """Stream ``chunks`` to ``path`` without holding the whole text in memory."""
+    return replace_file(path, (chunk.encode("utf-8") for chunk in chunks))
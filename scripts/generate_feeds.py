@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Generate docs/rss and docs/sitemap.xml from the mirrored pages.
+
+docs/rss is a frozen copy of the original feed: item links and the channel
+image still point at the dynamic site (`/view/<id>`, `//img/unkode.png`) and
+pubDate is the crawl time. This script rebuilds both files from the pages:
+
+- rss: the newest view pages (by posted date), linking `view/<id>.html`
+- sitemap.xml: every HTML page, `<lastmod>` from a content hash
+
+Incremental:
+- per-page state (mtime/size, content hash, lastmod, feed entry) is cached in
+  .cache/feeds.json; pages whose mtime/size did not change are not parsed
+- every run writes metrics (build_metrics.py) to .cache/metrics
+- the content hash covers the page's main content text only, so markup-only
+  transforms do not bump lastmod
+- a new page's lastmod is the newest timestamp in its content; a changed
+  hash sets lastmod to the build time
+
+Output is streamed to a temporary file and only replaces the target when it
+changed. Sitemaps above 50,000 URLs are split into sitemap-<n>.xml files
+referenced from a sitemap index at sitemap.xml.
+
+Usage:
+- check <docs_dir>: report pages, changed pages and feed items
+- build <docs_dir>: write rss and sitemap.xml
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import heapq
+import json
+import re
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from build_metrics import BuildMetrics
+from docs_files import save_stream, save_text
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+DEFAULT_BASE_URL = "https://unkode-mania.net/"
+DEFAULT_STATE = Path(__file__).resolve().parent.parent / ".cache" / "feeds.json"
+RSS_PATH = "rss"
+SITEMAP_PATH = "sitemap.xml"
+RSS_ITEMS = 10
+SITEMAP_MAX_URLS = 50_000
+
+SITE_TITLE = "ウンコード・マニア"
+SITE_DESCRIPTION = (
+    "ウンコード・マニアは、プログラマのためのストレス解消サイトであり教育サイトです。\n"
+    " 主に他の人が創作したウンコードを鑑賞するのが目的です。"
+)
+SITE_IMAGE = "img/unkode.png"
+
+# Dates on the original site are Japan Standard Time.
+SITE_TIMEZONE = timezone(timedelta(hours=9))
+TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+CONTENT_SELECTORS = ("div.row-fluid.view", "div.span9", "body")
+
+PageState = dict[str, object]
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def load_state(state_path: Path) -> dict[str, PageState]:
+    if not state_path.exists():
+        return {}
+    return json.loads(state_path.read_text(encoding="utf-8"))
+
+
+def save_state(state_path: Path, state: dict[str, PageState]) -> None:
+    save_text(state_path, json.dumps(state, ensure_ascii=False, sort_keys=True))
+
+
+def normalize_space(text: str) -> str:
+    return " ".join(text.split())
+
+
+def main_content(soup: BeautifulSoup) -> Tag | None:
+    for selector in CONTENT_SELECTORS:
+        content = soup.select_one(selector)
+        if isinstance(content, Tag):
+            return content
+    return None
+
+
+def parse_timestamp(text: str) -> datetime:
+    return datetime.strptime(text, TIMESTAMP_FORMAT).replace(tzinfo=SITE_TIMEZONE)
+
+
+def feed_entry(soup: BeautifulSoup, content: Tag) -> dict[str, str] | None:
+    """Return title/author/posted/description of a view page (None for other pages)."""
+    info = soup.select_one("div#code-info[data-id]")
+    title = content.select_one("h2.title")
+    prop = content.select_one("div.property")
+    if not isinstance(info, Tag) or not isinstance(title, Tag) or not isinstance(prop, Tag):
+        return None
+
+    title_text = normalize_space(
+        "".join(str(node) for node in title.children if isinstance(node, NavigableString))
+    )
+    author = prop.find("a")
+    posted = TIMESTAMP_RE.search(prop.get_text(" "))
+    markdown = content.select_one("div.markdown")
+    code = content.select_one("pre")
+
+    author_name = normalize_space(author.get_text()) if isinstance(author, Tag) else ""
+    description = f'<p class="author">posted by @{author_name}</p>\n'
+    if isinstance(markdown, Tag):
+        description += markdown.get_text().strip() + "\n\n"
+    if isinstance(code, Tag):
+        description += f"<pre>{escape(code.get_text().rstrip())}</pre>"
+
+    return {
+        "id": str(info["data-id"]),
+        "title": title_text,
+        "posted": posted.group(0) if posted else "",
+        "description": description,
+    }
+
+
+def scan_page(html_path: Path, cached: PageState | None, now: str) -> PageState:
+    stat = html_path.stat()
+    if cached is not None and cached.get("mtime_ns") == stat.st_mtime_ns and cached.get(
+        "size"
+    ) == stat.st_size:
+        return cached
+
+    soup = BeautifulSoup(load_html(html_path), "html.parser")
+    content = main_content(soup)
+    text = normalize_space(content.get_text(" ")) if content is not None else ""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    if cached is not None and cached.get("hash") == digest:
+        lastmod = str(cached.get("lastmod"))
+    elif cached is not None:
+        lastmod = now
+    else:
+        timestamps = [parse_timestamp(match) for match in TIMESTAMP_RE.findall(text)]
+        lastmod = max(timestamps).isoformat() if timestamps else now
+
+    state: PageState = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "hash": digest,
+        "lastmod": lastmod,
+        "changed": True,
+    }
+    entry = feed_entry(soup, content) if content is not None else None
+    if entry is not None:
+        state["entry"] = entry
+    return state
+
+
+def page_url(base_url: str, relative: str) -> str:
+    if relative == "index.html":
+        return base_url
+    return f"{base_url}{relative}"
+
+
+def rfc822(posted: str) -> str:
+    return format_datetime(parse_timestamp(posted))
+
+
+def stream_rss(base_url: str, entries: list[dict[str, str]]) -> Iterator[str]:
+    channel_date = rfc822(entries[0]["posted"]) if entries else ""
+    yield '<?xml version="1.0" encoding="UTF-8" ?>\n<rss version="2.0">\n<channel>\n'
+    yield f"<title>{SITE_TITLE}</title>\n<link>{escape(base_url)}</link>\n"
+    yield f"<language>ja-JP</language>\n<pubDate>{channel_date}</pubDate>\n"
+    yield f"<description>{escape(SITE_DESCRIPTION)}</description>\n"
+    yield f"<image>\n<url>{escape(base_url + SITE_IMAGE)}</url>\n<title>{SITE_TITLE}</title>\n"
+    yield f"<link>{escape(base_url)}</link>\n</image>\n"
+    for entry in entries:
+        link = escape(f"{base_url}view/{entry['id']}.html")
+        yield f"<item>\n<title>{escape(entry['title'])}</title>\n<link>{link}</link>\n"
+        yield f'<guid isPermaLink="true">{link}</guid>\n'
+        if entry["posted"]:
+            yield f"<pubDate>{rfc822(entry['posted'])}</pubDate>\n"
+        yield f"<description>{escape(entry['description'])}</description>\n</item>\n"
+    yield "</channel>\n</rss>\n"
+
+
+def stream_urlset(urls: Iterable[tuple[str, str]]) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for loc, lastmod in urls:
+        yield f"<url><loc>{escape(loc)}</loc><lastmod>{lastmod}</lastmod></url>\n"
+    yield "</urlset>\n"
+
+
+def stream_sitemap_index(locs: Iterable[str]) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for loc in locs:
+        yield f"<sitemap><loc>{escape(loc)}</loc></sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def write_sitemaps(docs_dir: Path, base_url: str, urls: list[tuple[str, str]]) -> int:
+    if len(urls) <= SITEMAP_MAX_URLS:
+        return int(save_stream(docs_dir / SITEMAP_PATH, stream_urlset(urls)))
+
+    written = 0
+    parts: list[str] = []
+    for start in range(0, len(urls), SITEMAP_MAX_URLS):
+        name = f"sitemap-{start // SITEMAP_MAX_URLS + 1}.xml"
+        parts.append(f"{base_url}{name}")
+        chunk = urls[start : start + SITEMAP_MAX_URLS]
+        written += int(save_stream(docs_dir / name, stream_urlset(chunk)))
+    written += int(save_stream(docs_dir / SITEMAP_PATH, stream_sitemap_index(parts)))
+    return written
+
+
+def scan_site(
+    docs_dir: Path, state: dict[str, PageState], metrics: BuildMetrics
+) -> tuple[dict[str, PageState], int]:
+    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    scanned: dict[str, PageState] = {}
+    changed = 0
+    for html_path in sorted(docs_dir.rglob("*.html")):
+        relative = html_path.relative_to(docs_dir).as_posix()
+        started = time.perf_counter()
+        page = scan_page(html_path, state.get(relative), now)
+        hit = not page.pop("changed", False)
+        if not hit:
+            changed += 1
+            metrics.observe("phase", time.perf_counter() - started, phase="scan")
+        metrics.cache_lookup("feeds_state", hit)
+        metrics.inc("pages", help_text="pages processed")
+        metrics.inc("bytes_in", int(page["size"]), help_text="bytes read")
+        scanned[relative] = page
+    return scanned, changed
+
+
+def newest_entries(state: dict[str, PageState]) -> list[dict[str, str]]:
+    entries: list[dict[str, str]] = []
+    for page in state.values():
+        entry = page.get("entry")
+        if isinstance(entry, dict):
+            entries.append(entry)
+    return heapq.nlargest(RSS_ITEMS, entries, key=lambda entry: (entry["posted"], entry["id"]))
+
+
+def run_check(docs_dir: Path, state_path: Path) -> int:
+    try:
+        metrics = BuildMetrics("generate_feeds_check")
+        scanned, changed = scan_site(docs_dir, load_state(state_path), metrics)
+        entries = newest_entries(scanned)
+        metrics.write()
+        print(
+            f"CHECK {docs_dir}: pages={len(scanned)}, changed_pages={changed}, "
+            f"feed_items={len(entries)}"
+        )
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path, state_path: Path, base_url: str) -> int:
+    try:
+        metrics = BuildMetrics("generate_feeds_build")
+        scanned, changed = scan_site(docs_dir, load_state(state_path), metrics)
+        entries = newest_entries(scanned)
+        rss_written = save_stream(docs_dir / RSS_PATH, stream_rss(base_url, entries))
+
+        urls = [
+            (page_url(base_url, relative), str(page["lastmod"]))
+            for relative, page in sorted(scanned.items())
+        ]
+        sitemaps_written = write_sitemaps(docs_dir, base_url, urls)
+        save_state(state_path, scanned)
+        metrics.inc("files_written", int(rss_written) + sitemaps_written, help_text="files written")
+        metrics.write()
+
+        print(
+            f"BUILD {docs_dir}: pages={len(scanned)}, changed_pages={changed}, "
+            f"feed_items={len(entries)}, rss_written={int(rss_written)}, "
+            f"sitemaps_written={sitemaps_written}"
+        )
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate rss and sitemap.xml from docs pages")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "report pages, changed pages and feed items"),
+        ("build", "write rss and sitemap.xml"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("docs_dir", type=Path, help="docs root directory")
+        subparser.add_argument(
+            "--state", type=Path, default=DEFAULT_STATE, help="incremental state file"
+        )
+        subparser.add_argument(
+            "--base-url", default=DEFAULT_BASE_URL, help="public URL of the docs root"
+        )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+    base_url: str = args.base_url if args.base_url.endswith("/") else f"{args.base_url}/"
+
+    if args.command == "check":
+        return run_check(docs_dir, args.state)
+    if args.command == "build":
+        return run_build(docs_dir, args.state, base_url)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Check/build a service worker and its precache manifest for docs/.
+
+Every visit re-fetches the shared stylesheets, scripts and images, and the
+site is unusable offline. This script writes:
+
+- precache-manifest.json: `{"version", "entries": [{"url", "revision"}]}`
+  - local assets loaded by at least `--min-pages` pages (as counted by
+    audit_page_weight.py) and fragments/sidebar.txt
+  - index.html and the `--max-lang-pages` largest language listings
+    (post counts from the lang/<name>.json indexes of paginate_listings.py)
+  - revision: content hash of the file; version: hash of all entries
+- sw.js (site root, so its scope is the whole site):
+  - install: precaches the manifest into `unkode-precache-<version>`,
+    bypassing the HTTP cache
+  - activate: deletes precaches and page caches of other versions, so a
+    changed asset invalidates the old caches on the next visit
+  - view/*.html: stale-while-revalidate (`unkode-pages-<version>`), a
+    repeat visit is served from cache and refreshed in the background; the
+    cache keeps the `--max-cached-pages` most recently fetched pages
+  - other same-origin GET requests: precache first, then the network
+- every page: a `<script data-service-worker>` registering sw.js, replaced
+  on every run
+
+Run it after every step that changes assets (build.py runs it before the
+archive).
+
+Usage:
+- check <docs_dir>: report the manifest without writing
+- build <docs_dir>: write sw.js, the manifest and rewrite pages in-place
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+
+from audit_page_weight import local_assets
+from docs_files import save_html, save_text
+from inject_resource_hints import Stylesheets, relative_href
+from paginate_listings import PAGE_NAME_RE
+from share_sidebar_fragment import FRAGMENT
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+SERVICE_WORKER = "sw.js"
+MANIFEST = "precache-manifest.json"
+REGISTER_ATTR = "data-service-worker"
+DEFAULT_MIN_PAGES = 2
+DEFAULT_MAX_LANG_PAGES = 10
+DEFAULT_MAX_CACHED_PAGES = 50
+REVISION_CHARS = 12
+
+SERVICE_WORKER_JS = """\
+// Generated by scripts/generate_service_worker.py from %(manifest)s.
+var VERSION = '%(version)s';
+var PRECACHE = 'unkode-precache-' + VERSION;
+var PAGES = 'unkode-pages-' + VERSION;
+var MAX_PAGES = %(max_pages)d;
+var PRECACHE_URLS = %(urls)s;
+var PAGE_RE = /\\/view\\/[^/]+\\.html$/;
+
+self.addEventListener('install', function (event) {
+  event.waitUntil(caches.open(PRECACHE).then(function (cache) {
+    return cache.addAll(PRECACHE_URLS.map(function (url) {
+      return new Request(url, {cache: 'reload'});
+    }));
+  }).then(function () {
+    return self.skipWaiting();
+  }));
+});
+
+self.addEventListener('activate', function (event) {
+  event.waitUntil(caches.keys().then(function (names) {
+    return Promise.all(names.filter(function (name) {
+      return name.indexOf('unkode-') === 0 && name !== PRECACHE && name !== PAGES;
+    }).map(function (name) {
+      return caches.delete(name);
+    }));
+  }).then(function () {
+    return self.clients.claim();
+  }));
+});
+
+// cache.put() appends the entry, so the oldest keys are the least recently fetched.
+function trimPages(cache) {
+  return cache.keys().then(function (requests) {
+    return Promise.all(requests.slice(0, Math.max(0, requests.length - MAX_PAGES))
+      .map(function (request) { return cache.delete(request); }));
+  });
+}
+
+function staleWhileRevalidate(event) {
+  return caches.open(PAGES).then(function (cache) {
+    return cache.match(event.request).then(function (cached) {
+      var network = fetch(event.request).then(function (response) {
+        if (response.ok) {
+          event.waitUntil(cache.put(event.request, response.clone()).then(function () {
+            return trimPages(cache);
+          }));
+        }
+        return response;
+      });
+      if (!cached) return network;
+      event.waitUntil(network.catch(function () {}));
+      return cached;
+    });
+  });
+}
+
+self.addEventListener('fetch', function (event) {
+  var request = event.request;
+  var url = new URL(request.url);
+  if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+  if (PAGE_RE.test(url.pathname)) {
+    event.respondWith(staleWhileRevalidate(event));
+    return;
+  }
+  event.respondWith(caches.open(PRECACHE).then(function (cache) {
+    return cache.match(request, {ignoreSearch: true});
+  }).then(function (cached) {
+    return cached || fetch(request);
+  }));
+});
+"""
+
+REGISTER_JS = (
+    "if ('serviceWorker' in navigator) {"
+    " navigator.serviceWorker.register('%s'); }"
+)
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(path for path in docs_dir.rglob("*.html") if path.is_file())
+
+
+def revision(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:REVISION_CHARS]
+
+
+def lang_pages(docs_dir: Path, limit: int) -> list[str]:
+    """First pages of the language listings with the most posts."""
+    counts: dict[str, int] = {}
+    for path in sorted((docs_dir / "lang").glob("*.html")):
+        if PAGE_NAME_RE.match(path.stem):
+            continue
+        index = path.with_suffix(".json")
+        posts = json.loads(index.read_text(encoding="utf-8")) if index.is_file() else []
+        counts[path.relative_to(docs_dir).as_posix()] = len(posts)
+    return sorted(counts, key=lambda page: (-counts[page], page))[:limit]
+
+
+def register_script(soup: BeautifulSoup, page: str) -> None:
+    for old in soup.find_all("script", attrs={REGISTER_ATTR: True}):
+        old.decompose()
+    body = soup.body
+    if not isinstance(body, Tag):
+        return
+    script = soup.new_tag("script")
+    script[REGISTER_ATTR] = ""
+    script.string = REGISTER_JS % relative_href(page, SERVICE_WORKER)
+    body.append(script)
+
+
+def process(
+    docs_dir: Path, min_pages: int, max_lang_pages: int, max_cached_pages: int, write: bool
+) -> int:
+    paths = html_files(docs_dir)
+    pages = {path.relative_to(docs_dir).as_posix() for path in paths}
+    stylesheets = Stylesheets(docs_dir)
+
+    usage: Counter[str] = Counter()
+    written = 0
+    for path in paths:
+        page = path.relative_to(docs_dir).as_posix()
+        soup = BeautifulSoup(load_html(path), "html.parser")
+        usage.update(local_assets(soup, page, stylesheets, pages))
+        if write:
+            register_script(soup, page)
+            written += save_html(path, str(soup))
+
+    assets = sorted(
+        asset
+        for asset, count in usage.items()
+        if count >= min_pages and (docs_dir / asset).is_file()
+    )
+    if (docs_dir / FRAGMENT).is_file():
+        assets.append(FRAGMENT)
+    precached_pages = ["index.html", *lang_pages(docs_dir, max_lang_pages)]
+    entries = [
+        {"url": url, "revision": revision(docs_dir / url)}
+        for url in [*assets, *precached_pages]
+        if (docs_dir / url).is_file()
+    ]
+    version = hashlib.sha256(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()
+    version = version[:REVISION_CHARS]
+    # "./" is how the top page is usually requested.
+    urls = ["./", *(entry["url"] for entry in entries)]
+
+    manifest_written = False
+    if write:
+        manifest = {"version": version, "entries": entries}
+        manifest_written = save_text(
+            docs_dir / MANIFEST, json.dumps(manifest, indent=1, ensure_ascii=False) + "\n"
+        )
+        manifest_written |= save_text(
+            docs_dir / SERVICE_WORKER,
+            SERVICE_WORKER_JS
+            % {
+                "manifest": MANIFEST,
+                "version": version,
+                "urls": json.dumps(urls, indent=1),
+                "max_pages": max_cached_pages,
+            },
+        )
+
+    precache_bytes = sum((docs_dir / entry["url"]).stat().st_size for entry in entries)
+    command = "BUILD" if write else "CHECK"
+    print(
+        f"{command} {docs_dir}: pages={len(pages)}, version={version}, "
+        f"precache_entries={len(entries)}, precache_bytes={precache_bytes}, "
+        f"precached_pages={len(precached_pages)}, pages_written={written}, "
+        f"worker_written={manifest_written}"
+    )
+    for entry in entries:
+        url = entry["url"]
+        print(f"{command} precache {url}: revision={entry['revision']}, pages={usage[url]}")
+    return EXIT_OK
+
+
+def run_check(
+    docs_dir: Path, min_pages: int, max_lang_pages: int, max_cached_pages: int
+) -> int:
+    try:
+        return process(docs_dir, min_pages, max_lang_pages, max_cached_pages, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(
+    docs_dir: Path, min_pages: int, max_lang_pages: int, max_cached_pages: int
+) -> int:
+    try:
+        return process(docs_dir, min_pages, max_lang_pages, max_cached_pages, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build a service worker and precache manifest for docs"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "report the precache manifest"),
+        ("build", "write sw.js and the manifest, register it on every page"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("docs_dir", type=Path, help="docs root directory")
+        subparser.add_argument(
+            "--min-pages",
+            type=int,
+            default=DEFAULT_MIN_PAGES,
+            help="precache assets loaded by at least this many pages",
+        )
+        subparser.add_argument(
+            "--max-lang-pages",
+            type=int,
+            default=DEFAULT_MAX_LANG_PAGES,
+            help="language listings to precache",
+        )
+        subparser.add_argument(
+            "--max-cached-pages",
+            type=int,
+            default=DEFAULT_MAX_CACHED_PAGES,
+            help="view pages kept in the stale-while-revalidate cache",
+        )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(
+            docs_dir, args.min_pages, args.max_lang_pages, args.max_cached_pages
+        )
+    if args.command == "build":
+        return run_build(
+            docs_dir, args.min_pages, args.max_lang_pages, args.max_cached_pages
+        )
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
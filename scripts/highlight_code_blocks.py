@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Check/convert code blocks to build-time syntax highlighting in one HTML file.
+
+Every page loads google/code-prettify (run_prettify.js) synchronously in <head>
+and highlights `pre.prettyprint` blocks in the browser. This script highlights
+those blocks with Pygments instead and removes the external script.
+
+Target example:
+<script src="https://cdn.jsdelivr.net/gh/google/code-prettify@master/loader/run_prettify.js"></script>
+<pre class="prettyprint linenums">...</pre>
+
+Conversion:
+- `pre.prettyprint` contents -> Pygments token spans (`linenums` blocks keep
+  prettify's `<ol class="linenums"><li class="L0">` line markup used by app.js)
+- highlighted blocks get the `prettyprinted` class (same marker as prettify)
+- run_prettify.js script tag -> <link href="css/highlight.css" rel="stylesheet"/>
+
+The lexer is chosen from the "[Lang]" prefix of the nearest preceding title
+(view pages, listings, recommends), falling back to the breadcrumb language.
+
+Usage:
+- check <file>: report code block / highlighted / prettify script counts
+- convert <file>: highlight code blocks and drop run_prettify.js in-place
+- stylesheet <docs_dir>: write css/highlight.css used by converted pages
+
+Notes:
+- 0 matches is not an error.
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+
+from docs_files import save_html, save_text
+from prefilter import Prefilter
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+CODE_SELECTOR = "pre.prettyprint"
+HIGHLIGHTED_CLASS = "prettyprinted"
+PRETTIFY_SCRIPT_SELECTOR = 'script[src*="run_prettify.js"]'
+STYLESHEET_PATH = "css/highlight.css"
+PYGMENTS_STYLE = "default"
+
+LANG_LABEL_RE = re.compile(r"^\s*\[([^\]]+)\]")
+
+# Keys are both /lang/<route> names and the "[label]" shown in titles.
+LEXERS: dict[str, tuple[str, dict[str, bool]]] = {
+    "ActionScript": ("actionscript3", {}),
+    "C": ("c", {}),
+    "CPP": ("cpp", {}),
+    "C++": ("cpp", {}),
+    "CS": ("csharp", {}),
+    "C#": ("csharp", {}),
+    "Cobol": ("cobol", {}),
+    "HTML": ("html", {}),
+    "Java": ("java", {}),
+    "JavaScript": ("javascript", {}),
+    "ObjC": ("objective-c", {}),
+    "Objective-C": ("objective-c", {}),
+    "PHP": ("php", {"startinline": True}),
+    "Perl": ("perl", {}),
+    "Python": ("python", {}),
+    "Ruby": ("ruby", {}),
+    "VB.net": ("vb.net", {}),
+    "VBA": ("vbscript", {}),
+    "typescript": ("typescript", {}),
+    "TypeScript": ("typescript", {}),
+}
+FALLBACK_LEXER = ("text", {})
+
+# Base rules from prettify's default skin that app.js/style.css rely on.
+BASE_STYLES = """\
+pre.prettyprint { border: 1px solid #888; }
+ol.linenums { margin-top: 0; margin-bottom: 0; }
+li.L1, li.L3, li.L5, li.L7, li.L9 { background: #eee; }
+"""
+
+PREFILTER = Prefilter((b"prettyprint", b"run_prettify.js"))
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def parse_html(path: Path) -> BeautifulSoup:
+    # An empty tree gives the same 0-match result as the full page would.
+    html = load_html(path) if PREFILTER.may_match(path.read_bytes()) else ""
+    return BeautifulSoup(html, "html.parser")
+
+
+def is_highlighted(pre: Tag) -> bool:
+    classes = pre.get("class")
+    return isinstance(classes, list) and HIGHLIGHTED_CLASS in classes
+
+
+def find_code_blocks(soup: BeautifulSoup) -> list[Tag]:
+    return [tag for tag in soup.select(CODE_SELECTOR) if isinstance(tag, Tag)]
+
+
+def find_prettify_scripts(soup: BeautifulSoup) -> list[Tag]:
+    return [tag for tag in soup.select(PRETTIFY_SCRIPT_SELECTOR) if isinstance(tag, Tag)]
+
+
+def breadcrumb_language(soup: BeautifulSoup) -> str | None:
+    for anchor in soup.select("ul.breadcrumb a[href]"):
+        href = anchor.get("href")
+        if isinstance(href, str) and "lang/" in href:
+            return href.rsplit("/", 1)[-1].removesuffix(".html")
+    return None
+
+
+def block_language(pre: Tag, default: str | None) -> str | None:
+    title = pre.find_previous(class_="title")
+    if isinstance(title, Tag):
+        match = LANG_LABEL_RE.match(title.get_text(" ", strip=True))
+        if match:
+            return match.group(1)
+    return default
+
+
+def highlight_lines(code: str, language: str | None) -> list[str]:
+    name, options = LEXERS.get(language or "", FALLBACK_LEXER)
+    if code.lstrip().startswith("<?"):
+        # Snippets that open with `<?php` must not be lexed as inline PHP.
+        options = {**options, "startinline": False}
+    lexer = get_lexer_by_name(name, **options)
+    html = highlight(code, lexer, HtmlFormatter(nowrap=True))
+    lines = html.split("\n")
+    # Pygments always ends with a newline; prettify drops the empty last line.
+    while len(lines) > 1 and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def render_block(pre: Tag, language: str | None) -> str:
+    lines = highlight_lines(pre.get_text(), language)
+    classes = pre.get("class")
+    if isinstance(classes, list) and "linenums" in classes:
+        items = "".join(
+            f'<li class="L{index % 10}">{line}</li>' for index, line in enumerate(lines)
+        )
+        return f'<ol class="linenums">{items}</ol>'
+    return "\n".join(lines)
+
+
+def highlight_block(pre: Tag, language: str | None) -> None:
+    fragment = BeautifulSoup(render_block(pre, language), "html.parser")
+    pre.clear()
+    for node in list(fragment.contents):
+        pre.append(node.extract())
+
+    classes = pre.get("class")
+    pre["class"] = [*(classes if isinstance(classes, list) else []), HIGHLIGHTED_CLASS]
+
+
+def asset_prefix(soup: BeautifulSoup) -> str:
+    link = soup.select_one('link[href$="css/bootstrap.min.css"]')
+    href = link.get("href") if isinstance(link, Tag) else None
+    if isinstance(href, str):
+        return href.removesuffix("css/bootstrap.min.css")
+    return ""
+
+
+def has_stylesheet(soup: BeautifulSoup) -> bool:
+    return soup.select_one(f'link[href$="{STYLESHEET_PATH}"]') is not None
+
+
+def run_check(file_path: Path) -> int:
+    try:
+        soup = parse_html(file_path)
+        blocks = find_code_blocks(soup)
+        highlighted = sum(1 for pre in blocks if is_highlighted(pre))
+        scripts = find_prettify_scripts(soup)
+        print(
+            f"CHECK {file_path}: code_blocks={len(blocks)}, "
+            f"highlighted={highlighted}, prettify_scripts={len(scripts)}"
+        )
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def apply_convert(soup: BeautifulSoup) -> tuple[int, int, str]:
+    default_language = breadcrumb_language(soup)
+
+    highlighted = 0
+    for pre in find_code_blocks(soup):
+        if is_highlighted(pre):
+            continue
+        highlight_block(pre, block_language(pre, default_language))
+        highlighted += 1
+
+    scripts = find_prettify_scripts(soup)
+    if scripts and not has_stylesheet(soup):
+        link = soup.new_tag(
+            "link", href=f"{asset_prefix(soup)}{STYLESHEET_PATH}", rel="stylesheet"
+        )
+        scripts[0].insert_before(link)
+    for script in scripts:
+        script.decompose()
+
+    summary = f"highlighted_blocks={highlighted}, removed_scripts={len(scripts)}"
+    return EXIT_OK, highlighted + len(scripts), summary
+
+
+def run_convert(file_path: Path) -> int:
+    try:
+        soup = parse_html(file_path)
+        status, changes, summary = apply_convert(soup)
+        if changes:
+            save_html(file_path, str(soup))
+        print(f"CONVERT {file_path}: {summary}")
+        return status
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: convert failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_stylesheet() -> str:
+    formatter = HtmlFormatter(style=PYGMENTS_STYLE)
+    token_rules = "\n".join(formatter.get_token_style_defs(CODE_SELECTOR))
+    return f"{BASE_STYLES}{token_rules}\n"
+
+
+def run_stylesheet(docs_dir: Path) -> int:
+    try:
+        css_path = docs_dir / STYLESHEET_PATH
+        css = build_stylesheet()
+        save_text(css_path, css)
+        print(f"STYLESHEET {css_path}: bytes={len(css.encode('utf-8'))}")
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: stylesheet failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/convert code blocks to build-time syntax highlighting"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="report code block counts")
+    parser_check.add_argument("file", type=Path, help="target HTML file path")
+
+    parser_convert = subparsers.add_parser("convert", help="highlight code blocks in-place")
+    parser_convert.add_argument("file", type=Path, help="target HTML file path")
+
+    parser_stylesheet = subparsers.add_parser(
+        "stylesheet", help=f"write {STYLESHEET_PATH} under the docs directory"
+    )
+    parser_stylesheet.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.command == "stylesheet":
+        docs_dir: Path = args.docs_dir
+        if not docs_dir.is_dir():
+            print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+            return EXIT_ERROR
+        return run_stylesheet(docs_dir)
+
+    file_path: Path = args.file
+    if not file_path.exists() or not file_path.is_file():
+        print(f"ERROR: file not found: {file_path}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(file_path)
+    if args.command == "convert":
+        return run_convert(file_path)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Check/build preload and prefetch hints for every HTML file under docs/.
+
+Following a link from a lang/ listing to a view page is a cold load: the
+browser only learns about the next page on click, and about images used
+from CSS (icon sprites, backgrounds) only after the stylesheet arrived.
+
+Link graph:
+- nodes: every docs/**/*.html; edges: hrefs that resolve to one of them
+  (the rewritten /view/*.html and /lang/*.html links)
+- likely next pages of a page: its `rel="next"` page, then the targets
+  linked from the main content (`div.span9`) in document order; breadcrumb
+  targets are skipped, the visitor usually came from there
+
+Build (per page, all hints marked `data-resource-hint` and replaced on
+every run):
+- <link rel="preload" as="image"> for url() images of local stylesheets
+  whose rule matches an element of the page (at most `--max-preload`),
+  inserted before the first stylesheet; a rule with an image-set() (see
+  optimize_images.py) gets one hint for its first candidate, with that
+  candidate's `type`, instead of one per url() including the fallback
+- <link rel="prefetch"> for the first `--max-prefetch` likely next pages
+- one <script type="speculationrules"> prefetching same-site /view/ and
+  /lang/ links on hover (moderate eagerness), for browsers supporting it
+
+Usage:
+- check <docs_dir>: report the link graph and hints without writing
+- build <docs_dir>: rewrite pages in-place
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import posixpath
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+
+from docs_files import save_html
+from purge_css import CSS_URL_RE, PSEUDO_RE, STATE_PSEUDO_CLASSES, CssNode, parse_css
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+DEFAULT_MAX_PRELOAD = 2
+DEFAULT_MAX_PREFETCH = 3
+HINT_ATTR = "data-resource-hint"
+CONTENT_SELECTOR = "div.span9"
+IMAGE_SET_RE = re.compile(r"(?:-webkit-)?image-set\(", re.IGNORECASE)
+IMAGE_TYPE_RE = re.compile(r"\s*type\(\s*(['\"])([^'\"]+)\1\s*\)", re.IGNORECASE)
+SPECULATION_RULES = {
+    "prefetch": [
+        {
+            "where": {"or": [{"href_matches": "/view/*"}, {"href_matches": "/lang/*"}]},
+            "eagerness": "moderate",
+        }
+    ]
+}
+
+
+# (selectors, docs-relative image, image-set() type or None)
+CssImage = tuple[list[str], str, str | None]
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(path for path in docs_dir.rglob("*.html") if path.is_file())
+
+
+def resolve(page: str, href: str) -> str | None:
+    """Docs-relative path of a local ``href`` on ``page`` (None for external links)."""
+    target = href.split("#", 1)[0].split("?", 1)[0]
+    if not target or "://" in target or target.startswith(("//", "mailto:", "data:", "javascript:")):
+        return None
+    if target.startswith("/"):
+        return posixpath.normpath(target.lstrip("/")) or "index.html"
+    return posixpath.normpath(posixpath.join(posixpath.dirname(page), target))
+
+
+def relative_href(page: str, target: str) -> str:
+    return posixpath.relpath(target, posixpath.dirname(page) or ".")
+
+
+def rule_images(declarations: str) -> list[tuple[str, str | None]]:
+    """(url, type) of the images a browser fetches for one rule.
+
+    With an image-set() only its first candidate counts: browsers that
+    support image-set() never fetch the url() fallback declared before it,
+    and skip a candidate whose type() they do not support.
+    """
+    image_sets = list(IMAGE_SET_RE.finditer(declarations))
+    if not image_sets:
+        return [(url, None) for _quote, url in CSS_URL_RE.findall(declarations)]
+    images: list[tuple[str, str | None]] = []
+    for image_set in image_sets:
+        candidate = CSS_URL_RE.search(declarations, image_set.end())
+        if candidate is None:
+            continue
+        image_type = IMAGE_TYPE_RE.match(declarations, candidate.end())
+        images.append((candidate.group(2), image_type.group(2) if image_type else None))
+    return images
+
+
+def css_images(nodes: list[CssNode], css_path: str) -> list[CssImage]:
+    """(selectors, docs-relative image, type) for every rule with a url() image."""
+    images: list[CssImage] = []
+    for node in nodes:
+        if node[0] == "rule":
+            for url, image_type in rule_images(node[2]):
+                target = resolve(css_path, url)
+                if target is not None:
+                    images.append((node[1], target, image_type))
+        elif node[0] == "block":
+            images.extend(css_images(node[2], css_path))
+    return images
+
+
+def selector_matches(selector: str, soup: BeautifulSoup) -> bool:
+    if any(state in selector for state in STATE_PSEUDO_CLASSES):
+        return False
+    simple = PSEUDO_RE.sub("", selector).strip()
+    if not simple:
+        return False
+    try:
+        return soup.select_one(simple) is not None
+    except Exception:  # noqa: BLE001
+        # soupsieve rejects some legacy selectors; they never get a hint.
+        return False
+
+
+class Stylesheets:
+    """Parsed local stylesheets, read once per run."""
+
+    def __init__(self, docs_dir: Path) -> None:
+        self.docs_dir = docs_dir
+        self.images: dict[str, list[CssImage]] = {}
+
+    def get(self, css_path: str) -> list[CssImage]:
+        if css_path not in self.images:
+            path = self.docs_dir / css_path
+            css = path.read_text(encoding="utf-8") if path.is_file() else ""
+            self.images[css_path] = css_images(parse_css(css), css_path)
+        return self.images[css_path]
+
+
+def page_stylesheets(soup: BeautifulSoup, page: str) -> list[tuple[Tag, str]]:
+    links: list[tuple[Tag, str]] = []
+    for link in soup.find_all("link", href=True):
+        if not isinstance(link, Tag) or "stylesheet" not in (link.get("rel") or []):
+            continue
+        if link.find_parent("noscript") is not None:
+            continue
+        target = resolve(page, str(link["href"]))
+        if target is not None:
+            links.append((link, target))
+    return links
+
+
+def preload_images(
+    soup: BeautifulSoup, page: str, stylesheets: Stylesheets, pages: set[str], limit: int
+) -> list[tuple[str, str | None]]:
+    """(image, type) to preload, in stylesheet order."""
+    images: list[tuple[str, str | None]] = []
+    for _link, css_path in page_stylesheets(soup, page):
+        for selectors, image, image_type in stylesheets.get(css_path):
+            if len(images) >= limit:
+                return images
+            if image in pages or any(image == seen for seen, _type in images):
+                continue
+            if any(selector_matches(selector, soup) for selector in selectors):
+                images.append((image, image_type))
+    return images
+
+
+def link_targets(soup: BeautifulSoup, page: str, pages: set[str]) -> list[str]:
+    targets: list[str] = []
+    for anchor in soup.find_all("a", href=True):
+        target = resolve(page, str(anchor["href"]))
+        if target in pages and target != page:
+            targets.append(target)
+    return targets
+
+
+def likely_next(soup: BeautifulSoup, page: str, pages: set[str]) -> list[str]:
+    candidates: list[str] = []
+    head = soup.head
+    next_link = head.find("link", rel="next", href=True) if isinstance(head, Tag) else None
+    if isinstance(next_link, Tag):
+        target = resolve(page, str(next_link["href"]))
+        if target in pages:
+            candidates.append(target)
+    content = soup.select_one(CONTENT_SELECTOR)
+    if not isinstance(content, Tag):
+        return candidates
+    came_from = {
+        resolve(page, str(anchor["href"]))
+        for anchor in content.select("ul.breadcrumb a[href]")
+    }
+    for anchor in content.find_all("a", href=True):
+        target = resolve(page, str(anchor["href"]))
+        if target in pages and target not in came_from and target != page:
+            if target not in candidates:
+                candidates.append(target)
+    return candidates
+
+
+def inject_hints(
+    soup: BeautifulSoup, page: str, preloads: list[tuple[str, str | None]], prefetches: list[str]
+) -> None:
+    for old in soup.find_all(attrs={HINT_ATTR: True}):
+        old.decompose()
+    head = soup.head
+    if not isinstance(head, Tag):
+        return
+
+    stylesheets = page_stylesheets(soup, page)
+    for image, image_type in preloads:
+        hint = soup.new_tag(
+            "link", rel="preload", href=relative_href(page, image), attrs={"as": "image"}
+        )
+        if image_type is not None:
+            # Browsers without support for the type skip the preload.
+            hint["type"] = image_type
+        hint[HINT_ATTR] = ""
+        if stylesheets:
+            stylesheets[0][0].insert_before(hint)
+        else:
+            head.append(hint)
+    for target in prefetches:
+        hint = soup.new_tag("link", rel="prefetch", href=relative_href(page, target))
+        hint[HINT_ATTR] = ""
+        head.append(hint)
+    rules = soup.new_tag("script", type="speculationrules")
+    rules[HINT_ATTR] = ""
+    rules.string = json.dumps(SPECULATION_RULES, separators=(",", ":"))
+    head.append(rules)
+
+
+def process(docs_dir: Path, max_preload: int, max_prefetch: int, write: bool) -> int:
+    paths = html_files(docs_dir)
+    pages = {path.relative_to(docs_dir).as_posix() for path in paths}
+    stylesheets = Stylesheets(docs_dir)
+
+    edges = 0
+    in_degree: Counter[str] = Counter()
+    preloaded: Counter[str] = Counter()
+    prefetch_hints = pages_with_prefetch = written = 0
+    for path in paths:
+        page = path.relative_to(docs_dir).as_posix()
+        soup = BeautifulSoup(load_html(path), "html.parser")
+        targets = set(link_targets(soup, page, pages))
+        edges += len(targets)
+        in_degree.update(targets)
+
+        preloads = preload_images(soup, page, stylesheets, pages, max_preload)
+        prefetches = likely_next(soup, page, pages)[:max_prefetch]
+        preloaded.update(image for image, _type in preloads)
+        prefetch_hints += len(prefetches)
+        pages_with_prefetch += bool(prefetches)
+        if write:
+            inject_hints(soup, page, preloads, prefetches)
+            written += save_html(path, str(soup))
+
+    command = "BUILD" if write else "CHECK"
+    print(
+        f"{command} {docs_dir}: pages={len(pages)}, edges={edges}, "
+        f"pages_with_prefetch={pages_with_prefetch}, prefetch_hints={prefetch_hints}, "
+        f"preload_hints={sum(preloaded.values())}, pages_written={written}"
+    )
+    for image, count in preloaded.most_common():
+        print(f"{command} preload {image}: pages={count}")
+    for target, count in in_degree.most_common(3):
+        print(f"{command} most_linked {target}: in_degree={count}")
+    return EXIT_OK
+
+
+def run_check(docs_dir: Path, max_preload: int, max_prefetch: int) -> int:
+    try:
+        return process(docs_dir, max_preload, max_prefetch, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path, max_preload: int, max_prefetch: int) -> int:
+    try:
+        return process(docs_dir, max_preload, max_prefetch, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build preload and prefetch hints from the docs link graph"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "report the link graph and hints"),
+        ("build", "rewrite pages in-place"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("docs_dir", type=Path, help="docs root directory")
+        subparser.add_argument(
+            "--max-preload", type=int, default=DEFAULT_MAX_PRELOAD, help="preload hints per page"
+        )
+        subparser.add_argument(
+            "--max-prefetch", type=int, default=DEFAULT_MAX_PREFETCH, help="prefetch hints per page"
+        )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir, args.max_preload, args.max_prefetch)
+    if args.command == "build":
+        return run_build(docs_dir, args.max_preload, args.max_prefetch)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
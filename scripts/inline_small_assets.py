@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Check/build data URIs for tiny assets and dedupe icon links under docs/.
+
+Every page repeats `<link rel="shortcut icon" href="favicon.ico">` in
+<head> and requests a few images of less than a kilobyte on its own
+(img/rss.png on the top page, img/nuclear.png from css/style.css). A
+request costs more than those bytes.
+
+Build:
+- <link> tags repeating the rel and href of an earlier one are removed
+- local images of at most `--max-bytes` referenced from `<img src>`,
+  `<input type="image">`, icon links or url() in local stylesheets are
+  replaced by base64 data URIs (touch icons are only fetched when a page is
+  added to the home screen and stay as they are)
+- stylesheets are rewritten in-place, so purge_css.py picks the data URIs
+  up on its next build
+
+The glyphicons sprites are already one image per colour and stay linked.
+
+Report: local requests per page (stylesheets, scripts, icons, images and
+url() images whose rule matches an element of the page), before and after,
+averaged per page type (index, lang, view, other).
+
+Usage:
+- check <docs_dir>: report inlinable assets and request counts
+- build <docs_dir>: rewrite pages and stylesheets in-place
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import mimetypes
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+
+from docs_files import save_html, save_text
+from inject_resource_hints import (
+    CssImage,
+    css_images,
+    page_stylesheets,
+    resolve,
+    selector_matches,
+)
+from purge_css import CSS_URL_RE, page_template, parse_css
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+DEFAULT_MAX_BYTES = 2048
+ICON_RELS = ("icon", "shortcut")
+MIME_TYPES = {".ico": "image/x-icon", ".svg": "image/svg+xml"}
+
+# stylesheet path -> (selectors, image, type) of its url() images
+CssImages = dict[str, list[CssImage]]
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(path for path in docs_dir.rglob("*.html") if path.is_file())
+
+
+class Assets:
+    """Data URIs of the local files at most ``max_bytes`` long, read once per run."""
+
+    def __init__(self, docs_dir: Path, max_bytes: int) -> None:
+        self.docs_dir = docs_dir
+        self.max_bytes = max_bytes
+        self.uris: dict[str, str | None] = {}
+
+    def data_uri(self, target: str) -> str | None:
+        if target not in self.uris:
+            path = self.docs_dir / target
+            uri = None
+            if path.is_file() and path.stat().st_size <= self.max_bytes:
+                mime = MIME_TYPES.get(path.suffix) or mimetypes.guess_type(path.name)[0]
+                if mime is not None and mime.startswith("image/"):
+                    encoded = base64.b64encode(path.read_bytes()).decode("ascii")
+                    uri = f"data:{mime};base64,{encoded}"
+            self.uris[target] = uri
+        return self.uris[target]
+
+    def inlined(self) -> list[str]:
+        return sorted(target for target, uri in self.uris.items() if uri is not None)
+
+
+def is_icon_link(link: Tag) -> bool:
+    rel = [token.lower() for token in link.get("rel") or []]
+    return any(token in ICON_RELS for token in rel)
+
+
+def inline_css(css: str, css_path: str, assets: Assets) -> str:
+    def replace(match: re.Match[str]) -> str:
+        target = resolve(css_path, match.group(2))
+        uri = assets.data_uri(target) if target is not None else None
+        return f'url("{uri}")' if uri is not None else match.group(0)
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def dedupe_links(soup: BeautifulSoup) -> int:
+    seen: set[tuple[tuple[str, ...], str]] = set()
+    removed = 0
+    for link in soup.find_all("link", href=True):
+        if not isinstance(link, Tag):
+            continue
+        key = (tuple(sorted(link.get("rel") or [])), str(link["href"]))
+        if key in seen:
+            link.decompose()
+            removed += 1
+        else:
+            seen.add(key)
+    return removed
+
+
+def inline_html(soup: BeautifulSoup, page: str, assets: Assets) -> int:
+    inlined = 0
+    elements = [
+        (tag, "src") for tag in soup.find_all("img", src=True) if isinstance(tag, Tag)
+    ] + [
+        (tag, "src") for tag in soup.find_all("input", type="image", src=True)
+        if isinstance(tag, Tag)
+    ] + [
+        (tag, "href") for tag in soup.find_all("link", href=True)
+        if isinstance(tag, Tag) and is_icon_link(tag)
+    ]
+    for tag, attr in elements:
+        target = resolve(page, str(tag[attr]))
+        uri = assets.data_uri(target) if target is not None else None
+        if uri is not None:
+            tag[attr] = uri
+            inlined += 1
+    return inlined
+
+
+def count_requests(
+    soup: BeautifulSoup, page: str, stylesheets: dict[str, str], images: CssImages
+) -> int:
+    """Distinct local URLs the page makes the browser fetch on load."""
+    urls: set[str] = set()
+    for _link, css_path in page_stylesheets(soup, page):
+        urls.add(css_path)
+        if css_path not in images:
+            images[css_path] = css_images(parse_css(stylesheets.get(css_path, "")), css_path)
+        for selectors, image, _type in images[css_path]:
+            if image not in urls and any(selector_matches(s, soup) for s in selectors):
+                urls.add(image)
+    references = [
+        (tag, "src") for tag in soup.find_all(["script", "img", "input"], src=True)
+    ] + [(tag, "href") for tag in soup.find_all("link", href=True) if is_icon_link(tag)]
+    for tag, attr in references:
+        if tag.name == "input" and tag.get("type") != "image":
+            continue
+        target = resolve(page, str(tag[attr]))
+        if target is not None:
+            urls.add(target)
+    return len(urls)
+
+
+def read_stylesheets(docs_dir: Path) -> dict[str, str]:
+    return {
+        path.relative_to(docs_dir).as_posix(): path.read_text(encoding="utf-8")
+        for path in sorted(docs_dir.rglob("*.css"))
+        if path.is_file()
+    }
+
+
+def process(docs_dir: Path, max_bytes: int, write: bool) -> int:
+    assets = Assets(docs_dir, max_bytes)
+    before_css = read_stylesheets(docs_dir)
+    after_css = {
+        css_path: inline_css(css, css_path, assets) for css_path, css in before_css.items()
+    }
+    before_images: CssImages = {}
+    after_images: CssImages = {}
+
+    pages: Counter[str] = Counter()
+    before: Counter[str] = Counter()
+    after: Counter[str] = Counter()
+    bytes_added: Counter[str] = Counter()
+    duplicate_links = inlined_refs = pages_written = 0
+    for path in html_files(docs_dir):
+        page = path.relative_to(docs_dir).as_posix()
+        template = page_template(docs_dir, path)
+        soup = BeautifulSoup(load_html(path), "html.parser")
+        before[template] += count_requests(soup, page, before_css, before_images)
+        original_bytes = len(str(soup).encode("utf-8"))
+
+        changes = dedupe_links(soup)
+        duplicate_links += changes
+        inlined = inline_html(soup, page, assets)
+        inlined_refs += inlined
+        after[template] += count_requests(soup, page, after_css, after_images)
+        pages[template] += 1
+        output = str(soup)
+        bytes_added[template] += len(output.encode("utf-8")) - original_bytes
+        if write and changes + inlined:
+            pages_written += save_html(path, output)
+
+    css_written = 0
+    if write:
+        for css_path, css in after_css.items():
+            css_written += save_text(docs_dir / css_path, css)
+
+    command = "BUILD" if write else "CHECK"
+    changed_css = sum(after_css[name] != before_css[name] for name in before_css)
+    print(
+        f"{command} {docs_dir}: pages={sum(pages.values())}, "
+        f"inlined_assets={','.join(assets.inlined()) or 'none'}, "
+        f"inlined_html_refs={inlined_refs}, stylesheets_inlined={changed_css}, "
+        f"duplicate_links_removed={duplicate_links}, pages_written={pages_written}, "
+        f"stylesheets_written={css_written}"
+    )
+    for template in sorted(pages):
+        count = pages[template]
+        print(
+            f"{command} {template}: pages={count}, "
+            f"requests_per_page_before={before[template] / count:.2f}, "
+            f"requests_per_page_after={after[template] / count:.2f}, "
+            f"bytes_per_page_delta={bytes_added[template] // count}"
+        )
+    return EXIT_OK
+
+
+def run_check(docs_dir: Path, max_bytes: int) -> int:
+    try:
+        return process(docs_dir, max_bytes, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path, max_bytes: int) -> int:
+    try:
+        return process(docs_dir, max_bytes, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build data URIs for tiny assets and dedupe icon links"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "report inlinable assets and request counts"),
+        ("build", "rewrite pages and stylesheets in-place"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("docs_dir", type=Path, help="docs root directory")
+        subparser.add_argument(
+            "--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="largest asset to inline"
+        )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir, args.max_bytes)
+    if args.command == "build":
+        return run_build(docs_dir, args.max_bytes)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -27,6 +27,9 @@ from pathlib import Path
 
 from bs4 import BeautifulSoup, Tag
 
+from docs_files import save_html
+from prefilter import Prefilter
+
 EXIT_OK = 0
 EXIT_NOT_FOUND = 1
 EXIT_AMBIGUOUS = 2
@@ -35,13 +38,17 @@ EXIT_ERROR = 3
 COBOL_SELECTOR = 'li[data-url_match="/lang/Cobol$"]'
 ALL_SELECTOR = 'li[data-url_match="/lang/All$"]'
 
+PREFILTER = Prefilter((b"/lang/cobol$", b"/lang/all$"))
+
 
 def load_html(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def save_html(path: Path, html: str) -> None:
-    path.write_text(html, encoding="utf-8")
+def parse_html(path: Path) -> BeautifulSoup:
+    # An empty tree gives the same 0-match result as the full page would.
+    html = load_html(path) if PREFILTER.may_match(path.read_bytes()) else ""
+    return BeautifulSoup(html, "html.parser")
 
 
 def find_cobol_items(soup: BeautifulSoup) -> list[Tag]:
@@ -72,7 +79,7 @@ def evaluate(cobol_count: int, all_count: int) -> int:
 
 def run_check(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
+        soup = parse_html(file_path)
         cobol_items = find_cobol_items(soup)
         all_items = find_all_items(soup)
     except Exception as exc:  # noqa: BLE001
@@ -85,34 +92,33 @@ def run_check(file_path: Path) -> int:
     return evaluate(cobol_count, all_count)
 
 
+def apply_insert(soup: BeautifulSoup) -> tuple[int, int, str]:
+    cobol_items = find_cobol_items(soup)
+    all_items = find_all_items(soup)
+
+    cobol_count = len(cobol_items)
+    all_count = len(all_items)
+    state = evaluate(cobol_count, all_count)
+
+    if state == EXIT_AMBIGUOUS:
+        return EXIT_AMBIGUOUS, 0, f"aborted (cobol={cobol_count}, all={all_count})"
+    if state == EXIT_NOT_FOUND:
+        return EXIT_NOT_FOUND, 0, f"skipped (cobol={cobol_count}, all={all_count})"
+
+    cobol = cobol_items[0]
+    new_item = build_all_item(soup)
+    cobol.insert_after(new_item)
+    return EXIT_OK, 1, "inserted 1 item"
+
+
 def run_insert(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
-        cobol_items = find_cobol_items(soup)
-        all_items = find_all_items(soup)
-
-        cobol_count = len(cobol_items)
-        all_count = len(all_items)
-        state = evaluate(cobol_count, all_count)
-
-        if state == EXIT_AMBIGUOUS:
-            print(
-                f"INSERT {file_path}: aborted (cobol={cobol_count}, all={all_count})"
-            )
-            return EXIT_AMBIGUOUS
-        if state == EXIT_NOT_FOUND:
-            print(
-                f"INSERT {file_path}: skipped (cobol={cobol_count}, all={all_count})"
-            )
-            return EXIT_NOT_FOUND
-
-        cobol = cobol_items[0]
-        new_item = build_all_item(soup)
-        cobol.insert_after(new_item)
-
-        save_html(file_path, str(soup))
-        print(f"INSERT {file_path}: inserted 1 item")
-        return EXIT_OK
+        soup = parse_html(file_path)
+        status, changes, summary = apply_insert(soup)
+        if changes:
+            save_html(file_path, str(soup))
+        print(f"INSERT {file_path}: {summary}")
+        return status
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: insert failed: {exc}", file=sys.stderr)
         return EXIT_ERROR
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Check/build lazy loading, async decoding and intrinsic sizes for docs images.
+
+View and listing pages load every image and embed eagerly (a long comment
+thread repeats the bookmark button per comment) and local images such as
+img/rss.png have no width/height, so the layout shifts when they arrive.
+
+Build (per page, existing attributes are never overwritten):
+- `<img>` with a local src (docs-relative or data: URI): width/height from
+  the image header (Pillow reads the header only, no decode); when one of
+  them is set the other follows the aspect ratio. Sizes are cached by
+  content hash in .cache/image-sizes.json (written by build only); within
+  a run each file is read and hashed once (keyed by path, mtime and size)
+- below the fold: `<img>` gets `loading="lazy"` and `decoding="async"`,
+  `<iframe>` gets `loading="lazy"`. Above the fold are elements in the
+  fixed navbar and the first `--eager` elements of the page in document
+  order; they keep loading eagerly
+
+External images (b.st-hatena.com) are not fetched; only their loading
+attributes are added.
+
+Report: elements changed per page (pages without changes are not listed).
+
+Usage:
+- check <docs_dir>: report the elements that would change
+- build <docs_dir>: rewrite pages in-place
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+from PIL import Image
+
+from docs_files import save_html, save_text
+from inject_resource_hints import resolve
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+DEFAULT_CACHE = Path(__file__).resolve().parent.parent / ".cache" / "image-sizes.json"
+DEFAULT_EAGER = 2
+ABOVE_FOLD_SELECTOR = "div.navbar"
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(path for path in docs_dir.rglob("*.html") if path.is_file())
+
+
+def load_cache(cache_path: Path) -> dict[str, list[int]]:
+    if not cache_path.exists():
+        return {}
+    return json.loads(cache_path.read_text(encoding="utf-8"))
+
+
+def save_cache(cache_path: Path, cache: dict[str, list[int]]) -> None:
+    save_text(cache_path, json.dumps(cache, indent=2, sort_keys=True) + "\n")
+
+
+class ImageSizes:
+    """(width, height) of local images, keyed by content hash across runs."""
+
+    def __init__(self, docs_dir: Path, cache: dict[str, list[int]]) -> None:
+        self.docs_dir = docs_dir
+        self.cache = cache
+        # data: URI or (path, mtime, size) -> content hash, for this run only:
+        # the same icon is referenced from hundreds of pages.
+        self.keys: dict[object, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def size(self, page: str, src: str) -> tuple[int, int] | None:
+        data: bytes | None = None
+        if src.startswith("data:"):
+            header, _, payload = src.partition(",")
+            if not header.endswith(";base64"):
+                return None
+            memo_key: object = src
+            if memo_key not in self.keys:
+                data = base64.b64decode(payload)
+        else:
+            target = resolve(page, src)
+            path = self.docs_dir / target if target is not None else None
+            if path is None or not path.is_file():
+                return None
+            stat = path.stat()
+            memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+            if memo_key not in self.keys:
+                data = path.read_bytes()
+
+        if data is not None:
+            self.keys[memo_key] = hashlib.sha256(data).hexdigest()
+        key = self.keys[memo_key]
+        if key in self.cache:
+            self.hits += 1
+        else:
+            # Only the first lookup of a file or URI gets here, with its data.
+            self.misses += 1
+            self.cache[key] = image_size(data or b"")
+        width_height = self.cache[key]
+        return (width_height[0], width_height[1]) if width_height else None
+
+
+def image_size(data: bytes) -> list[int]:
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return list(image.size)
+    except Exception:  # noqa: BLE001
+        # SVG and unreadable files have no intrinsic size here.
+        return []
+
+
+def is_number(value: object) -> bool:
+    return isinstance(value, str) and value.isdigit()
+
+
+def add_size(img: Tag, size: tuple[int, int]) -> bool:
+    width, height = size
+    if not width or not height:
+        return False
+    has_width, has_height = is_number(img.get("width")), is_number(img.get("height"))
+    if has_width and has_height:
+        return False
+    if has_width:
+        img["height"] = str(round(int(str(img["width"])) * height / width))
+    elif has_height:
+        img["width"] = str(round(int(str(img["height"])) * width / height))
+    elif img.has_attr("width") or img.has_attr("height"):
+        # Percentages or CSS-like values: leave the author's sizing alone.
+        return False
+    else:
+        img["width"], img["height"] = str(width), str(height)
+    return True
+
+
+def apply_media(soup: BeautifulSoup, page: str, sizes: ImageSizes, eager: int) -> dict[str, int]:
+    counts = {"elements": 0, "sized": 0, "lazy": 0, "async": 0}
+    above_fold = {
+        id(tag)
+        for area in soup.select(ABOVE_FOLD_SELECTOR)
+        for tag in area.find_all(["img", "iframe"])
+    }
+    eager_left = eager
+    for tag in soup.find_all(["img", "iframe"]):
+        if not isinstance(tag, Tag):
+            continue
+        changed = False
+        src = str(tag.get("src", ""))
+        if tag.name == "img" and src:
+            size = sizes.size(page, src)
+            if size is not None and add_size(tag, size):
+                counts["sized"] += 1
+                changed = True
+
+        below_fold = id(tag) not in above_fold and eager_left <= 0
+        if id(tag) not in above_fold and eager_left > 0:
+            eager_left -= 1
+        if below_fold:
+            if not tag.has_attr("loading"):
+                tag["loading"] = "lazy"
+                counts["lazy"] += 1
+                changed = True
+            if tag.name == "img" and not tag.has_attr("decoding"):
+                tag["decoding"] = "async"
+                counts["async"] += 1
+                changed = True
+        counts["elements"] += changed
+    return counts
+
+
+def process(docs_dir: Path, cache_path: Path, eager: int, write: bool) -> int:
+    sizes = ImageSizes(docs_dir, load_cache(cache_path))
+    command = "BUILD" if write else "CHECK"
+    totals = {"elements": 0, "sized": 0, "lazy": 0, "async": 0}
+    pages = changed_pages = written = 0
+    for path in html_files(docs_dir):
+        page = path.relative_to(docs_dir).as_posix()
+        html = load_html(path)
+        pages += 1
+        if "<img" not in html and "<iframe" not in html:
+            continue
+        soup = BeautifulSoup(html, "html.parser")
+        counts = apply_media(soup, page, sizes, eager)
+        if not counts["elements"]:
+            continue
+        changed_pages += 1
+        for name, value in counts.items():
+            totals[name] += value
+        details = ", ".join(f"{name}={value}" for name, value in counts.items())
+        print(f"{command} {page}: {details}")
+        if write:
+            written += save_html(path, str(soup))
+    if write:
+        save_cache(cache_path, sizes.cache)
+
+    print(
+        f"{command} {docs_dir}: pages={pages}, changed_pages={changed_pages}, "
+        + ", ".join(f"{name}={value}" for name, value in totals.items())
+        + f", size_cache_hits={sizes.hits}, size_cache_misses={sizes.misses}, "
+        f"pages_written={written}"
+    )
+    return EXIT_OK
+
+
+def run_check(docs_dir: Path, cache_path: Path, eager: int) -> int:
+    try:
+        return process(docs_dir, cache_path, eager, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path, cache_path: Path, eager: int) -> int:
+    try:
+        return process(docs_dir, cache_path, eager, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build lazy loading, async decoding and sizes for docs images"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "report the elements that would change"),
+        ("build", "rewrite pages in-place"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("docs_dir", type=Path, help="docs root directory")
+        subparser.add_argument(
+            "--cache", type=Path, default=DEFAULT_CACHE, help="content-hash size cache file"
+        )
+        subparser.add_argument(
+            "--eager", type=int, default=DEFAULT_EAGER, help="elements per page loaded eagerly"
+        )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir, args.cache, args.eager)
+    if args.command == "build":
+        return run_build(docs_dir, args.cache, args.eager)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""Re-mirror the source site into original/ concurrently and resumably.
+
+Replaces the two wget runs in original/README.md. The page list comes from
+content-links.json (top page, SITE_PAGES, language pages, content links);
+same-host page requisites (css/js/images) referenced by the pages are
+fetched afterwards. Like the wget options used for the first mirror:
+
+- adjust-extension: `/view/<id>` is saved as `view/<id>.html`
+- convert-links: links to mirrored URLs are rewritten to relative local
+  paths (attribute values only; the rest of the bytes are untouched)
+
+Fetching:
+- asyncio with `--concurrency` requests in flight (urllib in worker threads)
+- conditional requests: ETag / Last-Modified of the previous run are sent
+  as If-None-Match / If-Modified-Since; 304 leaves the file untouched
+- a file is written (atomically) only when its content changed
+- progress is checkpointed to `--state` (default .cache/mirror.json);
+  an interrupted run resumes with the URLs it had not finished
+- `--base-url` fetches from another origin (e.g. a local stand-in server)
+  while links are still resolved against the canonical base_url
+
+Usage:
+- mirror <links_json> <original_dir>: fetch and update changed files
+- check <links_json> <original_dir>: list the URLs and local paths (no network)
+
+Exit codes:
+- 0: success
+- 1: some URLs failed or the run was interrupted (rerun to resume)
+- 3: processing error (unreadable links file, state, write failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import posixpath
+import re
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+from docs_files import save_bytes
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 3
+
+DEFAULT_STATE = Path(__file__).resolve().parent.parent / ".cache" / "mirror.json"
+SITE_PAGES = ("about", "hot", "new", "new_comments", "ranking", "legend", "rss")
+REQUISITE_SUFFIXES = (".css", ".js", ".png", ".gif", ".jpg", ".jpeg", ".ico")
+USER_AGENT = "unkode-mania-mirror/1.0"
+RETRIES = 3
+CHECKPOINT_EVERY = 25
+
+LINK_ATTR_RE = re.compile(
+    r"""(?P<prefix>(?<![\w-])(?:href|src)=)(?P<quote>["'])(?P<value>.*?)(?P=quote)"""
+)
+
+
+@dataclass
+class MirrorState:
+    """Validators of the last successful fetch and progress of the current run."""
+
+    entries: dict[str, dict[str, str]] = field(default_factory=dict)
+    pending_run: list[str] | None = None
+    done: set[str] = field(default_factory=set)
+
+    @classmethod
+    def load(cls, path: Path) -> MirrorState:
+        if not path.exists():
+            return cls()
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(data.get("entries", {}), data.get("pending_run"), set(data.get("done", [])))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "entries": self.entries,
+            "pending_run": self.pending_run,
+            "done": sorted(self.done),
+        }
+        save_bytes(path, (json.dumps(data, indent=2, sort_keys=True) + "\n").encode("utf-8"))
+
+
+def local_path(base_url: str, url: str, page: bool) -> str | None:
+    """Map a site URL to its path under original/ (None for other hosts)."""
+    if not url.startswith(base_url):
+        return None
+    relative = urlsplit(url).path[len(urlsplit(base_url).path) :].strip("/")
+    if not relative:
+        return "index.html"
+    if page and relative != "rss" and not relative.endswith(".html"):
+        return f"{relative}.html"
+    return relative
+
+
+def page_urls(links: dict[str, object]) -> list[str]:
+    base_url = str(links["base_url"])
+    urls = [base_url, *(urljoin(base_url, name) for name in SITE_PAGES)]
+    for key in ("language_pages", "content_links"):
+        value = links.get(key, [])
+        if isinstance(value, list):
+            urls.extend(str(url) for url in value)
+    return list(dict.fromkeys(urls))
+
+
+def convert_links(html: str, page_url: str, base_url: str, targets: dict[str, str]) -> str:
+    """Rewrite href/src values pointing at mirrored URLs to relative local paths."""
+    page_dir = posixpath.dirname(targets[page_url])
+
+    def replace(match: re.Match[str]) -> str:
+        value = match.group("value")
+        url, fragment = urldefrag(urljoin(page_url, value.replace("&amp;", "&")))
+        if url.startswith("http://") and base_url.startswith("https://"):
+            url = "https://" + url[len("http://") :]
+        target = targets.get(url) or targets.get(url.rstrip("/"))
+        if target is None:
+            return match.group(0)
+        relative = posixpath.relpath(target, page_dir or ".")
+        converted = f"{relative}#{fragment}" if fragment else relative
+        return f"{match.group('prefix')}{match.group('quote')}{converted}{match.group('quote')}"
+
+    return LINK_ATTR_RE.sub(replace, html)
+
+
+def requisite_urls(html: str, page_url: str, base_url: str) -> set[str]:
+    found: set[str] = set()
+    for match in LINK_ATTR_RE.finditer(html):
+        url = urldefrag(urljoin(page_url, match.group("value")))[0]
+        if url.startswith(base_url) and urlsplit(url).path.lower().endswith(REQUISITE_SUFFIXES):
+            found.add(url)
+    return found
+
+
+def fetch(
+    url: str, validators: dict[str, str], timeout: float
+) -> tuple[int, bytes, dict[str, str]]:
+    """Blocking conditional GET (run in a worker thread). Returns status, body, validators."""
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    if validators.get("etag"):
+        request.add_header("If-None-Match", validators["etag"])
+    if validators.get("last_modified"):
+        request.add_header("If-Modified-Since", validators["last_modified"])
+
+    for attempt in range(RETRIES):
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                body = response.read()
+                headers = {
+                    "etag": response.headers.get("ETag", ""),
+                    "last_modified": response.headers.get("Last-Modified", ""),
+                }
+                return response.status, body, headers
+        except urllib.error.HTTPError as exc:
+            if exc.code == 304:
+                return 304, b"", {}
+            if exc.code < 500 or attempt == RETRIES - 1:
+                raise
+        except urllib.error.URLError:
+            if attempt == RETRIES - 1:
+                raise
+        time.sleep(2**attempt)
+    raise RuntimeError("unreachable")
+
+
+@dataclass
+class MirrorRun:
+    fetch_base: str
+    base_url: str
+    original_dir: Path
+    state: MirrorState
+    state_path: Path
+    timeout: float
+    targets: dict[str, str] = field(default_factory=dict)
+    counts: dict[str, int] = field(
+        default_factory=lambda: dict.fromkeys(
+            ("fetched", "not_modified", "written", "unchanged", "failed", "resumed"), 0
+        )
+    )
+    requisites: set[str] = field(default_factory=set)
+
+    def source_url(self, url: str) -> str:
+        return self.fetch_base + url[len(self.base_url) :]
+
+    async def mirror_url(self, url: str, page: bool, semaphore: asyncio.Semaphore) -> None:
+        target = self.original_dir / self.targets[url]
+        if url in self.state.done:
+            self.counts["resumed"] += 1
+            if page and target.exists():
+                self.requisites |= requisite_urls(
+                    target.read_text(encoding="utf-8", errors="replace"), url, self.base_url
+                )
+            return
+
+        validators = self.state.entries.get(url, {}) if target.exists() else {}
+        async with semaphore:
+            try:
+                status, body, headers = await asyncio.to_thread(
+                    fetch, self.source_url(url), validators, self.timeout
+                )
+            except Exception as exc:  # noqa: BLE001
+                self.counts["failed"] += 1
+                print(f"FAIL {url}: {exc}", file=sys.stderr)
+                return
+
+        if status == 304:
+            self.counts["not_modified"] += 1
+            body = target.read_bytes()
+        else:
+            self.counts["fetched"] += 1
+            if page and self.targets[url].endswith(".html"):
+                html = convert_links(body.decode("utf-8"), url, self.base_url, self.targets)
+                body = html.encode("utf-8")
+            if save_bytes(target, body):
+                self.counts["written"] += 1
+                print(f"WRITE {target}: bytes={len(body)}")
+            else:
+                self.counts["unchanged"] += 1
+            self.state.entries[url] = {
+                **headers,
+                "sha256": hashlib.sha256(body).hexdigest(),
+            }
+
+        if page:
+            self.requisites |= requisite_urls(
+                body.decode("utf-8", errors="replace"), url, self.base_url
+            )
+        self.state.done.add(url)
+        if len(self.state.done) % CHECKPOINT_EVERY == 0:
+            self.state.save(self.state_path)
+
+    async def mirror(self, urls: list[str], page: bool, concurrency: int) -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(self.mirror_url(url, page, semaphore) for url in urls))
+
+
+def load_links(links_path: Path) -> dict[str, object]:
+    links = json.loads(links_path.read_text(encoding="utf-8"))
+    if not isinstance(links, dict) or "base_url" not in links:
+        raise ValueError(f"base_url missing in {links_path}")
+    return links
+
+
+def build_targets(base_url: str, urls: list[str]) -> dict[str, str]:
+    targets: dict[str, str] = {}
+    for url in urls:
+        path = local_path(base_url, url, page=True)
+        if path is not None:
+            targets[url] = path
+    return targets
+
+
+def run_check(links_path: Path, original_dir: Path) -> int:
+    try:
+        links = load_links(links_path)
+        base_url = str(links["base_url"])
+        targets = build_targets(base_url, page_urls(links))
+        missing = 0
+        for url, path in targets.items():
+            exists = (original_dir / path).exists()
+            missing += not exists
+            print(f"PAGE {url}: path={path}, exists={int(exists)}")
+        print(f"CHECK {original_dir}: pages={len(targets)}, missing={missing}")
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_mirror(
+    links_path: Path,
+    original_dir: Path,
+    fetch_base: str | None,
+    state_path: Path,
+    concurrency: int,
+    timeout: float,
+    restart: bool,
+) -> int:
+    try:
+        links = load_links(links_path)
+        base_url = str(links["base_url"])
+        urls = page_urls(links)
+        state = MirrorState.load(state_path)
+        if restart or state.pending_run != urls:
+            state.pending_run = urls
+            state.done = set()
+
+        run = MirrorRun(
+            (fetch_base or base_url).rstrip("/") + "/",
+            base_url,
+            original_dir,
+            state,
+            state_path,
+            timeout,
+            build_targets(base_url, urls),
+        )
+
+        async def mirror_all() -> None:
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+            pages = list(run.targets)
+            await run.mirror(pages, True, concurrency)
+            requisites = sorted(run.requisites - set(pages))
+            for url in requisites:
+                path = local_path(base_url, url, page=False)
+                if path is not None:
+                    run.targets[url] = path
+            await run.mirror([url for url in requisites if url in run.targets], False, concurrency)
+
+        try:
+            asyncio.run(mirror_all())
+        finally:
+            # Checkpoint even when interrupted; the next run resumes from here.
+            if run.counts["failed"] == 0 and state.done >= set(run.targets):
+                state.pending_run = None
+                state.done = set()
+            state.save(state_path)
+
+        counts = ", ".join(f"{name}={value}" for name, value in run.counts.items())
+        print(f"MIRROR {original_dir}: urls={len(run.targets)}, {counts}")
+        return EXIT_FAILED if run.counts["failed"] else EXIT_OK
+    except KeyboardInterrupt:
+        print(f"INTERRUPTED {original_dir}: checkpoint saved to {state_path}", file=sys.stderr)
+        return EXIT_FAILED
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: mirror failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Re-mirror the source site into original/ concurrently and resumably"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="list URLs and local paths")
+    parser_check.add_argument("links_json", type=Path, help="content-links.json")
+    parser_check.add_argument("original_dir", type=Path, help="original mirror directory")
+
+    parser_mirror = subparsers.add_parser("mirror", help="fetch and update changed files")
+    parser_mirror.add_argument("links_json", type=Path, help="content-links.json")
+    parser_mirror.add_argument("original_dir", type=Path, help="original mirror directory")
+    parser_mirror.add_argument(
+        "--base-url", default=None, help="fetch from this origin instead of base_url"
+    )
+    parser_mirror.add_argument(
+        "--state", type=Path, default=DEFAULT_STATE, help="validators/checkpoint file"
+    )
+    parser_mirror.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser_mirror.add_argument("--timeout", type=float, default=30.0, help="request timeout")
+    parser_mirror.add_argument(
+        "--restart", action="store_true", help="ignore the checkpoint of an interrupted run"
+    )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if not args.links_json.is_file():
+        print(f"ERROR: file not found: {args.links_json}", file=sys.stderr)
+        return EXIT_ERROR
+    if not args.original_dir.is_dir():
+        print(f"ERROR: directory not found: {args.original_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(args.links_json, args.original_dir)
+    if args.command == "mirror":
+        return run_mirror(
+            args.links_json,
+            args.original_dir,
+            args.base_url,
+            args.state,
+            args.concurrency,
+            args.timeout,
+            args.restart,
+        )
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Local stand-in origin for mirror_original.py and a self-check against it.
+
+The stand-in serves a mirrored directory the way the source site serves it:
+- `/` is index.html, `/view/<id>` is view/<id>.html (the reverse of wget's
+  adjust-extension), everything else maps to the file of the same path
+- every response carries an ETag (content hash) and a Last-Modified (file
+  mtime); If-None-Match / If-Modified-Since that still match get a 304
+- `--fail PATH` answers 503 for that request path, to interrupt a run
+
+check copies original/ into a temporary site, serves it and runs
+mirror_original.py against it (`--base-url`) with a small links file (top
+page, site pages, `--pages` language and content pages):
+1. first run with one content page failing: exit 1, every other URL fetched
+   and written, the checkpoint keeps the finished URLs
+2. resume: only the failed page is fetched, every other URL is resumed
+3. rerun: every URL is answered with 304 and nothing is written
+4. one page changed at the origin: only that page is fetched and written
+
+Usage:
+- serve <site_dir> [--port 8000] [--bind 127.0.0.1] [--fail PATH ...]
+- check <original_dir> [--pages 5]: run the scenario above
+
+Exit codes:
+- 0: success (check: every step passed)
+- 1: a check step failed
+- 3: processing error (startup failure, unreadable links file)
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import mirror_original
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 3
+
+DEFAULT_PAGES = 5
+COUNTS_RE = re.compile(r"^MIRROR .*?: (?P<counts>urls=.*)$", re.MULTILINE)
+
+
+class StandInHandler(SimpleHTTPRequestHandler):
+    # Shared with start_server's caller, which may clear it between runs.
+    fail_paths: set[str] = set()
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def resolve(self) -> Path | None:
+        root = Path(self.directory)
+        relative = self.path.split("?", 1)[0].strip("/") or "index.html"
+        for candidate in (relative, f"{relative}.html"):
+            path = root / candidate
+            if path.is_file() and path.resolve().is_relative_to(root.resolve()):
+                return path
+        return None
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?", 1)[0] in self.fail_paths:
+            self.send_error(503)
+            return
+        path = self.resolve()
+        if path is None:
+            self.send_error(404)
+            return
+
+        body = path.read_bytes()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        mtime = int(path.stat().st_mtime)
+        if not_modified(
+            self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since"), etag, mtime
+        ):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(str(path)))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def not_modified(
+    if_none_match: str | None, if_modified_since: str | None, etag: str, mtime: int
+) -> bool:
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2).
+    if if_none_match is not None:
+        return etag in (tag.strip() for tag in if_none_match.split(","))
+    if if_modified_since is not None:
+        try:
+            return mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def start_server(
+    site_dir: Path, bind: str, port: int, fail_paths: set[str]
+) -> ThreadingHTTPServer:
+    handler = type("Handler", (StandInHandler,), {"fail_paths": fail_paths})
+    server = ThreadingHTTPServer((bind, port), partial(handler, directory=str(site_dir)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_serve(site_dir: Path, bind: str, port: int, fail_paths: list[str]) -> int:
+    try:
+        server = start_server(site_dir, bind, port, set(fail_paths))
+    except OSError as exc:
+        print(f"ERROR: cannot listen on {bind}:{port}: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+    print(f"SERVE http://{bind}:{server.server_port}/ ({site_dir}), fail={len(fail_paths)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return EXIT_OK
+
+
+def mirror(
+    links_path: Path, out_dir: Path, base_url: str, state_path: Path
+) -> tuple[int, dict[str, int]]:
+    """One mirror_original.py run; returns its exit code and the MIRROR counts."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exit_code = mirror_original.run_mirror(
+            links_path, out_dir, base_url, state_path, 4, 10.0, False
+        )
+    match = COUNTS_RE.search(output.getvalue())
+    counts: dict[str, int] = {}
+    if match is not None:
+        for item in match.group("counts").split(", "):
+            name, _, value = item.partition("=")
+            counts[name] = int(value)
+    return exit_code, counts
+
+
+def expect(step: str, exit_code: int, counts: dict[str, int], wanted: dict[str, int]) -> bool:
+    actual = {"exit": exit_code, **counts}
+    failed = {name: value for name, value in wanted.items() if actual.get(name) != value}
+    details = ", ".join(f"{name}={value}" for name, value in actual.items())
+    print(f"{'PASS' if not failed else 'FAIL'} {step}: {details}")
+    for name, value in failed.items():
+        print(f"  expected {name}={value}, got {actual.get(name)}")
+    return not failed
+
+
+def run_check(original_dir: Path, pages: int) -> int:
+    try:
+        links = mirror_original.load_links(original_dir / "content-links.json")
+        base_url = str(links["base_url"])
+        language_pages = [str(url) for url in links.get("language_pages", [])][:pages]
+        content_links = [str(url) for url in links.get("content_links", [])][:pages]
+        failing = content_links[0]
+        with tempfile.TemporaryDirectory(prefix="mirror-standin-") as tmp:
+            work = Path(tmp)
+            site_dir = work / "site"
+            shutil.copytree(original_dir, site_dir)
+            out_dir = work / "original"
+            out_dir.mkdir()
+            state_path = work / "mirror.json"
+            links_path = work / "content-links.json"
+            links_path.write_text(
+                json.dumps(
+                    {
+                        "base_url": base_url,
+                        "language_pages": language_pages,
+                        "content_links": content_links,
+                    }
+                ),
+                encoding="utf-8",
+            )
+
+            fail_paths = {"/" + failing[len(base_url) :]}
+            server = start_server(site_dir, "127.0.0.1", 0, fail_paths)
+            origin = f"http://127.0.0.1:{server.server_port}/"
+            try:
+                exit_code, first = mirror(links_path, out_dir, origin, state_path)
+                total = first.get("urls", 0)
+                results = [
+                    expect(
+                        "first run, one page failing",
+                        exit_code,
+                        first,
+                        {
+                            "exit": EXIT_FAILED,
+                            "failed": 1,
+                            "fetched": total - 1,
+                            "written": total - 1,
+                        },
+                    )
+                ]
+                fail_paths.clear()
+
+                exit_code, resumed = mirror(links_path, out_dir, origin, state_path)
+                results.append(
+                    expect(
+                        "resume",
+                        exit_code,
+                        resumed,
+                        {
+                            "exit": EXIT_OK,
+                            "resumed": total - 1,
+                            "fetched": 1,
+                            "written": 1,
+                            "failed": 0,
+                        },
+                    )
+                )
+
+                exit_code, rerun = mirror(links_path, out_dir, origin, state_path)
+                results.append(
+                    expect(
+                        "rerun",
+                        exit_code,
+                        rerun,
+                        {"exit": EXIT_OK, "not_modified": total, "fetched": 0, "written": 0},
+                    )
+                )
+
+                changed = site_dir / mirror_original.local_path(
+                    base_url, content_links[-1], page=True
+                )
+                changed.write_bytes(changed.read_bytes() + b"<!-- changed -->\n")
+                exit_code, update = mirror(links_path, out_dir, origin, state_path)
+                results.append(
+                    expect(
+                        "changed page",
+                        exit_code,
+                        update,
+                        {"exit": EXIT_OK, "not_modified": total - 1, "fetched": 1, "written": 1},
+                    )
+                )
+            finally:
+                server.shutdown()
+
+        passed = sum(results)
+        print(f"CHECK {original_dir}: steps={len(results)}, passed={passed}, urls={total}")
+        return EXIT_OK if passed == len(results) else EXIT_FAILED
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Local stand-in origin for mirror_original.py and a self-check against it"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_serve = subparsers.add_parser("serve", help="serve a mirrored directory as the origin")
+    parser_serve.add_argument("site_dir", type=Path, help="directory to serve")
+    parser_serve.add_argument("--port", type=int, default=8000, help="listen port")
+    parser_serve.add_argument("--bind", default="127.0.0.1", help="listen address")
+    parser_serve.add_argument(
+        "--fail", action="append", default=[], metavar="PATH", help="answer 503 for this path"
+    )
+
+    parser_check = subparsers.add_parser(
+        "check", help="run the mirror scenario against the stand-in"
+    )
+    parser_check.add_argument("original_dir", type=Path, help="original mirror directory")
+    parser_check.add_argument(
+        "--pages", type=int, default=DEFAULT_PAGES, help="language and content pages to mirror"
+    )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    directory: Path = args.site_dir if args.command == "serve" else args.original_dir
+    if not directory.is_dir():
+        print(f"ERROR: directory not found: {directory}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "serve":
+        return run_serve(args.site_dir, args.bind, args.port, args.fail)
+    if args.command == "check":
+        return run_check(args.original_dir, args.pages)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
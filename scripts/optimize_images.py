@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""Optimize docs/img and check/convert <img> references to <picture> in one HTML file.
+
+optimize <docs_dir>:
+- PNG/GIF under img/ are re-encoded with Pillow `optimize=True` and replaced
+  only when smaller and pixel-identical; JPEG is recompressed with
+  `jpegtran -optimize` when that tool is on PATH
+- WebP (lossless) and AVIF variants are written next to each image
+  (img/x.png -> img/x.webp, img/x.avif), kept only when smaller
+- css/*.css `background-image:url(img/x.png)` declarations get an
+  `image-set()` override listing the variants
+- images are processed in parallel; results are cached by content hash in
+  .cache/images.json so unchanged images are never reprocessed
+- every optimize run writes metrics (build_metrics.py) to .cache/metrics
+
+Target example (HTML):
+<img alt="RSS" src="img/rss.png"/>
+
+Conversion:
+<picture><source srcset="img/rss.avif" type="image/avif"/>
+<source srcset="img/rss.webp" type="image/webp"/><img alt="RSS" src="img/rss.png"/></picture>
+
+Usage:
+- optimize <docs_dir>: recompress images and write variants (cached)
+- check <file>: report how many <img> can be wrapped in <picture>
+- convert <file>: wrap those <img> in <picture> in-place
+
+Notes:
+- 0 matches is not an error.
+- only variants that exist on disk are referenced.
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import re
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+from PIL import Image
+
+from build_metrics import BuildMetrics
+from docs_files import save_bytes, save_html, save_text
+from prefilter import Prefilter
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+IMAGE_DIR = "img"
+CSS_DIR = "css"
+SOURCE_SUFFIXES = (".png", ".gif", ".jpg", ".jpeg")
+VARIANTS = (("avif", "image/avif"), ("webp", "image/webp"))
+AVIF_QUALITY = 90
+DEFAULT_CACHE = Path(__file__).resolve().parent.parent / ".cache" / "images.json"
+
+CSS_BACKGROUND_RE = re.compile(
+    r"background-image:\s*url\((['\"]?)([^'\")]+?)(\.png|\.gif|\.jpe?g)\1\)(?!;background-image:image-set)"
+)
+
+PREFILTER = Prefilter((b"<img",))
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def parse_html(path: Path) -> BeautifulSoup:
+    # An empty tree gives the same 0-match result as the full page would.
+    html = load_html(path) if PREFILTER.may_match(path.read_bytes()) else ""
+    return BeautifulSoup(html, "html.parser")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def same_pixels(a: Image.Image, b: Image.Image) -> bool:
+    return a.size == b.size and a.convert("RGBA").tobytes() == b.convert("RGBA").tobytes()
+
+
+def recompress(path: Path) -> bytes:
+    """Return a smaller lossless encoding of ``path`` (or its current bytes)."""
+    data = path.read_bytes()
+    if path.suffix.lower() in (".jpg", ".jpeg"):
+        jpegtran = shutil.which("jpegtran")
+        if jpegtran is None:
+            return data
+        result = subprocess.run(
+            [jpegtran, "-copy", "none", "-optimize", "-progressive", str(path)],
+            check=True,
+            capture_output=True,
+        )
+        return result.stdout if len(result.stdout) < len(data) else data
+
+    with Image.open(io.BytesIO(data)) as image:
+        if getattr(image, "n_frames", 1) > 1:
+            return data
+        buffer = io.BytesIO()
+        image.save(buffer, format=image.format, optimize=True)
+        candidate = buffer.getvalue()
+        with Image.open(io.BytesIO(candidate)) as reloaded:
+            if len(candidate) < len(data) and same_pixels(image, reloaded):
+                return candidate
+    return data
+
+
+def encode_variant(image: Image.Image, kind: str) -> bytes:
+    buffer = io.BytesIO()
+    if kind == "webp":
+        image.save(buffer, format="WEBP", lossless=True, method=6)
+    else:
+        image.save(buffer, format="AVIF", quality=AVIF_QUALITY, subsampling="4:4:4")
+    return buffer.getvalue()
+
+
+def process_image(path_name: str) -> dict[str, object]:
+    path = Path(path_name)
+    before = path.stat().st_size
+    optimized = recompress(path)
+    save_bytes(path, optimized)
+
+    variants: list[str] = []
+    with Image.open(io.BytesIO(optimized)) as image:
+        animated = getattr(image, "n_frames", 1) > 1
+        for kind, _mime in VARIANTS:
+            variant_path = path.with_suffix(f".{kind}")
+            encoded = b"" if animated else encode_variant(image, kind)
+            if encoded and len(encoded) < len(optimized):
+                save_bytes(variant_path, encoded)
+                variants.append(kind)
+            elif variant_path.exists():
+                variant_path.unlink()
+
+    return {
+        "path": path_name,
+        "hash": content_hash(optimized),
+        "bytes_before": before,
+        "bytes_after": len(optimized),
+        "variants": variants,
+    }
+
+
+def load_cache(cache_path: Path) -> dict[str, dict[str, object]]:
+    if not cache_path.exists():
+        return {}
+    return json.loads(cache_path.read_text(encoding="utf-8"))
+
+
+def save_cache(cache_path: Path, cache: dict[str, dict[str, object]]) -> None:
+    save_text(cache_path, json.dumps(cache, indent=2, sort_keys=True) + "\n")
+
+
+def is_cached(path: Path, entry: dict[str, object] | None) -> bool:
+    if entry is None or entry.get("hash") != content_hash(path.read_bytes()):
+        return False
+    variants = entry.get("variants")
+    return isinstance(variants, list) and all(
+        path.with_suffix(f".{kind}").exists() for kind in variants
+    )
+
+
+def image_set(prefix: str, stem: str, suffix: str, variants: list[str]) -> str:
+    mime = {kind: m for kind, m in VARIANTS}
+    mime[suffix.lstrip(".")] = f"image/{suffix.lstrip('.').replace('jpg', 'jpeg')}"
+    candidates = [*variants, suffix.lstrip(".")]
+    entries = ",".join(f'url("{prefix}{stem}.{kind}") type("{mime[kind]}")' for kind in candidates)
+    return f"image-set({entries})"
+
+
+def rewrite_stylesheet(css_path: Path, variants_by_name: dict[str, list[str]]) -> int:
+    css = css_path.read_text(encoding="utf-8")
+    count = 0
+
+    def replace(match: re.Match[str]) -> str:
+        nonlocal count
+        url_stem, suffix = match.group(2), match.group(3)
+        variants = variants_by_name.get(f"{Path(url_stem).name}{suffix}", [])
+        if f"{IMAGE_DIR}/" not in url_stem or not variants:
+            return match.group(0)
+        count += 1
+        prefix, stem = url_stem.rsplit("/", 1)
+        return f"{match.group(0)};background-image:{image_set(prefix + '/', stem, suffix, variants)}"
+
+    rewritten = CSS_BACKGROUND_RE.sub(replace, css)
+    if count:
+        save_text(css_path, rewritten)
+    return count
+
+
+def run_optimize(docs_dir: Path, cache_path: Path, jobs: int | None) -> int:
+    try:
+        metrics = BuildMetrics("optimize_images")
+        cache = load_cache(cache_path)
+        images = sorted(
+            path
+            for path in (docs_dir / IMAGE_DIR).rglob("*")
+            if path.is_file() and path.suffix.lower() in SOURCE_SUFFIXES
+        )
+
+        pending: list[Path] = []
+        for path in images:
+            key = path.relative_to(docs_dir).as_posix()
+            hit = is_cached(path, cache.get(key))
+            metrics.cache_lookup("images", hit)
+            metrics.inc("images", help_text="images processed")
+            if hit:
+                print(f"OPTIMIZE {path}: cached")
+            else:
+                pending.append(path)
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for result in executor.map(process_image, [str(path) for path in pending]):
+                path = Path(str(result["path"]))
+                cache[path.relative_to(docs_dir).as_posix()] = {
+                    "hash": result["hash"],
+                    "variants": result["variants"],
+                }
+                variants = result["variants"]
+                names = ",".join(variants) if isinstance(variants, list) else ""
+                metrics.inc("bytes_in", int(str(result["bytes_before"])), help_text="bytes read")
+                metrics.inc("bytes_out", int(str(result["bytes_after"])), help_text="bytes written")
+                print(
+                    f"OPTIMIZE {path}: bytes_before={result['bytes_before']}, "
+                    f"bytes_after={result['bytes_after']}, variants={names or '-'}"
+                )
+        save_cache(cache_path, cache)
+
+        variants_by_name: dict[str, list[str]] = {}
+        for key, entry in cache.items():
+            variants = entry.get("variants")
+            if isinstance(variants, list):
+                variants_by_name[Path(key).name] = [str(kind) for kind in variants]
+        rewritten = 0
+        for css_path in sorted((docs_dir / CSS_DIR).glob("*.css")):
+            rewritten += rewrite_stylesheet(css_path, variants_by_name)
+        metrics.inc("css_image_sets", rewritten, help_text="stylesheets rewritten")
+        metrics.write()
+
+        print(
+            f"OPTIMIZE {docs_dir}: images={len(images)}, processed={len(pending)}, "
+            f"cached={len(images) - len(pending)}, css_image_sets={rewritten}"
+        )
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: optimize failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def variant_sources(file_path: Path, src: str) -> list[tuple[str, str]]:
+    if "://" in src or src.startswith(("/", "data:")):
+        return []
+    stem, dot, suffix = src.rpartition(".")
+    if not dot or f".{suffix.lower()}" not in SOURCE_SUFFIXES:
+        return []
+    sources: list[tuple[str, str]] = []
+    for kind, mime in VARIANTS:
+        if (file_path.parent / f"{stem}.{kind}").exists():
+            sources.append((f"{stem}.{kind}", mime))
+    return sources
+
+
+def find_convertible_images(
+    soup: BeautifulSoup, file_path: Path
+) -> list[tuple[Tag, list[tuple[str, str]]]]:
+    matches: list[tuple[Tag, list[tuple[str, str]]]] = []
+    for img in soup.find_all("img", src=True):
+        if not isinstance(img, Tag):
+            continue
+        parent = img.parent
+        if isinstance(parent, Tag) and parent.name == "picture":
+            continue
+        src = img.get("src")
+        if not isinstance(src, str):
+            continue
+        sources = variant_sources(file_path, src)
+        if sources:
+            matches.append((img, sources))
+    return matches
+
+
+def run_check(file_path: Path) -> int:
+    try:
+        soup = parse_html(file_path)
+        matches = find_convertible_images(soup, file_path)
+        print(f"CHECK {file_path}: convertible_images={len(matches)}")
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_convert(file_path: Path) -> int:
+    try:
+        soup = parse_html(file_path)
+        matches = find_convertible_images(soup, file_path)
+
+        for img, sources in matches:
+            picture = soup.new_tag("picture")
+            img.insert_before(picture)
+            for srcset, mime in sources:
+                picture.append(soup.new_tag("source", srcset=srcset, type=mime))
+            picture.append(img.extract())
+
+        if matches:
+            save_html(file_path, str(soup))
+        print(f"CONVERT {file_path}: converted_images={len(matches)}")
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: convert failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Optimize docs images and wrap <img> in <picture> with modern formats"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_optimize = subparsers.add_parser("optimize", help="recompress images, write variants")
+    parser_optimize.add_argument("docs_dir", type=Path, help="docs root directory")
+    parser_optimize.add_argument(
+        "--cache", type=Path, default=DEFAULT_CACHE, help="content-hash cache file"
+    )
+    parser_optimize.add_argument("--jobs", type=int, default=None, help="worker processes")
+
+    parser_check = subparsers.add_parser("check", help="report convertible <img> count")
+    parser_check.add_argument("file", type=Path, help="target HTML file path")
+
+    parser_convert = subparsers.add_parser("convert", help="wrap <img> in <picture> in-place")
+    parser_convert.add_argument("file", type=Path, help="target HTML file path")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.command == "optimize":
+        docs_dir: Path = args.docs_dir
+        if not docs_dir.is_dir():
+            print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+            return EXIT_ERROR
+        return run_optimize(docs_dir, args.cache, args.jobs)
+
+    file_path: Path = args.file
+    if not file_path.exists() or not file_path.is_file():
+        print(f"ERROR: file not found: {file_path}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(file_path)
+    if args.command == "convert":
+        return run_convert(file_path)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Check/build fixed-size paginated language listings and JSON indexes under docs/lang.
+
+docs/lang/All.html lists every post on one page and the language pages
+(lang/Java.html, ...) only show the newest 10 posts of the mirror snapshot.
+This script rebuilds every listing from the view pages:
+
+- lang/<name>.html: page 1, lang/<name>-<n>.html: page n; `--page-size`
+  posts per page, so a listing page stays bounded whatever the archive size
+- each page keeps the markup of its listing (All: title links, oldest
+  first; languages: post excerpts, newest first), a Bootstrap pagination
+  bar after `#codes` (first/last page and the pages around the current
+  one) and `<link rel="prev/next">` in the head
+- lang/<name>.json: compact index `{"id", "title", "date", "score"}` per
+  post in listing order (All adds "lang"); score is the number of smells
+- code excerpts are highlighted with highlight_code_blocks.py's
+  converter, since the pages are rendered after run_transforms.py
+- pages beyond the last one (left over from a larger build) are removed
+
+Parsed view pages are cached by mtime/size in .cache/listings.json.
+
+Usage:
+- check <docs_dir>: report posts, pages and largest page per listing
+- build <docs_dir>: write listing pages and JSON indexes
+
+Exit codes:
+- 0: success
+- 1: no listing page found under docs/lang
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from html import escape
+from pathlib import Path, PurePosixPath
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from docs_files import save_html, save_text
+from highlight_code_blocks import apply_convert
+
+EXIT_OK = 0
+EXIT_NOT_FOUND = 1
+EXIT_ERROR = 3
+
+DEFAULT_STATE = Path(__file__).resolve().parent.parent / ".cache" / "listings.json"
+DEFAULT_PAGE_SIZE = 10
+PAGINATION_WINDOW = 2
+ALL_LISTING = "All"
+PAGE_NAME_RE = re.compile(r"^(?P<name>.+)-(?P<number>\d+)$")
+TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+SMELL_RE = re.compile(r'"line"\s*:')
+LANG_PREFIX_RE = re.compile(r"^\[[^\]]*\]\s*")
+EXCERPT_CHARS = 20
+TITLE_EXCERPT_CHARS = 20
+CODE_EXCERPT_CHARS = 40
+SITE_URL = "https://unkode-mania.net/"
+INDEX_KEYS = ("id", "title", "date", "score")
+
+Post = dict[str, object]
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def load_state(state_path: Path) -> dict[str, Post]:
+    if not state_path.exists():
+        return {}
+    return json.loads(state_path.read_text(encoding="utf-8"))
+
+
+def save_state(state_path: Path, state: dict[str, Post]) -> None:
+    save_text(state_path, json.dumps(state, ensure_ascii=False, sort_keys=True))
+
+
+def normalize_space(text: str) -> str:
+    return " ".join(text.split())
+
+
+def excerpt(text: str, limit: int) -> str:
+    # Same cut as the original listing: first `limit` characters + "...".
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+
+def parse_post(soup: BeautifulSoup) -> Post | None:
+    """Return the listing fields of a view page (None for other pages)."""
+    info = soup.select_one("div#code-info[data-id]")
+    content = soup.select_one("div.row-fluid.view")
+    if not isinstance(info, Tag) or not isinstance(content, Tag):
+        return None
+    title = content.select_one("h2.title")
+    prop = content.select_one("div.property")
+    lang_link = content.select_one("ul.breadcrumb a[href*='lang/']")
+    if not isinstance(title, Tag) or not isinstance(prop, Tag) or not isinstance(lang_link, Tag):
+        return None
+
+    title_text = normalize_space(
+        "".join(str(node) for node in title.children if isinstance(node, NavigableString))
+    )
+    author = prop.find("a")
+    posted = TIMESTAMP_RE.search(prop.get_text(" "))
+    markdown = content.select_one("div.markdown")
+    code = content.select_one("pre")
+    smells = "".join(
+        script.get_text() for script in soup.find_all("script") if "smell_json" in script.get_text()
+    )
+    # prerender_widgets.py moves smell_json into the markup and keeps the count.
+    smell_count = info.get("data-smells")
+    score = (
+        int(smell_count)
+        if not smells and isinstance(smell_count, str) and smell_count.isdigit()
+        else len(SMELL_RE.findall(smells))
+    )
+    return {
+        "id": str(info["data-id"]),
+        "lang": PurePosixPath(str(lang_link["href"]).split("?")[0]).stem,
+        "lang_label": normalize_space(lang_link.get_text()),
+        "title": LANG_PREFIX_RE.sub("", title_text),
+        "date": posted.group(0) if posted else "",
+        "score": score,
+        "author": normalize_space(author.get_text()) if isinstance(author, Tag) else "",
+        "excerpt": excerpt(markdown.get_text().strip(), EXCERPT_CHARS)
+        if isinstance(markdown, Tag)
+        else "",
+        "code": excerpt(code.get_text(), CODE_EXCERPT_CHARS) if isinstance(code, Tag) else "",
+    }
+
+
+def scan_posts(docs_dir: Path, state: dict[str, Post]) -> tuple[dict[str, Post], int]:
+    scanned: dict[str, Post] = {}
+    parsed = 0
+    for html_path in sorted((docs_dir / "view").glob("*.html")):
+        relative = html_path.relative_to(docs_dir).as_posix()
+        stat = html_path.stat()
+        cached = state.get(relative)
+        if cached is not None and cached.get("mtime_ns") == stat.st_mtime_ns and cached.get(
+            "size"
+        ) == stat.st_size:
+            scanned[relative] = cached
+            continue
+        parsed += 1
+        post = parse_post(BeautifulSoup(load_html(html_path), "html.parser"))
+        scanned[relative] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "post": post}
+    return scanned, parsed
+
+
+def listing_pages(docs_dir: Path) -> list[Path]:
+    """Page 1 of every listing: lang/*.html with a #codes block, minus the generated pages."""
+    pages: list[Path] = []
+    for path in sorted((docs_dir / "lang").glob("*.html")):
+        match = PAGE_NAME_RE.match(path.stem)
+        if match and (path.parent / f"{match['name']}.html").exists():
+            continue
+        if 'id="codes"' in load_html(path):
+            pages.append(path)
+    return pages
+
+
+def listing_posts(name: str, posts: list[Post]) -> list[Post]:
+    if name == ALL_LISTING:
+        return sorted(posts, key=lambda post: (str(post["date"]), str(post["id"])))
+    selected = [post for post in posts if post["lang"] == name]
+    return sorted(selected, key=lambda post: (str(post["date"]), str(post["id"])), reverse=True)
+
+
+def page_file(name: str, number: int) -> str:
+    return f"{name}.html" if number == 1 else f"{name}-{number}.html"
+
+
+def render_title_entry(post: Post) -> str:
+    return (
+        f'<h2 class="title"><a href="../view/{post["id"]}.html">'
+        f'[{escape(str(post["lang_label"]))}] {escape(str(post["title"]))}</a></h2>\n'
+    )
+
+
+def render_excerpt_entry(post: Post) -> str:
+    view = f"../view/{post['id']}.html"
+    url = f"{SITE_URL}view/{post['id']}"
+    author = escape(str(post["author"]))
+    label = f"[{escape(str(post['lang_label']))}] {escape(str(post['title']))}"
+    short_title = escape(excerpt(str(post["title"]), TITLE_EXCERPT_CHARS))
+    return (
+        "<hr/>\n"
+        '<div class="property">\n'
+        f'<a href="https://twitter.com/intent/user?screen_name={author}">{author}</a>\n'
+        f"{post['date']}\n"
+        "</div>\n"
+        '<h2 class="title">\n'
+        f'<a class="title" href="{view}">[{escape(str(post["lang_label"]))}] {short_title}</a>\n'
+        f'<a class="hatena-bookmark-button" data-hatena-bookmark-layout="standard" '
+        f'data-hatena-bookmark-title="{label} - ウンコード・マニア" '
+        f'href="https://b.hatena.ne.jp/entry/{url}" '
+        'title="このエントリーをはてなブックマークに追加">'
+        '<img alt="このエントリーをはてなブックマークに追加" height="20" '
+        'src="https://b.st-hatena.com/images/entry-button/button-only.gif" '
+        'style="border: none;" width="20"/></a>\n'
+        f'<a class="twitter-share-button" data-hashtags="unkode" '
+        f'data-text="{label} - ウンコード・マニア" data-url="{url}" '
+        'href="https://twitter.com/share"></a>\n'
+        "</h2>\n"
+        '<div class="comment clear">\n'
+        f'<div class="markdown"><p>{escape(str(post["excerpt"]))}</p>\n</div>\n'
+        f'<pre class="prettyprint">{escape(str(post["code"]))}</pre>\n'
+        '<p class="more">'
+        f'<a class="btn btn-primary view-link" href="{view}">鑑賞する »</a></p>\n'
+        "</div>\n"
+    )
+
+
+def render_pagination(name: str, number: int, total: int) -> str:
+    def item(target: int, text: str, state: str = "") -> str:
+        if state:
+            return f'<li class="{state}"><span>{text}</span></li>'
+        return f'<li><a href="{page_file(name, target)}">{text}</a></li>'
+
+    # First, last and a window around the current page keep the bar bounded.
+    shown = {1, total, *range(number - PAGINATION_WINDOW, number + PAGINATION_WINDOW + 1)}
+    items = [item(number - 1, "«", "disabled" if number == 1 else "")]
+    previous = 0
+    for target in sorted(page for page in shown if 1 <= page <= total):
+        if target > previous + 1:
+            items.append(item(target, "…", "disabled"))
+        items.append(item(target, str(target), "active" if target == number else ""))
+        previous = target
+    items.append(item(number + 1, "»", "disabled" if number == total else ""))
+    return (
+        f'<div class="pagination pagination-centered" data-listing="{escape(name)}">'
+        f"<ul>{''.join(items)}</ul></div>"
+    )
+
+
+def render_page(
+    template: str, name: str, posts: list[Post], number: int, total: int
+) -> str:
+    soup = BeautifulSoup(template, "html.parser")
+    codes = soup.select_one("div#codes")
+    if not isinstance(codes, Tag):
+        raise ValueError(f"#codes not found in listing {name}")
+    render_entry = render_title_entry if name == ALL_LISTING else render_excerpt_entry
+    prefix = "<hr/>\n" if name == ALL_LISTING else ""
+    codes.clear()
+    codes.append(BeautifulSoup(prefix + "".join(map(render_entry, posts)), "html.parser"))
+    apply_convert(soup)
+
+    for old in soup.select("div.pagination[data-listing]"):
+        old.decompose()
+    if total > 1:
+        codes.insert_after(BeautifulSoup(render_pagination(name, number, total), "html.parser"))
+
+    head = soup.head
+    if isinstance(head, Tag):
+        for old in head.select('link[rel="prev"], link[rel="next"]'):
+            old.decompose()
+        if number > 1:
+            head.append(soup.new_tag("link", rel="prev", href=page_file(name, number - 1)))
+        if number < total:
+            head.append(soup.new_tag("link", rel="next", href=page_file(name, number + 1)))
+        title = head.find("title")
+        if isinstance(title, Tag) and number > 1:
+            title.string = f"{title.get_text()} ({number}/{total})"
+    return str(soup)
+
+
+def json_index(name: str, posts: list[Post]) -> str:
+    keys = INDEX_KEYS + ("lang",) if name == ALL_LISTING else INDEX_KEYS
+    entries = [{key: post[key] for key in keys} for post in posts]
+    return json.dumps(entries, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def stale_pages(first_page: Path, total: int) -> list[Path]:
+    name = first_page.stem
+    stale: list[Path] = []
+    for path in first_page.parent.glob(f"{name}-*.html"):
+        match = PAGE_NAME_RE.match(path.stem)
+        if match and match["name"] == name and int(match["number"]) > total:
+            stale.append(path)
+    return sorted(stale)
+
+
+def process(docs_dir: Path, state_path: Path, page_size: int, write: bool) -> int:
+    first_pages = listing_pages(docs_dir)
+    if not first_pages:
+        print(f"CHECK {docs_dir}: no listing page found", file=sys.stderr)
+        return EXIT_NOT_FOUND
+
+    scanned, parsed = scan_posts(docs_dir, load_state(state_path))
+    posts = [entry["post"] for entry in scanned.values() if isinstance(entry.get("post"), dict)]
+    command = "BUILD" if write else "CHECK"
+    written = removed = 0
+    for first_page in first_pages:
+        name = first_page.stem
+        selected = listing_posts(name, posts)
+        total = max(1, -(-len(selected) // page_size))
+        # Page 1 is rewritten too, so it stays a valid template for every run.
+        template = load_html(first_page)
+        largest = 0
+        for number in range(1, total + 1):
+            chunk = selected[(number - 1) * page_size : number * page_size]
+            html = render_page(template, name, chunk, number, total)
+            largest = max(largest, len(html.encode("utf-8")))
+            if write:
+                written += save_html(first_page.with_name(page_file(name, number)), html)
+        stale = stale_pages(first_page, total)
+        if write:
+            written += save_text(first_page.with_suffix(".json"), json_index(name, selected))
+            for path in stale:
+                path.unlink()
+            removed += len(stale)
+        print(
+            f"{command} {first_page}: posts={len(selected)}, pages={total}, "
+            f"bytes_before={len(template.encode('utf-8'))}, "
+            f"largest_page_bytes={largest}, stale_pages={len(stale)}"
+        )
+
+    if write:
+        save_state(state_path, scanned)
+    print(
+        f"{command} {docs_dir}: listings={len(first_pages)}, posts={len(posts)}, "
+        f"parsed_views={parsed}, files_written={written}, pages_removed={removed}"
+    )
+    return EXIT_OK
+
+
+def run_check(docs_dir: Path, state_path: Path, page_size: int) -> int:
+    try:
+        return process(docs_dir, state_path, page_size, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path, state_path: Path, page_size: int) -> int:
+    try:
+        return process(docs_dir, state_path, page_size, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build paginated language listings and JSON indexes"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "report posts, pages and largest page per listing"),
+        ("build", "write listing pages and JSON indexes"),
+    ):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("docs_dir", type=Path, help="docs root directory")
+        subparser.add_argument(
+            "--state", type=Path, default=DEFAULT_STATE, help="view page cache file"
+        )
+        subparser.add_argument(
+            "--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="posts per listing page"
+        )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+    if args.page_size < 1:
+        print("ERROR: --page-size must be at least 1", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir, args.state, args.page_size)
+    if args.command == "build":
+        return run_build(docs_dir, args.state, args.page_size)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
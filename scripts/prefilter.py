@@ -0,0 +1,49 @@
+"""Byte-level prefilter shared by the per-page transforms.
+
+A Prefilter holds the lowercase needles at least one of which every page a
+transform can change contains, and finds them in a single pass over the
+lowercased page with one compiled alternation. transforms.py merges the
+needles of a whole pipeline into one Prefilter, so batch tools scan each page
+once for all transforms instead of once per needle.
+
+It lives outside transforms.py because transforms.py imports every transform
+script, which would make the scripts' own import of it circular.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+
+class Prefilter:
+    def __init__(self, needles: Iterable[bytes]) -> None:
+        self.needles: frozenset[bytes] = frozenset(needle.lower() for needle in needles)
+        # Longest first: at one position the alternation reports the longest
+        # needle, `_implied` adds the shorter needles contained in it.
+        ordered = sorted(self.needles, key=lambda needle: (-len(needle), needle))
+        self._regex = re.compile(b"|".join(re.escape(needle) for needle in ordered))
+        self._implied = {
+            needle: frozenset(other for other in self.needles if other in needle)
+            for needle in self.needles
+        }
+
+    def may_match(self, raw: bytes) -> bool:
+        """False means the page contains no needle and cannot match."""
+        return bool(self.needles) and self._regex.search(raw.lower()) is not None
+
+    def found(self, raw: bytes) -> frozenset[bytes]:
+        """Needles occurring in ``raw``; the scan stops once all were seen."""
+        if not self.needles:
+            return frozenset()
+        lowered = raw.lower()
+        found: set[bytes] = set()
+        position = 0
+        while len(found) < len(self.needles):
+            match = self._regex.search(lowered, position)
+            if match is None:
+                break
+            found |= self._implied[match.group()]
+            # Resume inside the match: needles overlapping it are not skipped.
+            position = match.start() + 1
+        return frozenset(found)
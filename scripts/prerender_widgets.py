@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Check/build static markup for the widgets js/app.js builds on load.
+
+On every view page app.js appends the smell column to each code line
+(`unkode_icon_org`, then one `unkode_icon` per entry of the inline
+`smell_json`, with `$id`/`$screen_name` substituted), and on the top page it
+shows the carousel controls, pads every `#top-carousel .item` and measures
+all their heights with jQuery to size the carousel. Both run before first
+paint of the code block / hero unit and force layout.
+
+Build:
+- view pages: the same markup app.js would build, rendered into every
+  `li.L0`..`li.L9` (`<span class="right" data-prerendered>` with the
+  nuclear icon and the smell icons, newest first like the `.after()`
+  calls, and `<br clear="all">`; the unused `dta-screen_name` typo
+  attribute of the template is left out). The inline `smell_json` is
+  removed once rendered, so the data is not shipped twice; its smell count
+  stays on `#code-info` as `data-smells` (read by paginate_listings.py).
+  A page whose `smell_json` was already removed keeps its rendered icons
+- top page: carousel controls shown and a `<style data-prerendered>` that
+  stacks the items in one grid cell, so the carousel takes the height of
+  its tallest item without measuring (browsers without grid fall back to
+  the height of the active item)
+- every page: `<body data-prerendered>`
+- js/app.js: the icon rendering and the measurement only run when
+  `body[data-prerendered]` is missing (pages not built yet, e.g. served by
+  watch.py); on prerendered pages the signed-in user's own smell icons get
+  the remove handler app.js attached while rendering. Run before
+  bundle_javascript.py, which bundles app.js
+
+jquery.tmpl.js is only bundled when live code calls `.tmpl(` (the dead
+`#more-code` handler), so nothing on the critical path needs it.
+
+Usage:
+- check <docs_dir>: report widgets that would be rendered
+- build <docs_dir>: rewrite pages and js/app.js in-place
+
+Exit codes:
+- 0: success
+- 1: js/app.js does not contain the expected code (neither original nor patched)
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from docs_files import save_html, save_text
+
+EXIT_OK = 0
+EXIT_NOT_FOUND = 1
+EXIT_ERROR = 3
+
+APP = "js/app.js"
+PRERENDERED_ATTR = "data-prerendered"
+LINE_SELECTOR = ", ".join(f"li.L{digit}" for digit in range(10))
+SMELL_JSON_RE = re.compile(r"(?:var\s+)?smell_json\s*=\s*'((?:[^'\\]|\\.)*)'\s*;?")
+SMELL_COUNT_ATTR = "data-smells"
+CODE_INFO_SELECTOR = "div#code-info"
+JS_ESCAPE_RE = re.compile(r"\\(u[0-9a-fA-F]{4}|.)")
+JS_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+NUCLEAR_TITLE = "臭ったらクリック!"
+CAROUSEL_SELECTOR = "#top-carousel"
+CAROUSEL_CSS = (
+    "@supports (display:grid){"
+    "#top-carousel .carousel-inner{display:grid}"
+    "#top-carousel .carousel-inner>.item{display:block;visibility:hidden;grid-area:1/1}"
+    "#top-carousel .carousel-inner>.active,#top-carousel .carousel-inner>.next,"
+    "#top-carousel .carousel-inner>.prev{visibility:visible}}"
+    "#top-carousel .item{padding:3px 50px}"
+)
+
+# (original, patched) snippets of js/app.js.
+APP_PATCHES = (
+    (
+        "\n  var max_height = 0;\n",
+        "\n  var max_height = 0;\n"
+        "  // prerender_widgets.py renders the smell icons and sizes the carousel.\n"
+        "  var prerendered = $('body').is('[data-prerendered]');\n",
+    ),
+    (
+        "\n  } else {\n    $('.carousel-control').show();\n",
+        "\n  } else if (prerendered) {\n"
+        "    $('#top-carousel').carousel();\n\n"
+        "    $('#signout').click(function(){\n"
+        "      $('#signout-form').submit();\n"
+        "    });\n"
+        "  } else {\n    $('.carousel-control').show();\n",
+    ),
+    (
+        "\n  lines.append($('<span class=\"right\">' + unkode_icon_org"
+        " + '</span><br clear=\"all\"/>'));\n",
+        "\n  if (!prerendered) {\n"
+        "    lines.append($('<span class=\"right\">' + unkode_icon_org"
+        " + '</span><br clear=\"all\"/>'));\n  }\n",
+    ),
+    (
+        "\n  if (typeof(smell_json) != 'undefined') {\n",
+        "\n  if (!prerendered && typeof(smell_json) != 'undefined') {\n",
+    ),
+    (
+        "\n  $('.nuclear-icon')\n    .mouseover(",
+        "\n  if (prerendered && screen_name) {\n"
+        "    $('.unkode-icon[data-smell_id]').filter(function(){\n"
+        "      return $(this).attr('title') == screen_name;\n"
+        "    }).css('cursor', 'pointer').click(remove_smell);\n"
+        "  }\n"
+        "\n  $('.nuclear-icon')\n    .mouseover(",
+    ),
+)
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(path for path in docs_dir.rglob("*.html") if path.is_file())
+
+
+def patch_app(source: str) -> str | None:
+    """app.js with the prerender guards; None when a snippet is missing."""
+    for original, patched in APP_PATCHES:
+        if patched in source:
+            continue
+        if source.count(original) != 1:
+            return None
+        source = source.replace(original, patched)
+    return source
+
+
+def js_string(literal: str) -> str:
+    def unescape(match: re.Match[str]) -> str:
+        escape = match.group(1)
+        if escape.startswith("u") and len(escape) == 5:
+            return chr(int(escape[1:], 16))
+        return JS_ESCAPES.get(escape, escape)
+
+    return JS_ESCAPE_RE.sub(unescape, literal)
+
+
+def smell_script(soup: BeautifulSoup) -> tuple[Tag, re.Match[str]] | None:
+    for script in soup.find_all("script"):
+        match = SMELL_JSON_RE.search(script.get_text())
+        if isinstance(script, Tag) and match is not None:
+            return script, match
+    return None
+
+
+def smell_infos(match: re.Match[str]) -> list[dict[str, object]]:
+    infos = json.loads(js_string(match.group(1)))
+    return infos if isinstance(infos, list) else []
+
+
+def remove_smell_json(script: Tag, match: re.Match[str]) -> None:
+    rest = match.string[: match.start()] + match.string[match.end() :]
+    if rest.strip():
+        script.string = rest
+        return
+    # Drop the script's line too, so a rebuild serializes the page identically.
+    previous = script.previous_sibling
+    if isinstance(previous, NavigableString) and not previous.strip():
+        previous.extract()
+    script.decompose()
+
+
+def render_smells(soup: BeautifulSoup) -> tuple[int, int, bool]:
+    """Render the smell column into every code line.
+
+    Return (lines, smell icons, whether the inline smell_json was removed).
+    """
+    found = smell_script(soup)
+    rendered = soup.select(f"span.right[{PRERENDERED_ATTR}]")
+    if found is None and rendered:
+        # An earlier run rendered the icons and removed their source.
+        icons = soup.select(f"span.right[{PRERENDERED_ATTR}] div.unkode-icon[data-smell_id]")
+        return len(rendered), len(icons), False
+
+    for old in rendered:
+        following = old.find_next_sibling()
+        if isinstance(following, Tag) and following.name == "br":
+            following.decompose()
+        old.decompose()
+
+    lines = soup.select(LINE_SELECTOR)
+    if not lines:
+        return 0, 0, False
+    infos = smell_infos(found[1]) if found is not None else []
+    icons = 0
+    for index, line in enumerate(lines):
+        column = soup.new_tag("span", attrs={"class": "right", PRERENDERED_ATTR: ""})
+        nuclear = soup.new_tag("div", attrs={"class": "unkode-icon nuclear-icon"})
+        nuclear["title"] = NUCLEAR_TITLE
+        column.append(nuclear)
+        # app.js compares with ==, so "3" matches line 3 as well.
+        smells = [
+            info for info in infos if isinstance(info, dict) and str(info.get("line")) == str(index)
+        ]
+        # app.js inserts each icon right after the nuclear icon: the last one ends up first.
+        for smell in reversed(smells):
+            author = smell.get("author")
+            screen_name = str(author.get("screen_name", "")) if isinstance(author, dict) else ""
+            column.append(
+                soup.new_tag(
+                    "div",
+                    attrs={
+                        "class": "unkode-icon",
+                        "data-smell_id": str(smell.get("id", "")),
+                        "title": screen_name,
+                    },
+                )
+            )
+            icons += 1
+        line.append(column)
+        line.append(soup.new_tag("br", attrs={"clear": "all"}))
+
+    if found is None:
+        return len(lines), icons, False
+    code_info = soup.select_one(CODE_INFO_SELECTOR)
+    if isinstance(code_info, Tag):
+        code_info[SMELL_COUNT_ATTR] = str(
+            sum(1 for info in infos if isinstance(info, dict) and "line" in info)
+        )
+    remove_smell_json(*found)
+    return len(lines), icons, True
+
+
+def render_carousel(soup: BeautifulSoup) -> bool:
+    for old in soup.find_all("style", attrs={PRERENDERED_ATTR: True}):
+        old.decompose()
+    carousel = soup.select_one(CAROUSEL_SELECTOR)
+    head = soup.head
+    if not isinstance(carousel, Tag) or not isinstance(head, Tag):
+        return False
+    for control in soup.select(".carousel-control"):
+        classes = [name for name in control.get("class") or [] if name != "hide"]
+        control["class"] = classes
+    style = soup.new_tag("style", attrs={PRERENDERED_ATTR: ""})
+    style.string = CAROUSEL_CSS
+    head.append(style)
+    return True
+
+
+def process(docs_dir: Path, write: bool) -> int:
+    app_path = docs_dir / APP
+    app_source = app_path.read_text(encoding="utf-8")
+    patched_app = patch_app(app_source)
+    if patched_app is None:
+        print(f"NOT FOUND {app_path}: prerender guard targets", file=sys.stderr)
+        return EXIT_NOT_FOUND
+
+    pages = code_pages = lines = icons = removed_scripts = carousels = written = 0
+    for path in html_files(docs_dir):
+        soup = BeautifulSoup(load_html(path), "html.parser")
+        body = soup.body
+        if not isinstance(body, Tag):
+            continue
+        pages += 1
+        page_lines, page_icons, removed = render_smells(soup)
+        code_pages += bool(page_lines)
+        lines += page_lines
+        icons += page_icons
+        removed_scripts += removed
+        carousels += render_carousel(soup)
+        body[PRERENDERED_ATTR] = ""
+        if write:
+            written += save_html(path, str(soup))
+    app_written = save_text(app_path, patched_app) if write else False
+
+    command = "BUILD" if write else "CHECK"
+    print(
+        f"{command} {docs_dir}: pages={pages}, code_pages={code_pages}, lines={lines}, "
+        f"smell_icons={icons}, smell_json_removed={removed_scripts}, carousels={carousels}, "
+        f"pages_written={written}, "
+        f"app_js_needs_guard={patched_app != app_source}, app_js_written={app_written}"
+    )
+    return EXIT_OK
+
+
+def run_check(docs_dir: Path) -> int:
+    try:
+        return process(docs_dir, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path) -> int:
+    try:
+        return process(docs_dir, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build static markup for the widgets built by app.js"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="report widgets to render")
+    parser_check.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    parser_build = subparsers.add_parser("build", help="rewrite pages and app.js in-place")
+    parser_build.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir)
+    if args.command == "build":
+        return run_build(docs_dir)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
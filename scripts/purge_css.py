@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""Check/build purged stylesheets and inline critical CSS for the docs directory.
+
+Every page loads the full css/bootstrap.min.css and
+css/bootstrap-responsive.min.css although only a small subset of their
+selectors can ever match. css/highlight.css (the Pygments theme written by
+highlight_code_blocks.py stylesheet) goes through the same purge and
+deferred load; it is skipped while it has not been generated yet.
+
+Used selector set:
+- tag names, ids and classes of every docs/**/*.html
+- words inside string literals of docs/js/*.js (classes added at runtime,
+  e.g. app.js `addClass('active')` or bootstrap.min.js `"modal-backdrop"`)
+
+A selector is kept when every tag/id/class it names is in the used set
+(pseudo-classes and attribute selectors are ignored for that test). Rules
+without a kept selector are dropped; other at-rules (@keyframes, @charset)
+are kept as-is and @media blocks are purged recursively.
+
+Critical CSS:
+- pages are grouped by template (index, lang, view, other)
+- for the first page of each template, rules matching one of the first
+  FOLD_ELEMENTS elements (ignoring :hover/:focus/:active states) are critical
+- every page gets those rules inlined as <style id="critical-css"> (url()
+  references rebased from css/ to the page), and its
+  stylesheet links point at the purged files, loaded without blocking
+  (media="print" + onload, with a <noscript> fallback)
+
+Usage:
+- check <docs_dir>: report purged/critical bytes without writing
+- build <docs_dir>: write css/*.purged.css and rewrite pages in-place
+
+Exit codes:
+- 0: success
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import posixpath
+import re
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+
+from docs_files import save_html, save_text
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+STYLESHEETS = (
+    "css/bootstrap.min.css",
+    "css/bootstrap-responsive.min.css",
+    "css/style.css",
+    "css/highlight.css",
+)
+CRITICAL_STYLE_ID = "critical-css"
+FOLD_ELEMENTS = 120
+NESTED_AT_RULES = ("@media", "@supports")
+STATE_PSEUDO_CLASSES = (":hover", ":focus", ":active", ":visited")
+
+TAG_RE = re.compile(r"<([a-zA-Z][\w-]*)")
+ID_ATTR_RE = re.compile(r"\sid=\"([^\"]+)\"")
+CLASS_ATTR_RE = re.compile(r"\sclass=\"([^\"]+)\"")
+JS_STRING_RE = re.compile(r"'((?:[^'\\\n]|\\.)*)'|\"((?:[^\"\\\n]|\\.)*)\"")
+JS_WORD_RE = re.compile(r"-?[_a-zA-Z][\w-]*")
+PSEUDO_RE = re.compile(r"::?[\w-]+(\([^)]*\))?")
+ATTRIBUTE_RE = re.compile(r"\[[^\]]*\]")
+SELECTOR_CLASS_RE = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+SELECTOR_ID_RE = re.compile(r"#(-?[_a-zA-Z][\w-]*)")
+COMPOUND_TAG_RE = re.compile(r"^([a-zA-Z][\w-]*)")
+COMBINATOR_RE = re.compile(r"[\s>+~]+")
+CSS_URL_RE = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+
+# ("rule", selectors, declarations) | ("block", prelude, children) | ("raw", text)
+CssNode = tuple
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def skip_string_or_comment(css: str, i: int) -> int:
+    if css[i] in "'\"":
+        quote = css[i]
+        j = i + 1
+        while css[j] != quote:
+            j += 2 if css[j] == "\\" else 1
+        return j + 1
+    if css.startswith("/*", i):
+        return css.index("*/", i + 2) + 2
+    return i
+
+
+def find_block_end(css: str, i: int) -> int:
+    """Return the index of the `}` closing the block whose `{` is at ``i``."""
+    depth = 0
+    while i < len(css):
+        end = skip_string_or_comment(css, i)
+        if end != i:
+            i = end
+            continue
+        if css[i] == "{":
+            depth += 1
+        elif css[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError("unbalanced braces in stylesheet")
+
+
+def find_prelude_end(css: str, i: int) -> int:
+    while i < len(css):
+        end = skip_string_or_comment(css, i)
+        if end != i:
+            i = end
+            continue
+        if css[i] in "{;":
+            return i
+        i += 1
+    return len(css)
+
+
+def parse_css(css: str) -> list[CssNode]:
+    nodes: list[CssNode] = []
+    i = 0
+    while i < len(css):
+        if css[i].isspace():
+            i += 1
+            continue
+        if css.startswith("/*", i):
+            end = skip_string_or_comment(css, i)
+            if css.startswith("/*!", i):
+                nodes.append(("raw", css[i:end]))
+            i = end
+            continue
+
+        prelude_end = find_prelude_end(css, i)
+        prelude = css[i:prelude_end].strip()
+        if prelude_end >= len(css) or css[prelude_end] == ";":
+            nodes.append(("raw", f"{prelude};"))
+            i = prelude_end + 1
+            continue
+
+        block_end = find_block_end(css, prelude_end)
+        inner = css[prelude_end + 1 : block_end]
+        if prelude.startswith(NESTED_AT_RULES):
+            nodes.append(("block", prelude, parse_css(inner)))
+        elif prelude.startswith("@"):
+            nodes.append(("raw", css[i : block_end + 1]))
+        else:
+            selectors = [selector.strip() for selector in prelude.split(",")]
+            nodes.append(("rule", selectors, inner.strip()))
+        i = block_end + 1
+    return nodes
+
+
+def serialize_css(nodes: list[CssNode]) -> str:
+    parts: list[str] = []
+    for node in nodes:
+        if node[0] == "rule":
+            parts.append(f"{','.join(node[1])}{{{node[2]}}}")
+        elif node[0] == "block":
+            parts.append(f"{node[1]}{{{serialize_css(node[2])}}}")
+        else:
+            parts.append(node[1])
+    return "".join(parts)
+
+
+class UsedNames:
+    def __init__(self) -> None:
+        self.tags: set[str] = {"html", "body"}
+        self.ids: set[str] = set()
+        self.classes: set[str] = set()
+
+    def add_html(self, html: str) -> None:
+        self.tags.update(tag.lower() for tag in TAG_RE.findall(html))
+        self.ids.update(ID_ATTR_RE.findall(html))
+        for value in CLASS_ATTR_RE.findall(html):
+            self.classes.update(value.split())
+
+    def add_javascript(self, source: str) -> None:
+        for single, double in JS_STRING_RE.findall(source):
+            words = JS_WORD_RE.findall(single or double)
+            self.ids.update(words)
+            self.classes.update(words)
+
+
+def selector_used(selector: str, used: UsedNames) -> bool:
+    simple = ATTRIBUTE_RE.sub("", PSEUDO_RE.sub("", selector))
+    if any(name not in used.classes for name in SELECTOR_CLASS_RE.findall(simple)):
+        return False
+    if any(name not in used.ids for name in SELECTOR_ID_RE.findall(simple)):
+        return False
+    for compound in COMBINATOR_RE.split(simple.strip()):
+        tag = COMPOUND_TAG_RE.match(compound)
+        if tag and tag.group(1).lower() not in used.tags:
+            return False
+    return True
+
+
+def purge(nodes: list[CssNode], used: UsedNames) -> list[CssNode]:
+    purged: list[CssNode] = []
+    for node in nodes:
+        if node[0] == "rule":
+            selectors = [selector for selector in node[1] if selector_used(selector, used)]
+            if selectors:
+                purged.append(("rule", selectors, node[2]))
+        elif node[0] == "block":
+            children = purge(node[2], used)
+            if children:
+                purged.append(("block", node[1], children))
+        else:
+            purged.append(node)
+    return purged
+
+
+def fold_elements(soup: BeautifulSoup) -> set[int]:
+    elements = [soup.find("html"), soup.find("body")]
+    body = soup.find("body")
+    if isinstance(body, Tag):
+        elements.extend(body.find_all(True, limit=FOLD_ELEMENTS))
+    return {id(element) for element in elements if isinstance(element, Tag)}
+
+
+def selector_critical(selector: str, soup: BeautifulSoup, fold: set[int]) -> bool:
+    if any(state in selector for state in STATE_PSEUDO_CLASSES):
+        return False
+    simple = PSEUDO_RE.sub("", selector).strip()
+    if not simple:
+        return False
+    try:
+        return any(id(element) in fold for element in soup.select(simple))
+    except Exception:  # noqa: BLE001
+        # soupsieve rejects some legacy selectors; they are never critical.
+        return False
+
+
+def critical(nodes: list[CssNode], soup: BeautifulSoup, fold: set[int]) -> list[CssNode]:
+    rules: list[CssNode] = []
+    for node in nodes:
+        if node[0] == "rule":
+            selectors = [s for s in node[1] if selector_critical(s, soup, fold)]
+            if selectors:
+                rules.append(("rule", selectors, node[2]))
+        elif node[0] == "block":
+            children = critical(node[2], soup, fold)
+            if children:
+                rules.append(("block", node[1], children))
+    return rules
+
+
+def page_template(docs_dir: Path, path: Path) -> str:
+    relative = path.relative_to(docs_dir)
+    if relative.parts[0] in ("view", "lang"):
+        return relative.parts[0]
+    if relative.name == "index.html":
+        return "index"
+    return "other"
+
+
+def purged_name(name: str) -> str:
+    return name.removesuffix(".min.css").removesuffix(".css") + ".purged.css"
+
+
+def find_stylesheet_links(soup: BeautifulSoup) -> list[tuple[Tag, str]]:
+    links: list[tuple[Tag, str]] = []
+    for link in soup.find_all("link", href=True):
+        href = link.get("href")
+        if not isinstance(link, Tag) or not isinstance(href, str):
+            continue
+        if link.find_parent("noscript") is not None:
+            continue
+        for name in STYLESHEETS:
+            if href.endswith((name, purged_name(name))):
+                links.append((link, href.removesuffix(name).removesuffix(purged_name(name))))
+                break
+    return links
+
+
+def rebase_urls(css: str, prefix: str) -> str:
+    """Make url() references written relative to css/ relative to the page."""
+
+    def replace(match: re.Match[str]) -> str:
+        quote, url = match.groups()
+        if url.startswith(("/", "data:", "#")) or "://" in url:
+            return match.group(0)
+        return f"url({quote}{prefix}{posixpath.normpath(posixpath.join('css', url))}{quote})"
+
+    return CSS_URL_RE.sub(replace, css)
+
+
+def rewrite_page(soup: BeautifulSoup, critical_css: str) -> bool:
+    links = find_stylesheet_links(soup)
+    if not links:
+        return False
+
+    style = soup.find("style", id=CRITICAL_STYLE_ID)
+    if not isinstance(style, Tag):
+        style = soup.new_tag("style", id=CRITICAL_STYLE_ID)
+        links[0][0].insert_before(style)
+    style.string = rebase_urls(critical_css, links[0][1])
+
+    for link, prefix in links:
+        href = link["href"]
+        name = next(n for n in STYLESHEETS if str(href).endswith((n, purged_name(n))))
+        link["href"] = f"{prefix}{purged_name(name)}"
+        link["media"] = "print"
+        link["onload"] = "this.media='all'"
+
+        noscript = link.find_next_sibling()
+        if not (isinstance(noscript, Tag) and noscript.name == "noscript"):
+            noscript = soup.new_tag("noscript")
+            link.insert_after(noscript)
+        noscript.clear()
+        noscript.append(soup.new_tag("link", href=link["href"], rel="stylesheet"))
+    return True
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(path for path in docs_dir.rglob("*.html") if path.is_file())
+
+
+def process(docs_dir: Path, write: bool) -> int:
+    command = "BUILD" if write else "CHECK"
+    pages = html_files(docs_dir)
+
+    used = UsedNames()
+    for path in pages:
+        used.add_html(load_html(path))
+    for script in sorted((docs_dir / "js").glob("*.js")):
+        used.add_javascript(script.read_text(encoding="utf-8"))
+
+    sheets = [name for name in STYLESHEETS if (docs_dir / name).is_file()]
+    purged_sheets: list[list[CssNode]] = []
+    for name in sheets:
+        source = (docs_dir / name).read_text(encoding="utf-8")
+        nodes = purge(parse_css(source), used)
+        purged_sheets.append(nodes)
+        css = serialize_css(nodes)
+        if write:
+            save_text(docs_dir / purged_name(name), css)
+        print(
+            f"{command} {docs_dir / purged_name(name)}: "
+            f"bytes_before={len(source.encode('utf-8'))}, bytes_after={len(css.encode('utf-8'))}"
+        )
+
+    critical_by_template: dict[str, str] = {}
+    rewritten = 0
+    for path in pages:
+        template = page_template(docs_dir, path)
+        soup = BeautifulSoup(load_html(path), "html.parser")
+        if template not in critical_by_template:
+            fold = fold_elements(soup)
+            critical_by_template[template] = "".join(
+                serialize_css(critical(nodes, soup, fold)) for nodes in purged_sheets
+            )
+            print(
+                f"{command} template={template} ({path.relative_to(docs_dir)}): "
+                f"critical_bytes={len(critical_by_template[template].encode('utf-8'))}"
+            )
+        if write and rewrite_page(soup, critical_by_template[template]):
+            save_html(path, str(soup))
+            rewritten += 1
+
+    before = sum((docs_dir / name).stat().st_size for name in sheets)
+    after = sum(len(serialize_css(nodes).encode("utf-8")) for nodes in purged_sheets)
+    print(
+        f"{command} {docs_dir}: pages={len(pages)}, rewritten_pages={rewritten}, "
+        f"stylesheet_bytes_before={before}, stylesheet_bytes_after={after}, "
+        f"bytes_saved={before - after}"
+    )
+    return EXIT_OK
+
+
+def run_check(docs_dir: Path) -> int:
+    try:
+        return process(docs_dir, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path) -> int:
+    try:
+        return process(docs_dir, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build purged stylesheets and inline critical CSS for docs"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="report purged/critical CSS bytes")
+    parser_check.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    parser_build = subparsers.add_parser(
+        "build", help="write purged stylesheets and rewrite pages in-place"
+    )
+    parser_build.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir)
+    if args.command == "build":
+        return run_build(docs_dir)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
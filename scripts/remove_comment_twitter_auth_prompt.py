@@ -24,6 +24,9 @@ from pathlib import Path
 
 from bs4 import BeautifulSoup, NavigableString, Tag
 
+from docs_files import save_html
+from prefilter import Prefilter
+
 EXIT_OK = 0
 EXIT_NOT_FOUND = 1
 EXIT_AMBIGUOUS = 2
@@ -33,13 +36,17 @@ COMMENT_AUTH_TEXT = "コメント投稿には、twitter認証が必要です。"
 AUTH_BUTTON_TEXT = "Twitter認証"
 AUTH_HREF = "https://unkode-mania.net/auth"
 
+PREFILTER = Prefilter(("コメント投稿には".encode(),))
+
 
 def load_html(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def save_html(path: Path, html: str) -> None:
-    path.write_text(html, encoding="utf-8")
+def parse_html(path: Path) -> BeautifulSoup:
+    # An empty tree gives the same 0-match result as the full page would.
+    html = load_html(path) if PREFILTER.may_match(path.read_bytes()) else ""
+    return BeautifulSoup(html, "html.parser")
 
 
 def is_twitter_auth_button(tag: Tag) -> bool:
@@ -91,7 +98,7 @@ def find_prompt_pairs(soup: BeautifulSoup) -> list[tuple[Tag, Tag]]:
 
 def run_check(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
+        soup = parse_html(file_path)
         pairs = find_prompt_pairs(soup)
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: check failed: {exc}", file=sys.stderr)
@@ -107,26 +114,29 @@ def run_check(file_path: Path) -> int:
     return EXIT_OK
 
 
+def apply_delete(soup: BeautifulSoup) -> tuple[int, int, str]:
+    pairs = find_prompt_pairs(soup)
+
+    count = len(pairs)
+    if count > 1:
+        return EXIT_AMBIGUOUS, 0, f"aborted (prompt_pair={count})"
+    if count == 0:
+        return EXIT_NOT_FOUND, 0, "skipped (prompt_pair=0)"
+
+    paragraph, button = pairs[0]
+    paragraph.decompose()
+    button.decompose()
+    return EXIT_OK, 2, "removed 1 prompt pair"
+
+
 def run_delete(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
-        pairs = find_prompt_pairs(soup)
-
-        count = len(pairs)
-        if count > 1:
-            print(f"DELETE {file_path}: aborted (prompt_pair={count})")
-            return EXIT_AMBIGUOUS
-        if count == 0:
-            print(f"DELETE {file_path}: skipped (prompt_pair=0)")
-            return EXIT_NOT_FOUND
-
-        paragraph, button = pairs[0]
-        paragraph.decompose()
-        button.decompose()
-
-        save_html(file_path, str(soup))
-        print(f"DELETE {file_path}: removed 1 prompt pair")
-        return EXIT_OK
+        soup = parse_html(file_path)
+        status, changes, summary = apply_delete(soup)
+        if changes:
+            save_html(file_path, str(soup))
+        print(f"DELETE {file_path}: {summary}")
+        return status
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: delete failed: {exc}", file=sys.stderr)
         return EXIT_ERROR
@@ -23,6 +23,9 @@ from pathlib import Path
 
 from bs4 import BeautifulSoup, Tag
 
+from docs_files import save_html
+from prefilter import Prefilter
+
 EXIT_OK = 0
 EXIT_NOT_FOUND = 1
 EXIT_AMBIGUOUS = 2
@@ -30,13 +33,17 @@ EXIT_ERROR = 3
 
 TARGET_SELECTOR = "p.more-code"
 
+PREFILTER = Prefilter((b"more-code",))
+
 
 def load_html(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def save_html(path: Path, html: str) -> None:
-    path.write_text(html, encoding="utf-8")
+def parse_html(path: Path) -> BeautifulSoup:
+    # An empty tree gives the same 0-match result as the full page would.
+    html = load_html(path) if PREFILTER.may_match(path.read_bytes()) else ""
+    return BeautifulSoup(html, "html.parser")
 
 
 def is_target_block(tag: Tag) -> bool:
@@ -59,7 +66,7 @@ def find_targets(soup: BeautifulSoup) -> list[Tag]:
 
 def run_check(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
+        soup = parse_html(file_path)
         targets = find_targets(soup)
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: check failed: {exc}", file=sys.stderr)
@@ -75,23 +82,27 @@ def run_check(file_path: Path) -> int:
     return EXIT_AMBIGUOUS
 
 
+def apply_delete(soup: BeautifulSoup) -> tuple[int, int, str]:
+    targets = find_targets(soup)
+
+    count = len(targets)
+    if count == 0:
+        return EXIT_NOT_FOUND, 0, "skipped (matches=0)"
+    if count > 1:
+        return EXIT_AMBIGUOUS, 0, f"aborted (matches={count})"
+
+    targets[0].decompose()
+    return EXIT_OK, 1, "removed 1 block"
+
+
 def run_delete(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
-        targets = find_targets(soup)
-
-        count = len(targets)
-        if count == 0:
-            print(f"DELETE {file_path}: skipped (matches=0)")
-            return EXIT_NOT_FOUND
-        if count > 1:
-            print(f"DELETE {file_path}: aborted (matches={count})")
-            return EXIT_AMBIGUOUS
-
-        targets[0].decompose()
-        save_html(file_path, str(soup))
-        print(f"DELETE {file_path}: removed 1 block")
-        return EXIT_OK
+        soup = parse_html(file_path)
+        status, changes, summary = apply_delete(soup)
+        if changes:
+            save_html(file_path, str(soup))
+        print(f"DELETE {file_path}: {summary}")
+        return status
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: delete failed: {exc}", file=sys.stderr)
         return EXIT_ERROR
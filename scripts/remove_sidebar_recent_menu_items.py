@@ -25,6 +25,9 @@ from pathlib import Path
 
 from bs4 import BeautifulSoup, Tag
 
+from docs_files import save_html
+from prefilter import Prefilter
+
 EXIT_OK = 0
 EXIT_NOT_FOUND = 1
 EXIT_AMBIGUOUS = 2
@@ -40,13 +43,17 @@ TARGETS: tuple[tuple[str, str, str], ...] = (
     ),
 )
 
+PREFILTER = Prefilter((b"/hot", b"/new"))
+
 
 def load_html(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def save_html(path: Path, html: str) -> None:
-    path.write_text(html, encoding="utf-8")
+def parse_html(path: Path) -> BeautifulSoup:
+    # An empty tree gives the same 0-match result as the full page would.
+    html = load_html(path) if PREFILTER.may_match(path.read_bytes()) else ""
+    return BeautifulSoup(html, "html.parser")
 
 
 def find_target_items(soup: BeautifulSoup) -> dict[str, list[Tag]]:
@@ -83,7 +90,7 @@ def summarize(found: dict[str, list[Tag]]) -> tuple[int, int]:
 
 def run_check(file_path: Path) -> int:
     try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
+        soup = parse_html(file_path)
         found = find_target_items(soup)
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: check failed: {exc}", file=sys.stderr)
@@ -100,27 +107,30 @@ def run_check(file_path: Path) -> int:
     return EXIT_OK
 
 
-def run_delete(file_path: Path) -> int:
-    try:
-        soup = BeautifulSoup(load_html(file_path), "html.parser")
-        found = find_target_items(soup)
+def apply_delete(soup: BeautifulSoup) -> tuple[int, int, str]:
+    found = find_target_items(soup)
 
-        missing, ambiguous = summarize(found)
-        counts = ", ".join(f"{name}={len(tags)}" for name, tags in found.items())
+    missing, ambiguous = summarize(found)
+    counts = ", ".join(f"{name}={len(tags)}" for name, tags in found.items())
 
-        if ambiguous > 0:
-            print(f"DELETE {file_path}: aborted ({counts})")
-            return EXIT_AMBIGUOUS
-        if missing > 0:
-            print(f"DELETE {file_path}: skipped ({counts})")
-            return EXIT_NOT_FOUND
+    if ambiguous > 0:
+        return EXIT_AMBIGUOUS, 0, f"aborted ({counts})"
+    if missing > 0:
+        return EXIT_NOT_FOUND, 0, f"skipped ({counts})"
+
+    for tags in found.values():
+        tags[0].decompose()
+    return EXIT_OK, 3, "removed 3 items"
 
-        for tags in found.values():
-            tags[0].decompose()
 
-        save_html(file_path, str(soup))
-        print(f"DELETE {file_path}: removed 3 items")
-        return EXIT_OK
+def run_delete(file_path: Path) -> int:
+    try:
+        soup = parse_html(file_path)
+        status, changes, summary = apply_delete(soup)
+        if changes:
+            save_html(file_path, str(soup))
+        print(f"DELETE {file_path}: {summary}")
+        return status
     except Exception as exc:  # noqa: BLE001
         print(f"ERROR: delete failed: {exc}", file=sys.stderr)
         return EXIT_ERROR
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""Apply the registered transforms (transforms.py) to every docs page in one pass.
+
+Each page is read once, skipped when no transform prefilter matches, parsed
+once, passed through every selected transform in pipeline order and
+serialized once when something changed. The tree is decomposed as soon as
+the page is done, so large pages (ranking.html) do not wait for the cyclic
+garbage collector.
+
+Usage:
+- check <docs_dir>: report what each transform would change (no writes)
+- apply <docs_dir>: apply the transforms and save changed pages
+
+Options:
+- `--only NAME` (repeatable) restricts the run to the named transforms.
+- `--profile cprofile|sample` times every phase (read, parse, each transform,
+  serialize) on every page and writes to `--profile-dir` (default
+  .cache/profile):
+  - cprofile: one cProfile per phase merged across pages (`<phase>.pstats`,
+    `all.pstats`) and a phase;function collapsed file of self time
+  - sample: an ITIMER_PROF stack sampler (`--interval`), full stacks
+  - `transforms.collapsed` can be fed to flamegraph.pl / speedscope
+  The report lists phase totals, the hottest functions and the `--top`
+  slowest pages.
+- every run writes metrics (build_metrics.py) to `--metrics-dir` (default
+  .cache/metrics).
+- `--jobs N` processes pages in N spawned worker processes:
+  - `--max-pages-per-worker` (default 50, 0: never) replaces a worker after
+    that many pages, returning memory kept by heap fragmentation
+  - `--max-rss-mb` caps the resident memory of the run (this process plus
+    its workers, read from /proc): while above it, no new page is handed out
+    until a running one finished, so concurrency drops instead of swapping
+  - `--profile` needs `--jobs 1`
+- every run reports peak resident memory (MEMORY line) to size `--jobs` on
+  small machines.
+
+Each transform's result on a parsed page is kept like the single-transform
+scripts report it: the TRANSFORM lines count not_found (1), ambiguous (2)
+and error (3) results, and every ambiguous or failed page is listed
+(`AMBIGUOUS <transform> <page>`, `FAILED ...`) for manual review.
+
+Exit codes:
+- 0: success (not_found results are expected: most pages lack most targets)
+- 2: at least one transform was ambiguous on a page (that page was left
+  unchanged by it)
+- 3: processing error (read/parse/write failure, or a transform failed)
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import multiprocessing
+import os
+import pstats
+import signal
+import sys
+import time
+from collections import Counter, deque
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+
+from bs4 import BeautifulSoup
+
+from build_metrics import DEFAULT_METRICS_DIR, BuildMetrics
+from docs_files import save_html
+from transforms import TRANSFORMS, Transform, find_transform, parse_needed
+
+EXIT_OK = 0
+EXIT_NOT_FOUND = 1
+EXIT_AMBIGUOUS = 2
+EXIT_ERROR = 3
+STATUS_NAMES = {EXIT_NOT_FOUND: "not_found", EXIT_AMBIGUOUS: "ambiguous", EXIT_ERROR: "errors"}
+
+DEFAULT_PROFILE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "profile"
+COLLAPSED_NAME = "transforms.collapsed"
+REPORT_FUNCTIONS = 15
+DEFAULT_MAX_PAGES_PER_WORKER = 50
+MIB = 1024 * 1024
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+@dataclass
+class PageResult:
+    path: Path
+    parsed: bool = False
+    saved: bool = False
+    bytes_in: int = 0
+    bytes_out: int = 0
+    changes: dict[str, int] = field(default_factory=dict)
+    # transform name -> its non-OK status (EXIT_NOT_FOUND / AMBIGUOUS / ERROR)
+    statuses: dict[str, int] = field(default_factory=dict)
+    phases: dict[str, float] = field(default_factory=dict)
+    worker: int = 0
+    rss: int = 0
+    peak_rss: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+
+class PhaseProfiler:
+    """Times named phases and, depending on ``mode``, profiles them.
+
+    - None: wall-clock timing only
+    - "cprofile": one cProfile.Profile per phase, accumulated across pages
+    - "sample": ITIMER_PROF sampling of the Python stack, keyed by phase
+    """
+
+    def __init__(self, mode: str | None, interval: float = 0.001) -> None:
+        self.mode = mode
+        self.interval = interval
+        self.current = "other"
+        self.profiles: dict[str, cProfile.Profile] = {}
+        self.samples: Counter[str] = Counter()
+        self.timings: Counter[str] = Counter()
+
+    def start(self) -> None:
+        if self.mode == "sample":
+            signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        if self.mode == "sample":
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def _sample(self, _signum: int, frame: FrameType | None) -> None:
+        stack: list[str] = []
+        while frame is not None and frame.f_code is not process_page.__code__:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.samples[";".join((self.current, *reversed(stack)))] += 1
+
+    @contextmanager
+    def phase(self, name: str, result: PageResult) -> Iterator[None]:
+        profile = None
+        if self.mode == "cprofile":
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+        self.current = name
+        started = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - started
+            self.current = "other"
+            result.phases[name] = result.phases.get(name, 0.0) + elapsed
+            self.timings[name] += elapsed
+
+
+def process_page(
+    path: Path, pipeline: tuple[Transform, ...], write: bool, profiler: PhaseProfiler
+) -> PageResult:
+    result = PageResult(path)
+    with profiler.phase("read", result):
+        raw = path.read_bytes()
+        result.bytes_in = len(raw)
+        selected = parse_needed(pipeline, raw)
+    if not selected:
+        return result
+
+    with profiler.phase("parse", result):
+        soup = BeautifulSoup(load_html(path), "html.parser")
+    result.parsed = True
+    for transform in selected:
+        with profiler.phase(transform.name, result):
+            status, changes, _summary = transform.apply(soup)
+        if status != EXIT_OK:
+            result.statuses[transform.name] = status
+        if changes:
+            result.changes[transform.name] = changes
+
+    html = ""
+    if result.changes:
+        with profiler.phase("serialize", result):
+            html = str(soup)
+    with profiler.phase("teardown", result):
+        soup.decompose()
+    if result.changes and write:
+        with profiler.phase("write", result):
+            result.saved = save_html(path, html)
+        if result.saved:
+            result.bytes_out = len(html.encode("utf-8"))
+    return result
+
+
+def process_page_worker(path: Path, names: tuple[str, ...], write: bool) -> PageResult:
+    pipeline = tuple(find_transform(name) for name in names)
+    result = process_page(path, pipeline, write, PhaseProfiler(None))
+    result.worker = os.getpid()
+    result.rss, result.peak_rss = memory_usage()
+    return result
+
+
+def memory_usage(pid: int | str = "self") -> tuple[int, int]:
+    """(current, peak) resident set size in bytes; (0, 0) without /proc or after exit."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text(encoding="ascii")
+    except OSError:
+        return 0, 0
+    values = {"VmRSS": 0, "VmHWM": 0}
+    for line in status.splitlines():
+        key, _, value = line.partition(":")
+        if key in values:
+            values[key] = int(value.split()[0]) * 1024
+    return values["VmRSS"], values["VmHWM"]
+
+
+class MemoryMonitor:
+    """Resident memory of this process and of the live workers of a run."""
+
+    def __init__(self, max_rss: int | None) -> None:
+        self.max_rss = max_rss
+        self.workers: dict[int, int] = {}
+        self.seen: set[int] = set()
+        self.peak_total = 0
+        self.worker_peak = 0
+        self.throttled = 0
+
+    def record(self, result: PageResult) -> None:
+        if result.worker:
+            self.workers[result.worker] = result.rss
+            self.seen.add(result.worker)
+        self.worker_peak = max(self.worker_peak, result.peak_rss)
+        self.current()
+
+    def current(self) -> int:
+        for pid in list(self.workers):
+            rss, _peak = memory_usage(pid)
+            if rss:
+                self.workers[pid] = rss
+            else:
+                # The worker was recycled (or exited); its memory is gone.
+                del self.workers[pid]
+        total = memory_usage()[0] + sum(self.workers.values())
+        self.peak_total = max(self.peak_total, total)
+        return total
+
+    def over_limit(self) -> bool:
+        if self.max_rss is None or self.current() <= self.max_rss:
+            return False
+        self.throttled += 1
+        return True
+
+
+def process_parallel(
+    paths: list[Path],
+    pipeline: tuple[Transform, ...],
+    write: bool,
+    jobs: int,
+    max_pages_per_worker: int,
+    monitor: MemoryMonitor,
+) -> list[PageResult]:
+    names = tuple(transform.name for transform in pipeline)
+    pending = deque(paths)
+    running: set[Future[PageResult]] = set()
+    results: list[PageResult] = []
+    # max_tasks_per_child requires a start method other than fork.
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=max_pages_per_worker or None,
+    ) as executor:
+        while pending or running:
+            while pending and len(running) < jobs:
+                if running and monitor.over_limit():
+                    break
+                running.add(executor.submit(process_page_worker, pending.popleft(), names, write))
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                monitor.record(result)
+                results.append(result)
+    return sorted(results, key=lambda result: result.path)
+
+
+def print_memory(
+    docs_dir: Path, jobs: int, max_pages_per_worker: int, monitor: MemoryMonitor
+) -> None:
+    _rss, peak = memory_usage()
+    limit = f"{monitor.max_rss // MIB}" if monitor.max_rss is not None else "none"
+    print(
+        f"MEMORY {docs_dir}: jobs={jobs}, max_pages_per_worker={max_pages_per_worker}, "
+        f"workers={len(monitor.seen)}, peak_rss_mb={peak / MIB:.1f}, "
+        f"worker_peak_rss_mb={monitor.worker_peak / MIB:.1f}, "
+        f"total_peak_rss_mb={monitor.peak_total / MIB:.1f}, max_rss_mb={limit}, "
+        f"throttled={monitor.throttled}"
+    )
+
+
+def write_profile(profiler: PhaseProfiler, profile_dir: Path) -> Path:
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    collapsed: Counter[str] = Counter()
+    if profiler.mode == "cprofile":
+        merged: pstats.Stats | None = None
+        for name, profile in profiler.profiles.items():
+            stats = pstats.Stats(profile)
+            stats.dump_stats(profile_dir / f"{name}.pstats")
+            for (filename, lineno, function), entry in stats.stats.items():
+                self_us = int(entry[2] * 1_000_000)
+                if self_us:
+                    label = f"{function} ({Path(filename).name}:{lineno})"
+                    collapsed[f"{name};{label}"] += self_us
+            if merged is None:
+                merged = stats
+            else:
+                merged.add(stats)
+        if merged is not None:
+            merged.dump_stats(profile_dir / "all.pstats")
+    else:
+        collapsed = profiler.samples
+
+    collapsed_path = profile_dir / COLLAPSED_NAME
+    collapsed_path.write_text(
+        "".join(f"{stack} {count}\n" for stack, count in sorted(collapsed.items())),
+        encoding="utf-8",
+    )
+    return collapsed_path
+
+
+def print_profile(
+    profiler: PhaseProfiler, results: list[PageResult], collapsed_path: Path, top: int
+) -> None:
+    total = sum(profiler.timings.values()) or 1.0
+    for name, seconds in profiler.timings.most_common():
+        print(f"PHASE {name}: seconds={seconds:.3f}, share={seconds / total:.1%}")
+
+    functions: Counter[str] = Counter()
+    if profiler.mode == "cprofile":
+        for stack, self_us in _read_collapsed(collapsed_path).items():
+            functions[stack.split(";", 1)[1]] += self_us / 1_000_000
+    else:
+        for stack, count in profiler.samples.items():
+            functions[stack.rsplit(";", 1)[-1]] += count * profiler.interval
+    for label, seconds in functions.most_common(REPORT_FUNCTIONS):
+        print(f"HOT {label}: self_seconds={seconds:.3f}")
+
+    for result in sorted(results, key=lambda item: item.seconds, reverse=True)[:top]:
+        slowest = ", ".join(
+            f"{name}={seconds:.3f}"
+            for name, seconds in sorted(result.phases.items(), key=lambda item: -item[1])[:4]
+        )
+        print(f"SLOW {result.path}: seconds={result.seconds:.3f}, {slowest}")
+    print(f"PROFILE {collapsed_path.parent}: mode={profiler.mode}, collapsed={collapsed_path}")
+
+
+def _read_collapsed(path: Path) -> Counter[str]:
+    counts: Counter[str] = Counter()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        stack, _, count = line.rpartition(" ")
+        counts[stack] += int(count)
+    return counts
+
+
+def record_metrics(metrics: BuildMetrics, results: list[PageResult]) -> None:
+    for result in results:
+        metrics.inc("pages", help_text="pages processed")
+        metrics.inc("pages_parsed", int(result.parsed), help_text="pages parsed")
+        metrics.inc("pages_saved", int(result.saved), help_text="pages written")
+        metrics.inc("bytes_in", result.bytes_in, help_text="bytes read")
+        metrics.inc("bytes_out", result.bytes_out, help_text="bytes written")
+        # The prefilter acts as a negative cache: a hit avoids the parse.
+        metrics.cache_lookup("prefilter", not result.parsed)
+        for name, changes in result.changes.items():
+            metrics.inc("transform_matches", changes, help_text="changes", transform=name)
+        for name, status in result.statuses.items():
+            metrics.inc(
+                "transform_results",
+                help_text="non-OK transform results",
+                transform=name,
+                status=STATUS_NAMES.get(status, "errors"),
+            )
+        for name, seconds in result.phases.items():
+            metrics.observe("phase", seconds, help_text="per-page phase latency", phase=name)
+
+
+def run_pipeline(
+    docs_dir: Path,
+    only: list[str] | None,
+    write: bool,
+    profile: str | None,
+    profile_dir: Path,
+    interval: float,
+    top: int,
+    metrics_dir: Path,
+    jobs: int,
+    max_pages_per_worker: int,
+    max_rss_mb: int | None,
+) -> int:
+    try:
+        metrics = BuildMetrics(f"run_transforms_{'apply' if write else 'check'}")
+        pipeline = tuple(find_transform(name) for name in only) if only else TRANSFORMS
+        profiler = PhaseProfiler(profile, interval)
+        monitor = MemoryMonitor(max_rss_mb * MIB if max_rss_mb is not None else None)
+        paths = sorted(docs_dir.rglob("*.html"))
+        results: list[PageResult] = []
+        if jobs > 1:
+            results = process_parallel(paths, pipeline, write, jobs, max_pages_per_worker, monitor)
+        else:
+            profiler.start()
+            try:
+                for path in paths:
+                    results.append(process_page(path, pipeline, write, profiler))
+                    monitor.current()
+            finally:
+                profiler.stop()
+
+        transform_pages: Counter[str] = Counter()
+        transform_changes: Counter[str] = Counter()
+        transform_statuses: Counter[tuple[str, int]] = Counter()
+        for result in results:
+            transform_pages.update(result.changes.keys())
+            transform_changes.update(result.changes)
+            transform_statuses.update(result.statuses.items())
+        for transform in pipeline:
+            counts = ", ".join(
+                f"{label}={transform_statuses[(transform.name, status)]}"
+                for status, label in STATUS_NAMES.items()
+            )
+            print(
+                f"TRANSFORM {transform.name}: pages={transform_pages[transform.name]}, "
+                f"changes={transform_changes[transform.name]}, {counts}"
+            )
+        worst = EXIT_OK
+        for result in results:
+            for name, status in result.statuses.items():
+                if status == EXIT_NOT_FOUND:
+                    continue
+                label = "AMBIGUOUS" if status == EXIT_AMBIGUOUS else "FAILED"
+                print(f"{label} {name} {result.path}")
+                worst = max(worst, EXIT_ERROR if status != EXIT_AMBIGUOUS else EXIT_AMBIGUOUS)
+        record_metrics(metrics, results)
+        metrics.write(metrics_dir)
+        if profile is not None:
+            print_profile(profiler, results, write_profile(profiler, profile_dir), top)
+
+        command = "APPLY" if write else "CHECK"
+        print(
+            f"{command} {docs_dir}: pages={len(results)}, "
+            f"parsed={sum(result.parsed for result in results)}, "
+            f"changed={sum(bool(result.changes) for result in results)}, "
+            f"saved={sum(result.saved for result in results)}"
+        )
+        print_memory(docs_dir, jobs, max_pages_per_worker, monitor)
+        return worst
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: {'apply' if write else 'check'} failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Apply the registered transforms to every docs page in one pass"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "report what each transform would change"),
+        ("apply", "apply the transforms and save changed pages"),
+    ):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("docs_dir", type=Path, help="docs root directory")
+        sub.add_argument(
+            "--only", action="append", metavar="NAME", help="run only this transform"
+        )
+        sub.add_argument(
+            "--profile", choices=("cprofile", "sample"), default=None, help="profile phases"
+        )
+        sub.add_argument(
+            "--profile-dir", type=Path, default=DEFAULT_PROFILE_DIR, help="profile output dir"
+        )
+        sub.add_argument(
+            "--interval", type=float, default=0.001, help="sampling interval in seconds"
+        )
+        sub.add_argument("--top", type=int, default=10, help="slowest pages to report")
+        sub.add_argument(
+            "--metrics-dir", type=Path, default=DEFAULT_METRICS_DIR, help="metrics output dir"
+        )
+        sub.add_argument("--jobs", type=int, default=1, help="worker processes")
+        sub.add_argument(
+            "--max-pages-per-worker",
+            type=int,
+            default=DEFAULT_MAX_PAGES_PER_WORKER,
+            help="pages before a worker is replaced (0: never)",
+        )
+        sub.add_argument(
+            "--max-rss-mb", type=int, default=None, help="resident memory ceiling of the run"
+        )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if not args.docs_dir.is_dir():
+        print(f"ERROR: directory not found: {args.docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+    if args.profile is not None and args.jobs > 1:
+        print("ERROR: --profile requires --jobs 1", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command in ("check", "apply"):
+        return run_pipeline(
+            args.docs_dir,
+            args.only,
+            args.command == "apply",
+            args.profile,
+            args.profile_dir,
+            args.interval,
+            args.top,
+            args.metrics_dir,
+            args.jobs,
+            args.max_pages_per_worker,
+            args.max_rss_mb,
+        )
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
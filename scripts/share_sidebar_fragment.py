@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Check/build one shared sidebar fragment for every HTML file under docs/.
+
+Every page embeds the same `div.well.sidebar-nav` (about 2.6 KB) with the
+language menu and its counts (`C(85)`), so a count change rewrites every
+page and visitors download the same menu with each page. The mirror
+snapshots even disagree on the order of equal counts.
+
+Build:
+- fragments/sidebar.txt: the sidebar menu, hrefs made root-absolute. The
+  source is the most common sidebar among pages that still embed one; when
+  every page is already converted the existing fragment is kept. It is not
+  a page, so it has no .html extension: the tools that walk `*.html`
+  (feeds, sitemap, audits, transforms) never pick it up. A fragment left at
+  the old fragments/sidebar.html is removed
+- every page: the embedded menu -> a count-free fallback list (plain
+  links, languages sorted by name) so crawlers and no-JS visitors still get
+  every link; `data-fragment` points at the fragment
+- js/fragments.js (loaded right after the sidebar) swaps the fragment in,
+  renders it from sessionStorage on later pages before the request
+  returns, and marks the active entry like app.js does
+
+The navbar header stays inline: it is small, rendered above the fold in
+the fixed top bar (a late swap would shift the layout) and never changes
+with content.
+
+Usage:
+- check <docs_dir>: report variants, per-page bytes and rebuild fan-out
+- build <docs_dir>: write the fragment/script and rewrite pages in-place
+
+Exit codes:
+- 0: success
+- 1: no sidebar found (no page embeds one and no fragment exists)
+- 3: processing error (read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, Tag
+
+from docs_files import save_html, save_text
+
+EXIT_OK = 0
+EXIT_NOT_FOUND = 1
+EXIT_ERROR = 3
+
+SIDEBAR_SELECTOR = "div.well.sidebar-nav"
+FRAGMENT = "fragments/sidebar.txt"
+LEGACY_FRAGMENT = "fragments/sidebar.html"
+SCRIPT = "js/fragments.js"
+COUNT_RE = re.compile(r"\(\d+\)$")
+
+FRAGMENTS_JS = """\
+(function () {
+  // Swap [data-fragment] placeholders for the shared fragment; the inline
+  // fallback stays for crawlers and when the request fails.
+  var path = location.pathname.replace(/\\.html$/, '').replace(/\\/index$/, '/');
+
+  function render(node, html) {
+    node.innerHTML = html;
+    var items = node.getElementsByTagName('li');
+    for (var i = 0; i < items.length; i++) {
+      var match = items[i].getAttribute('data-url_match');
+      if (match && new RegExp(match).test(path)) {
+        items[i].className += ' active';
+      }
+    }
+  }
+
+  function load(node) {
+    var url = node.getAttribute('data-fragment');
+    var key = 'fragment:' + node.getAttribute('data-fragment-key');
+    var cached = null;
+    try { cached = sessionStorage.getItem(key); } catch (e) {}
+    if (cached) render(node, cached);
+
+    var xhr = new XMLHttpRequest();
+    xhr.open('GET', url);
+    xhr.onload = function () {
+      if (xhr.status !== 200 || xhr.responseText === cached) return;
+      render(node, xhr.responseText);
+      try { sessionStorage.setItem(key, xhr.responseText); } catch (e) {}
+    };
+    xhr.send();
+  }
+
+  var nodes = document.querySelectorAll('[data-fragment]');
+  for (var i = 0; i < nodes.length; i++) load(nodes[i]);
+})();
+"""
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def html_files(docs_dir: Path) -> list[Path]:
+    return sorted(
+        path
+        for path in docs_dir.rglob("*.html")
+        if path.is_file() and path.relative_to(docs_dir).as_posix() != LEGACY_FRAGMENT
+    )
+
+
+def find_sidebar(soup: BeautifulSoup) -> Tag | None:
+    sidebar = soup.select_one(SIDEBAR_SELECTOR)
+    return sidebar if isinstance(sidebar, Tag) else None
+
+
+def is_converted(sidebar: Tag) -> bool:
+    return sidebar.has_attr("data-fragment")
+
+
+def menu_html(sidebar: Tag, page_url: str) -> str:
+    """Sidebar inner markup with hrefs resolved to root-absolute paths."""
+    menu = BeautifulSoup(sidebar.decode_contents(), "html.parser")
+    for anchor in menu.find_all("a", href=True):
+        href = anchor["href"]
+        if isinstance(href, str) and "://" not in href and not href.startswith("mailto:"):
+            anchor["href"] = urljoin(page_url, href)
+    return str(menu).strip() + "\n"
+
+
+def fallback_html(fragment: str) -> str:
+    """Count-free plain link list; stable when only counts or their order change."""
+    menu = BeautifulSoup(fragment, "html.parser")
+    items: list[tuple[str, str]] = []
+    languages: list[tuple[str, str]] = []
+    language_index = 0
+    for anchor in menu.find_all("a", href=True):
+        href = str(anchor["href"])
+        label = COUNT_RE.sub("", anchor.get_text(strip=True))
+        if href.startswith("/lang/"):
+            language_index = language_index or len(items)
+            languages.append((href, label))
+        else:
+            items.append((href, label))
+    items[language_index:language_index] = sorted(languages, key=lambda item: item[0].lower())
+    fallback = BeautifulSoup("", "html.parser")
+    ul = fallback.new_tag("ul", attrs={"class": "nav nav-list"})
+    for href, label in items:
+        li = fallback.new_tag("li")
+        anchor = fallback.new_tag("a", href=href)
+        anchor.string = label
+        li.append(anchor)
+        ul.append(li)
+    return str(ul)
+
+
+def page_prefix(docs_dir: Path, path: Path) -> str:
+    return "../" * (len(path.relative_to(docs_dir).parts) - 1)
+
+
+def fragment_url(prefix: str) -> str:
+    return f"{prefix}{FRAGMENT}"
+
+
+def needs_update(sidebar: Tag, fragment_url: str, fallback: str) -> bool:
+    # Converted pages are only rewritten when the set of links or the fragment moves.
+    return (
+        not is_converted(sidebar)
+        or sidebar.get("data-fragment") != fragment_url
+        or sidebar.decode_contents() != fallback
+    )
+
+
+def convert_sidebar(soup: BeautifulSoup, sidebar: Tag, prefix: str, fallback: str) -> None:
+    converted = is_converted(sidebar)
+    sidebar.clear()
+    sidebar.append(BeautifulSoup(fallback, "html.parser"))
+    sidebar["data-fragment"] = fragment_url(prefix)
+    sidebar["data-fragment-key"] = "sidebar"
+    if not converted:
+        sidebar.insert_after(soup.new_tag("script", src=f"{prefix}{SCRIPT}"))
+
+
+def process(docs_dir: Path, write: bool) -> int:
+    pages: list[tuple[Path, BeautifulSoup, Tag]] = []
+    variants: Counter[str] = Counter()
+    embedded_bytes = 0
+    for path in html_files(docs_dir):
+        soup = BeautifulSoup(load_html(path), "html.parser")
+        sidebar = find_sidebar(soup)
+        if sidebar is None:
+            continue
+        pages.append((path, soup, sidebar))
+        if not is_converted(sidebar):
+            page_url = "/" + path.relative_to(docs_dir).as_posix()
+            variants[menu_html(sidebar, page_url)] += 1
+            embedded_bytes += len(str(sidebar).encode("utf-8"))
+
+    fragment_path = docs_dir / FRAGMENT
+    legacy_path = docs_dir / LEGACY_FRAGMENT
+    if variants:
+        fragment = variants.most_common(1)[0][0]
+    elif fragment_path.exists():
+        fragment = fragment_path.read_text(encoding="utf-8")
+    elif legacy_path.exists():
+        fragment = legacy_path.read_text(encoding="utf-8")
+    else:
+        print(f"CHECK {docs_dir}: sidebar not found", file=sys.stderr)
+        return EXIT_NOT_FOUND
+
+    fallback = fallback_html(fragment)
+    pending = [
+        page
+        for page in pages
+        if needs_update(page[2], fragment_url(page_prefix(docs_dir, page[0])), fallback)
+    ]
+    converted_bytes = 0
+    for path, soup, sidebar in pending:
+        embedded = not is_converted(sidebar)
+        convert_sidebar(soup, sidebar, page_prefix(docs_dir, path), fallback)
+        if embedded:
+            converted_bytes += len(str(sidebar).encode("utf-8"))
+        if write:
+            save_html(path, str(soup))
+    if write:
+        save_text(fragment_path, fragment)
+        save_text(docs_dir / SCRIPT, FRAGMENTS_JS)
+        legacy_path.unlink(missing_ok=True)
+
+    embedded_pages = sum(variants.values())
+    saved = (embedded_bytes - converted_bytes) // embedded_pages if embedded_pages else 0
+    command = "BUILD" if write else "CHECK"
+    # Fan-out: files to rewrite when a language count changes.
+    print(
+        f"{command} {docs_dir}: pages={len(pages)}, pending_pages={len(pending)}, "
+        f"variants={len(variants)}, fragment_bytes={len(fragment.encode('utf-8'))}, "
+        f"saved_bytes_per_page={saved}, saved_bytes_total={embedded_bytes - converted_bytes}, "
+        f"count_change_fanout_before={len(pages)}, count_change_fanout_after=1"
+    )
+    return EXIT_OK
+
+
+def run_check(docs_dir: Path) -> int:
+    try:
+        return process(docs_dir, write=False)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: check failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def run_build(docs_dir: Path) -> int:
+    try:
+        return process(docs_dir, write=True)
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: build failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check/build one shared sidebar fragment for the docs directory"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = subparsers.add_parser("check", help="report variants, bytes and fan-out")
+    parser_check.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    parser_build = subparsers.add_parser("build", help="write fragment and rewrite pages in-place")
+    parser_build.add_argument("docs_dir", type=Path, help="docs root directory")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    docs_dir: Path = args.docs_dir
+    if not docs_dir.is_dir():
+        print(f"ERROR: directory not found: {docs_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "check":
+        return run_check(docs_dir)
+    if args.command == "build":
+        return run_build(docs_dir)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
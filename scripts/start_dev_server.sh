@@ -1,3 +1,10 @@
 #!/usr/bin/bash
 script_dir="$(dirname "$0")"
-python3 -m http.server 8000 --directory $script_dir/../docs
\ No newline at end of file
+if [ "$1" = "--watch" ]; then
+    # Re-apply the per-page transforms on change and live-reload browsers. Site-level
+    # steps (bundle, CSS purge, sidebar, prerender, hints, service worker) are not
+    # re-run unless a build.py target is given: --watch --build service_worker
+    python3 $script_dir/watch.py serve $script_dir/../original $script_dir/../docs --port 8000 "${@:2}"
+else
+    python3 -m http.server 8000 --directory $script_dir/../docs
+fi
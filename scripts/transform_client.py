@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Thin client for transform_daemon.py (standard library only).
+
+Sends files and transform names to the running daemon and prints one line
+per file in the scripts' output format. Importing nothing beyond the
+standard library keeps the per-call cost to interpreter startup, which is
+what editor integrations and git hooks pay per file.
+
+Usage:
+- check <file>... [--transform NAME]...: report matches (no writes)
+- apply <file>... [--transform NAME]...: apply and save changed files
+- shutdown: stop the daemon
+
+Without `--transform` the whole pipeline (transforms.py) is run.
+
+Exit codes (highest over all files, as in the single-file scripts):
+- 0: success
+- 1: target not found (0 matches)
+- 2: ambiguous target (2+ matches)
+- 3: processing error (daemon not running, read/write/parse failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import sys
+from pathlib import Path
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+DEFAULT_SOCKET = Path(__file__).resolve().parent.parent / ".cache" / "transforms.sock"
+
+
+def request(socket_path: Path, message: dict[str, object]) -> int:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(str(socket_path))
+        except OSError as exc:
+            print(
+                f"ERROR: daemon not running on {socket_path} "
+                f"(start it with transform_daemon.py serve): {exc}",
+                file=sys.stderr,
+            )
+            return EXIT_ERROR
+        client.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+
+        label = str(message["command"]).upper()
+        with client.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                result = json.loads(line)
+                if result.get("done"):
+                    if result.get("error"):
+                        print(f"ERROR: {result['error']}", file=sys.stderr)
+                    return int(result["exit"])
+                if result.get("error"):
+                    print(
+                        f"ERROR: {label.lower()} failed for {result['path']}: {result['error']}",
+                        file=sys.stderr,
+                    )
+                    continue
+                # check does not write, so report change counts instead of
+                # the apply summaries ("removed 1 block").
+                summaries = ", ".join(
+                    f"{name}={summary if label == 'APPLY' else f'changes={changes}'}"
+                    for name, _status, changes, summary in result["results"]
+                )
+                print(f"{label} {result['path']}: exit={result['exit']}, {summaries}")
+    print("ERROR: daemon closed the connection", file=sys.stderr)
+    return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Send transform jobs to transform_daemon.py")
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET, help="Unix socket path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in (
+        ("check", "report matches without writing"),
+        ("apply", "apply and save changed files"),
+    ):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("files", type=Path, nargs="+", help="target HTML files")
+        sub.add_argument(
+            "--transform", action="append", default=[], metavar="NAME", help="transform to run"
+        )
+    subparsers.add_parser("shutdown", help="stop the daemon")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.command == "shutdown":
+        return request(args.socket, {"command": "shutdown"})
+
+    if args.command in ("check", "apply"):
+        for file_path in args.files:
+            if not file_path.is_file():
+                print(f"ERROR: file not found: {file_path}", file=sys.stderr)
+                return EXIT_ERROR
+        return request(
+            args.socket,
+            {
+                "command": args.command,
+                # The daemon may run in another working directory.
+                "files": [str(file_path.resolve()) for file_path in args.files],
+                "transforms": args.transform,
+            },
+        )
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Long-lived transform worker: keeps the transforms loaded and serves jobs over a Unix socket.
+
+Every scripts/*.py invocation pays interpreter startup plus the bs4/soupsieve
+import before touching a page. This daemon imports the registry
+(transforms.py) once, keeps a pool of worker processes and processes jobs
+sent by transform_client.py.
+
+Protocol (one JSON object per line, both directions):
+- request: {"command": "check"|"apply", "files": [...], "transforms": [...]}
+  - an empty "transforms" list runs the whole pipeline
+  - {"command": "shutdown"} stops the daemon
+- response: one {"path", "exit", "results": [[name, exit, changes, summary]]}
+  line per file in request order, then {"done": true, "exit": max}
+
+Exit-code semantics match the single-file scripts: per file, the highest
+exit code over the named transforms (1 = not found, 2 = ambiguous,
+3 = error); `check` never writes, `apply` saves pages that changed. In
+pipeline mode a transform that does not match is not an error.
+
+Usage:
+- serve [--socket PATH] [--jobs N]
+
+Exit codes:
+- 0: success (stopped by shutdown or Ctrl-C)
+- 3: processing error (socket already in use, startup failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from docs_files import save_html
+from transforms import TRANSFORMS, Transform, find_transform, parse_needed
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+DEFAULT_SOCKET = Path(__file__).resolve().parent.parent / ".cache" / "transforms.sock"
+
+FileResult = dict[str, object]
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def process_file(path_name: str, names: list[str], write: bool) -> FileResult:
+    """Run the named transforms (or the pipeline) on one file inside a worker."""
+    path = Path(path_name)
+    pipeline: tuple[Transform, ...] = (
+        tuple(find_transform(name) for name in names) if names else TRANSFORMS
+    )
+    try:
+        raw = path.read_bytes()
+        selected = parse_needed(pipeline, raw)
+        source = load_html(path) if selected else ""
+        soup = BeautifulSoup(source, "html.parser")
+        empty = BeautifulSoup("", "html.parser")
+
+        results: list[list[object]] = []
+        changed = False
+        for transform in pipeline:
+            # A prefilter miss behaves like the scripts' parse_html: the
+            # transform sees an empty page and reports "not found".
+            target = soup if transform in selected else empty
+            status, changes, summary = transform.apply(target)
+            results.append([transform.name, status, changes, summary])
+            changed = changed or changes > 0
+
+        saved = bool(write and changed and save_html(path, str(soup)))
+        if names:
+            exit_code = max(int(status) for _name, status, _changes, _summary in results)
+        else:
+            exit_code = EXIT_OK
+        return {"path": path_name, "exit": exit_code, "saved": saved, "results": results}
+    except Exception as exc:  # noqa: BLE001
+        return {"path": path_name, "exit": EXIT_ERROR, "error": str(exc), "results": []}
+
+
+def warm_up(_index: int) -> int:
+    return len(TRANSFORMS)
+
+
+class TransformServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, executor: ProcessPoolExecutor) -> None:
+        self.executor = executor
+        super().__init__(str(socket_path), TransformRequestHandler)
+
+
+class TransformRequestHandler(socketserver.StreamRequestHandler):
+    server: TransformServer
+
+    def send(self, message: dict[str, object]) -> None:
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            command = request.get("command")
+            if command == "shutdown":
+                self.send({"done": True, "exit": EXIT_OK})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            if command not in ("check", "apply"):
+                raise ValueError(f"unknown command: {command}")
+            files = [str(name) for name in request.get("files", [])]
+            names = [str(name) for name in request.get("transforms", [])]
+            for name in names:
+                find_transform(name)
+        except (ValueError, KeyError) as exc:
+            error = str(exc.args[0]) if exc.args else str(exc)
+            self.send({"done": True, "exit": EXIT_ERROR, "error": error})
+            return
+
+        exit_code = EXIT_OK
+        results = self.server.executor.map(
+            process_file, files, [names] * len(files), [command == "apply"] * len(files)
+        )
+        for result in results:
+            exit_code = max(exit_code, int(str(result["exit"])))
+            self.send(result)
+        self.send({"done": True, "exit": exit_code})
+
+
+def socket_in_use(socket_path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def run_serve(socket_path: Path, jobs: int | None) -> int:
+    try:
+        if socket_path.exists():
+            if socket_in_use(socket_path):
+                print(f"ERROR: daemon already running on {socket_path}", file=sys.stderr)
+                return EXIT_ERROR
+            socket_path.unlink()
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        workers = jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Start every worker now so the first job does not pay the imports.
+            list(executor.map(warm_up, range(workers)))
+            old_umask = os.umask(0o177)
+            try:
+                server = TransformServer(socket_path, executor)
+            finally:
+                os.umask(old_umask)
+            print(f"SERVE {socket_path}: workers={workers}, transforms={len(TRANSFORMS)}")
+            sys.stdout.flush()
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+                socket_path.unlink(missing_ok=True)
+        return EXIT_OK
+    except Exception as exc:  # noqa: BLE001
+        print(f"ERROR: serve failed: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Serve transform jobs over a Unix socket with the transforms preloaded"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_serve = subparsers.add_parser("serve", help="start the daemon")
+    parser_serve.add_argument(
+        "--socket", type=Path, default=DEFAULT_SOCKET, help="Unix socket path"
+    )
+    parser_serve.add_argument("--jobs", type=int, default=None, help="worker processes")
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        return run_serve(args.socket, args.jobs)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+"""Registry of the per-page transforms applied to docs/, in pipeline order.
+
+Each transform script exposes `apply_<command>(soup)`, which mutates the parsed
+page and returns `(exit_code, changes, summary)`; `run_<command>` wraps it
+with file I/O. Most scripts also expose `PREFILTER`, a byte-level prefilter
+(prefilter.py): a page containing none of its needles cannot match and need
+not be parsed. `parse_needed()` scans a page once for the needles of a whole
+pipeline.
+Tools that need to replay the pipeline (diff_original_docs.py) import the
+registry instead of shelling out to every script.
+
+Site-level builds (bundle_javascript, purge_css, optimize_images) depend on
+files outside the page and are not part of the registry; build.py schedules
+them after run_transforms.py.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+
+from bs4 import BeautifulSoup
+
+import audit_third_party
+import convert_fqdn_links_to_local_html
+import convert_search_menu_link_to_local_html
+import highlight_code_blocks
+import insert_all_content_menu_item
+import remove_amazon_ad_block
+import remove_comment_hint_annotation
+import remove_comment_twitter_auth_prompt
+import remove_login_block
+import remove_more_code_button
+import remove_sidebar_recent_menu_items
+import remove_sidebar_write_menu_items
+from prefilter import Prefilter
+
+ApplyFunc = Callable[[BeautifulSoup], tuple[int, int, str]]
+
+
+@dataclass(frozen=True)
+class Transform:
+    name: str
+    command: str
+    apply: ApplyFunc
+    # None: every page has to be parsed.
+    prefilter: Prefilter | None = None
+
+
+TRANSFORMS: tuple[Transform, ...] = (
+    Transform(
+        "remove_login_block",
+        "delete",
+        remove_login_block.apply_delete,
+        remove_login_block.PREFILTER,
+    ),
+    Transform(
+        "remove_sidebar_recent_menu_items",
+        "delete",
+        remove_sidebar_recent_menu_items.apply_delete,
+        remove_sidebar_recent_menu_items.PREFILTER,
+    ),
+    Transform(
+        "convert_fqdn_links_to_local_html",
+        "convert",
+        convert_fqdn_links_to_local_html.apply_convert,
+        convert_fqdn_links_to_local_html.PREFILTER,
+    ),
+    Transform(
+        "remove_more_code_button",
+        "delete",
+        remove_more_code_button.apply_delete,
+        remove_more_code_button.PREFILTER,
+    ),
+    Transform(
+        "remove_sidebar_write_menu_items",
+        "delete",
+        remove_sidebar_write_menu_items.apply_delete,
+        remove_sidebar_write_menu_items.PREFILTER,
+    ),
+    Transform(
+        "remove_amazon_ad_block",
+        "delete",
+        remove_amazon_ad_block.apply_delete,
+        remove_amazon_ad_block.PREFILTER,
+    ),
+    Transform(
+        "remove_comment_hint_annotation",
+        "delete",
+        remove_comment_hint_annotation.apply_delete,
+        remove_comment_hint_annotation.PREFILTER,
+    ),
+    Transform(
+        "remove_comment_twitter_auth_prompt",
+        "delete",
+        remove_comment_twitter_auth_prompt.apply_delete,
+        remove_comment_twitter_auth_prompt.PREFILTER,
+    ),
+    Transform(
+        "convert_search_menu_link_to_local_html",
+        "convert",
+        convert_search_menu_link_to_local_html.apply_convert,
+        convert_search_menu_link_to_local_html.PREFILTER,
+    ),
+    Transform(
+        "insert_all_content_menu_item",
+        "insert",
+        insert_all_content_menu_item.apply_insert,
+        insert_all_content_menu_item.PREFILTER,
+    ),
+    Transform(
+        "highlight_code_blocks",
+        "convert",
+        highlight_code_blocks.apply_convert,
+        highlight_code_blocks.PREFILTER,
+    ),
+    Transform("audit_third_party", "convert", audit_third_party.apply_convert),
+)
+
+
+def find_transform(name: str) -> Transform:
+    for transform in TRANSFORMS:
+        if transform.name == name:
+            return transform
+    raise KeyError(f"unknown transform: {name}")
+
+
+@lru_cache(maxsize=16)
+def pipeline_prefilter(pipeline: tuple[Transform, ...]) -> Prefilter:
+    return Prefilter(
+        needle
+        for transform in pipeline
+        if transform.prefilter is not None
+        for needle in transform.prefilter.needles
+    )
+
+
+def parse_needed(pipeline: tuple[Transform, ...], raw: bytes) -> list[Transform]:
+    """Transforms of ``pipeline`` that may match the page ``raw``, in order."""
+    found = pipeline_prefilter(pipeline).found(raw)
+    return [
+        transform
+        for transform in pipeline
+        if transform.prefilter is None or not found.isdisjoint(transform.prefilter.needles)
+    ]
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""Watch original/ and scripts/, re-apply transforms and live-reload the dev server.
+
+Serves the docs directory like `python3 -m http.server` and additionally:
+- watches original/ and scripts/ (inotify via ctypes; mtime polling where
+  inotify is not available)
+- an edited original/<page>.html is copied to docs/ and the registered
+  transforms (transforms.py) whose prefilter matches are applied to it
+- an edited scripts/<transform>.py is reloaded and only that transform is
+  re-applied, only to the docs pages its prefilter matches
+- after every rebuild a reload event is pushed to connected browsers over
+  Server-Sent Events (`/__livereload`); the client snippet is injected into
+  served HTML responses only, docs/ files are not modified
+
+Pages that exist in original/ but were removed from docs/ (hot, new, ...) stay
+removed; pages created while watching are added.
+
+Only the per-page transforms are re-applied. A rebuilt page loses what the
+site-level build.py nodes add (js/bundle.js, purged and critical CSS, the
+sidebar fragment, prerendered widgets, resource hints, lazy loading, the
+service worker registration), so it no longer matches a full build until
+build.py runs again. `--build <target>` runs `build.py build <docs_dir>
+<target>` after every rebuild (and after edits to any script) before the
+browsers reload; the site-level nodes rewrite every page, so this takes
+minutes rather than milliseconds.
+
+Usage:
+- serve <original_dir> <docs_dir> [--port 8000] [--bind 127.0.0.1] [--build TARGET ...]
+
+Exit codes:
+- 0: success (stopped with Ctrl-C)
+- 3: processing error (startup failure)
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import importlib
+import os
+import queue
+import select
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+import transforms
+from docs_files import save_html
+from transforms import Transform, parse_needed
+
+EXIT_OK = 0
+EXIT_ERROR = 3
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BUILD_SCRIPT = SCRIPTS_DIR / "build.py"
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SNIPPET = (
+    "<script>new EventSource('/__livereload').onmessage = function() "
+    "{ location.reload(); };</script>"
+)
+KEEPALIVE_SECONDS = 15.0
+DEBOUNCE_SECONDS = 0.2
+POLL_SECONDS = 0.5
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def load_html(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+class LiveReload:
+    """Fan-out of reload events to every connected SSE client."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clients: list[queue.Queue[str]] = []
+
+    def subscribe(self) -> queue.Queue[str]:
+        client: queue.Queue[str] = queue.Queue()
+        with self._lock:
+            self._clients.append(client)
+        return client
+
+    def unsubscribe(self, client: queue.Queue[str]) -> None:
+        with self._lock:
+            self._clients.remove(client)
+
+    def notify(self) -> int:
+        with self._lock:
+            for client in self._clients:
+                client.put("reload")
+            return len(self._clients)
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    livereload: LiveReload
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path == LIVERELOAD_PATH:
+            self.serve_events()
+            return
+
+        path = Path(self.translate_path(self.path))
+        if path.is_dir():
+            path = path / "index.html"
+        if path.suffix == ".html" and path.is_file():
+            self.serve_html(path)
+            return
+        super().do_GET()
+
+    def serve_html(self, path: Path) -> None:
+        html = load_html(path)
+        index = html.rfind("</body>")
+        index = index if index >= 0 else len(html)
+        body = f"{html[:index]}{LIVERELOAD_SNIPPET}{html[index:]}".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def serve_events(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        client = self.livereload.subscribe()
+        try:
+            while True:
+                try:
+                    event = client.get(timeout=KEEPALIVE_SECONDS)
+                    self.wfile.write(f"data: {event}\n\n".encode("utf-8"))
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.livereload.unsubscribe(client)
+
+
+def inotify_events(roots: list[Path]) -> Iterator[set[Path]] | None:
+    """Yield batches of changed files under ``roots`` (None without inotify)."""
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    fd = libc.inotify_init1(os.O_CLOEXEC)
+    if fd < 0:
+        return None
+
+    watches: dict[int, Path] = {}
+
+    def add_watch(directory: Path) -> None:
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            watches[wd] = directory
+
+    for root in roots:
+        for directory in (root, *(path for path in root.rglob("*") if path.is_dir())):
+            add_watch(directory)
+
+    def events() -> Iterator[set[Path]]:
+        while True:
+            changed: set[Path] = set()
+            timeout: float | None = None
+            while select.select([fd], [], [], timeout)[0]:
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = data[offset : offset + length].rstrip(b"\0")
+                    offset += length
+                    if wd not in watches or not name:
+                        continue
+                    path = watches[wd] / os.fsdecode(name)
+                    if mask & IN_ISDIR:
+                        if mask & IN_CREATE:
+                            add_watch(path)
+                    else:
+                        changed.add(path)
+                # Editors write in several steps; wait for the burst to end.
+                timeout = DEBOUNCE_SECONDS
+            if changed:
+                yield changed
+
+    return events()
+
+
+def polling_events(roots: list[Path]) -> Iterator[set[Path]]:
+    def snapshot() -> dict[Path, int]:
+        mtimes: dict[Path, int] = {}
+        for root in roots:
+            for path in root.rglob("*"):
+                try:
+                    if path.is_file():
+                        mtimes[path] = path.stat().st_mtime_ns
+                except FileNotFoundError:
+                    # Removed between the directory scan and stat (editor temp files).
+                    continue
+        return mtimes
+
+    previous = snapshot()
+    while True:
+        time.sleep(POLL_SECONDS)
+        current = snapshot()
+        changed = {path for path, mtime in current.items() if previous.get(path) != mtime}
+        previous = current
+        if changed:
+            yield changed
+
+
+def reload_transform(name: str) -> Transform | None:
+    """Reload ``scripts/<name>.py`` and return its refreshed registry entry."""
+    for index, transform in enumerate(transforms.TRANSFORMS):
+        if transform.name != name:
+            continue
+        module = importlib.reload(sys.modules[name])
+        refreshed = Transform(
+            transform.name,
+            transform.command,
+            getattr(module, f"apply_{transform.command}"),
+            getattr(module, "PREFILTER", None),
+        )
+        transforms.TRANSFORMS = (
+            *transforms.TRANSFORMS[:index],
+            refreshed,
+            *transforms.TRANSFORMS[index + 1 :],
+        )
+        return refreshed
+    return None
+
+
+def apply_transforms(path: Path, pipeline: tuple[Transform, ...]) -> list[str]:
+    raw = path.read_bytes()
+    selected = parse_needed(pipeline, raw)
+    if not selected:
+        return []
+
+    soup = BeautifulSoup(load_html(path), "html.parser")
+    applied: list[str] = []
+    for transform in selected:
+        _status, changes, _summary = transform.apply(soup)
+        if changes:
+            applied.append(transform.name)
+    if applied:
+        save_html(path, str(soup))
+    return applied
+
+
+def rebuild_page(original_dir: Path, docs_dir: Path, source: Path) -> list[str]:
+    target = docs_dir / source.relative_to(original_dir)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, target)
+    return apply_transforms(target, transforms.TRANSFORMS)
+
+
+def handle_changes(
+    changed: set[Path], original_dir: Path, docs_dir: Path, removed: set[Path]
+) -> int:
+    rebuilt = 0
+    for path in sorted(changed):
+        try:
+            if path.suffix == ".py" and path.parent == SCRIPTS_DIR:
+                transform = reload_transform(path.stem)
+                if transform is None:
+                    continue
+                pages = 0
+                for page in sorted(docs_dir.rglob("*.html")):
+                    if apply_transforms(page, (transform,)):
+                        pages += 1
+                print(f"WATCH {path}: reapplied {transform.name} to pages={pages}")
+                rebuilt += 1
+            elif path.suffix == ".html" and path.is_relative_to(original_dir):
+                if path in removed or not path.is_file():
+                    continue
+                applied = rebuild_page(original_dir, docs_dir, path)
+                print(f"WATCH {path}: rebuilt, transforms={','.join(applied) or '-'}")
+                rebuilt += 1
+        except Exception as exc:  # noqa: BLE001
+            print(f"ERROR: rebuild failed for {path}: {exc}", file=sys.stderr)
+    return rebuilt
+
+
+def run_build(docs_dir: Path, targets: list[str]) -> bool:
+    """Run the build.py nodes ``targets`` (and the nodes they run after)."""
+    argv = [sys.executable, str(BUILD_SCRIPT), "build", str(docs_dir), *targets]
+    return subprocess.run(argv, check=False).returncode == 0
+
+
+def run_serve(
+    original_dir: Path, docs_dir: Path, bind: str, port: int, build_targets: list[str]
+) -> int:
+    original_dir = original_dir.resolve()
+    docs_dir = docs_dir.resolve()
+    removed = {
+        path
+        for path in original_dir.rglob("*.html")
+        if not (docs_dir / path.relative_to(original_dir)).exists()
+    }
+
+    livereload = LiveReload()
+    handler = partial(DevRequestHandler, directory=str(docs_dir))
+    DevRequestHandler.livereload = livereload
+    try:
+        server = ThreadingHTTPServer((bind, port), handler)
+    except OSError as exc:
+        print(f"ERROR: cannot listen on {bind}:{port}: {exc}", file=sys.stderr)
+        return EXIT_ERROR
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    roots = [original_dir, SCRIPTS_DIR]
+    events = inotify_events(roots)
+    backend = "inotify"
+    if events is None:
+        events, backend = polling_events(roots), "polling"
+    print(f"SERVE http://{bind}:{port}/ ({docs_dir}), watching with {backend}")
+
+    try:
+        for changed in events:
+            rebuilt = handle_changes(changed, original_dir, docs_dir, removed)
+            scripts_changed = any(
+                path.suffix == ".py" and path.parent == SCRIPTS_DIR for path in changed
+            )
+            if build_targets and (rebuilt or scripts_changed):
+                ok = run_build(docs_dir, build_targets)
+                print(f"WATCH build {','.join(build_targets)}: {'ok' if ok else 'failed'}")
+                rebuilt += 1
+            if rebuilt:
+                print(f"RELOAD clients={livereload.notify()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Watch original/ and scripts/, rebuild docs pages and live-reload"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_serve = subparsers.add_parser("serve", help="serve docs and rebuild on change")
+    parser_serve.add_argument("original_dir", type=Path, help="original mirror directory")
+    parser_serve.add_argument("docs_dir", type=Path, help="docs root directory")
+    parser_serve.add_argument("--port", type=int, default=8000, help="listen port")
+    parser_serve.add_argument("--bind", default="127.0.0.1", help="listen address")
+    parser_serve.add_argument(
+        "--build",
+        action="append",
+        default=[],
+        metavar="TARGET",
+        help="build.py target to rebuild after every change (slow: the site-level steps "
+        "rewrite every page); without it rebuilt pages only get the per-page transforms",
+    )
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    for directory in (args.original_dir, args.docs_dir):
+        if not directory.is_dir():
+            print(f"ERROR: directory not found: {directory}", file=sys.stderr)
+            return EXIT_ERROR
+
+    if args.command == "serve":
+        return run_serve(args.original_dir, args.docs_dir, args.bind, args.port, args.build)
+
+    print("ERROR: unknown command", file=sys.stderr)
+    return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())